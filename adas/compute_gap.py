@@ -1,49 +1,169 @@
 import csv
+import heapq
+import os
 import sys
-from collections import defaultdict
+import tempfile
+from itertools import groupby
 from pathlib import Path
 
-def compute_gap(input_csv, ego_id="ego", lead_id="lead", start=None, end=None, out_csv="gap.csv"):
-    times = defaultdict(dict)  # times[time_s][veh_id] = row
+GAP_HEADER = ["time_s","ego_id","lead_id","ego_speed","lead_speed","distance_m"]
+
+class OutOfOrder(Exception):
+    """Raised by the streaming pass when time_s goes backwards."""
+
+def _read_rows(input_csv, start=None, end=None):
+    start = float(start) if start is not None else None
+    end = float(end) if end is not None else None
     with open(input_csv, newline='') as f:
         reader = csv.DictReader(f)
         for r in reader:
             t = float(r["time_s"])
-            vid = r["veh_id"]
-            if start is not None and t < float(start): continue
-            if end is not None and t > float(end): continue
-            times[t][vid] = r
+            if start is not None and t < start: continue
+            if end is not None and t > end: continue
+            yield t, r
+
+def _gap_row(t, rowmap, ego_id, lead_id):
+    ego = rowmap.get(ego_id)
+    lead = rowmap.get(lead_id)
+    if ego and lead:
+        # compute distance along x-axis (assumes same lane/edge direction). If not appropriate use euclidean.
+        try:
+            distance = float(lead["x"]) - float(ego["x"])
+        except Exception:
+            # fallback to Euclidean
+            import math
+            dx = float(lead["x"]) - float(ego["x"])
+            dy = float(lead["y"]) - float(ego["y"])
+            distance = math.hypot(dx, dy)
+        return [t, ego_id, lead_id, ego.get("speed",""), lead.get("speed",""), max(0.0, distance)]
+    elif ego and not lead:
+        return [t, ego_id, lead_id, ego.get("speed",""), "", ""]
+    return None
+
+def _write_gaps(rows, out_csv, ego_id, lead_id):
+    """
+    Group consecutive rows with the same time_s and write one gap row as soon
+    as each timestep closes. Only the current timestep is held in memory.
+    """
+    last_t = None
+    with open(out_csv, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(GAP_HEADER)
+        for t, group in groupby(rows, key=lambda tr: tr[0]):
+            if last_t is not None and t <= last_t:
+                raise OutOfOrder(f"time_s {t} after {last_t}")
+            last_t = t
+            rowmap = {r["veh_id"]: r for _, r in group}
+            out = _gap_row(t, rowmap, ego_id, lead_id)
+            if out:
+                w.writerow(out)
+
+def _external_sort(rows, tmpdir, chunk_rows):
+    """
+    Sort (time_s, row) pairs by time_s using sorted runs on disk and a k-way
+    merge. Ties keep input order, so the last row per vehicle still wins.
+    """
+    runs = []
+    fieldnames = None
 
-    times_sorted = sorted(times.items(), key=lambda x: x[0])
+    def flush(chunk):
+        chunk.sort(key=lambda tr: tr[0])
+        path = os.path.join(tmpdir, f"run{len(runs)}.csv")
+        with open(path, "w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=fieldnames)
+            w.writeheader()
+            w.writerows(r for _, r in chunk)
+        runs.append(path)
+
+    chunk = []
+    for t, r in rows:
+        if fieldnames is None:
+            fieldnames = list(r.keys())
+        chunk.append((t, r))
+        if len(chunk) >= chunk_rows:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+
+    files = [open(p, newline='') for p in runs]
+    try:
+        readers = [((float(r["time_s"]), r) for r in csv.DictReader(f)) for f in files]
+        yield from heapq.merge(*readers, key=lambda tr: tr[0])
+    finally:
+        for f in files:
+            f.close()
+
+def _open_store(input_csv):
+    # only --store needs the speedMonitor package; the CSV path runs standalone
+    root = str(Path(__file__).resolve().parent.parent)
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    from speedMonitor.fcd_store import open_store
+    return open_store(input_csv)
+
+def _last_per_time(store, veh_id, start, end):
+    # rows are in time order; a later row of the same timestep wins
+    rows = store.trajectory_rows(veh_id, start, end)
+    return {store.row(i).time_s: i for i in rows}
+
+def _write_gaps_from_store(store, out_csv, ego_id, lead_id, start=None, end=None):
+    """
+    Gap table from the ego and lead trajectories only (see speedMonitor/fcd_store.py).
+    Speeds are written as the CSV has them, like the streaming pass does.
+    """
+    start = float(start) if start is not None else None
+    end = float(end) if end is not None else None
+    lead = _last_per_time(store, lead_id, start, end)
     with open(out_csv, "w", newline="") as f:
         w = csv.writer(f)
-        w.writerow(["time_s","ego_id","lead_id","ego_speed","lead_speed","distance_m"])
-        for t, rowmap in times_sorted:
-            ego = rowmap.get(ego_id)
-            lead = rowmap.get(lead_id)
-            if ego and lead:
-                # compute distance along x-axis (assumes same lane/edge direction). If not appropriate use euclidean.
-                try:
-                    distance = float(lead["x"]) - float(ego["x"])
-                except Exception:
-                    # fallback to Euclidean
-                    import math
-                    dx = float(lead["x"]) - float(ego["x"])
-                    dy = float(lead["y"]) - float(ego["y"])
-                    distance = math.hypot(dx, dy)
-                w.writerow([t, ego_id, lead_id, ego.get("speed",""), lead.get("speed",""), max(0.0, distance)])
-            elif ego and not lead:
-                w.writerow([t, ego_id, lead_id, ego.get("speed",""), "", ""])
+        w.writerow(GAP_HEADER)
+        for t, i in _last_per_time(store, ego_id, start, end).items():
+            j = lead.get(t)
+            if j is None:
+                w.writerow([t, ego_id, lead_id, store.speed_text(i), "", ""])
+            else:
+                w.writerow([t, ego_id, lead_id, store.speed_text(i), store.speed_text(j),
+                            max(0.0, store.row(j).x - store.row(i).x)])
+
+def compute_gap(input_csv, ego_id="ego", lead_id="lead", start=None, end=None, out_csv="gap.csv", chunk_rows=200_000,
+                store=None):
+    """
+    SUMO writes FCD in time order, so the gap table is produced in a single
+    streaming pass. If the input turns out not to be sorted by time_s, the
+    partial output is discarded and the rows go through an external sort
+    (runs of chunk_rows rows) before the same pass is repeated.
+    With store=True (or an open FcdStore) the indexed FCD store next to
+    input_csv is used instead and only the ego and lead rows are read.
+    """
+    if hasattr(store, "trajectory_rows"):
+        _write_gaps_from_store(store, out_csv, ego_id, lead_id, start, end)
+        print(f"Wrote {out_csv}")
+        return
+    if store:
+        with _open_store(input_csv) as fcd_store:
+            _write_gaps_from_store(fcd_store, out_csv, ego_id, lead_id, start, end)
+        print(f"Wrote {out_csv}")
+        return
+
+    try:
+        _write_gaps(_read_rows(input_csv, start, end), out_csv, ego_id, lead_id)
+    except OutOfOrder as e:
+        print(f"Input not ordered by time ({e}), falling back to external sort")
+        with tempfile.TemporaryDirectory(prefix="compute_gap_") as tmpdir:
+            rows = _external_sort(_read_rows(input_csv, start, end), tmpdir, chunk_rows)
+            _write_gaps(rows, out_csv, ego_id, lead_id)
     print(f"Wrote {out_csv}")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 4:
-        print("Usage: compute_gap.py fcd.csv ego_id lead_id [start] [end] [out_csv]")
+    argv = [a for a in sys.argv if a != "--store"]
+    if len(argv) < 4:
+        print("Usage: compute_gap.py fcd.csv ego_id lead_id [start] [end] [out_csv] [--store]")
         sys.exit(1)
-    input_csv = sys.argv[1]
-    ego = sys.argv[2]
-    lead = sys.argv[3]
-    start = sys.argv[4] if len(sys.argv) >= 5 else None
-    end = sys.argv[5] if len(sys.argv) >= 6 else None
-    out = sys.argv[6] if len(sys.argv) >= 7 else "gap.csv"
-    compute_gap(input_csv, ego, lead, start, end, out)
\ No newline at end of file
+    input_csv = argv[1]
+    ego = argv[2]
+    lead = argv[3]
+    start = argv[4] if len(argv) >= 5 else None
+    end = argv[5] if len(argv) >= 6 else None
+    out = argv[6] if len(argv) >= 7 else "gap.csv"
+    compute_gap(input_csv, ego, lead, start, end, out, store="--store" in sys.argv)
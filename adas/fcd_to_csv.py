@@ -3,26 +3,51 @@ import csv
 import sys
 from pathlib import Path
 
+def iter_timesteps(xml_path):
+    """
+    Stream (time_s, [vehicle attribute dicts]) from an FCD file with iterparse.
+    Each <timestep> is cleared right after it is read, so memory does not grow
+    with the size of the file.
+    """
+    context = ET.iterparse(str(xml_path), events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event == "end" and elem.tag == "timestep":
+            t = float(elem.get("time"))
+            vehicles = [dict(veh.attrib) for veh in elem.findall("vehicle")]
+            root.clear()
+            yield t, vehicles
+
+def iter_timestep_batches(xml_path, batch_size=1000):
+    batch = []
+    for step in iter_timesteps(xml_path):
+        batch.append(step)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 def fcd_xml_to_csv(xml_path, csv_path):
     xml_path = Path(xml_path)
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
 
     with open(csv_path, "w", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(["time_s","veh_id","x","y","speed"])
-        for ts in root.findall("timestep"):
-            t = float(ts.get("time"))
-            for veh in ts.findall("vehicle"):
-                vid = veh.get("id")
-                x = veh.get("x")
-                y = veh.get("y")
-                speed = veh.get("speed")
-                writer.writerow([t, vid, float(x) if x is not None else "", float(y) if y is not None else "", float(speed) if speed is not None else ""])
+        for batch in iter_timestep_batches(xml_path):
+            rows = []
+            for t, vehicles in batch:
+                for veh in vehicles:
+                    vid = veh.get("id")
+                    x = veh.get("x")
+                    y = veh.get("y")
+                    speed = veh.get("speed")
+                    rows.append([t, vid, float(x) if x is not None else "", float(y) if y is not None else "", float(speed) if speed is not None else ""])
+            writer.writerows(rows)
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
         print("Usage: python fcd_to_csv.py fcd.xml out.csv")
         sys.exit(1)
     fcd_xml_to_csv(sys.argv[1], sys.argv[2])
-    print("Converted", sys.argv[1], "->", sys.argv[2])
\ No newline at end of file
+    print("Converted", sys.argv[1], "->", sys.argv[2])
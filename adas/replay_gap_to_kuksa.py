@@ -1,9 +1,13 @@
+import argparse
 import csv
 import time
 import sys
+from pathlib import Path
 from decide import decide_target
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 try:
-    from kuksa_client.grpc import VSSClient
+    from kuksa_client.grpc import VSSClient, Datapoint, DataEntry, EntryUpdate, Field, Metadata
+    from speedMonitor.connection import CONNECTIONS
     KUKSA_AVAILABLE = True
 except Exception:
     KUKSA_AVAILABLE = False
@@ -17,45 +21,178 @@ SIG_SPEED    = "Vehicle.Speed"
 SIG_DISTANCE = "Vehicle.CurrentLocation.Longitude"
 SIG_TARGET   = "Vehicle.Acceleration.Longitudinal"
 
+# step:     fixed step_s pause after every row (original behaviour)
+# realtime: rows are published at their recorded time_s, divided by `speedup`
+#           (speedup=10 replays ten times faster than recorded)
+# fast:     no pacing at all, as fast as the broker accepts writes
+REPLAY_MODES = ("step", "realtime", "fast")
 
-def replay(gap_csv, publish_to_kuksa=False, step_s=0.1):
-    if publish_to_kuksa and not KUKSA_AVAILABLE:
+
+def _rows(gap_csv):
+    with open(gap_csv, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        i_t = header.index("time_s")
+        i_speed = header.index("ego_speed")
+        i_dist = header.index("distance_m")
+        for r in reader:
+            yield (
+                float(r[i_t]),
+                float(r[i_speed]) if r[i_speed] else 0.0,
+                float(r[i_dist]) if r[i_dist] else None,
+            )
+
+
+def _value_types(client):
+    """Data types of the replayed signals, looked up once (one RPC)."""
+    return {path: md.data_type for path, md in client.get_metadata([SIG_SPEED, SIG_DISTANCE, SIG_TARGET]).items()}
+
+
+def _publish(client, batch, types):
+    """
+    Write one batch of rows as a single v1 Set; returns the RPC count (1).
+    set_current_values() would look up the value types and then publish
+    every signal on its own; with the types from _value_types() attached
+    the client skips its lookup and sends all signals in one request.
+    """
+    updates = []
+    for row in batch:
+        for path, v in row:
+            metadata = Metadata(data_type=types[path]) if path in types else None
+            updates.append(EntryUpdate(DataEntry(path, value=Datapoint(v), metadata=metadata), (Field.VALUE,)))
+    client.set(updates=updates)
+    return 1
+
+
+def replay(
+    gap_csv,
+    publish_to_kuksa=False,
+    step_s=0.1,
+    mode="step",
+    speedup=1.0,
+    batch_rows=1,
+    quiet=False,
+    client=None,
+):
+    """
+    Replay gap.csv through decide_target() and optionally into the Databroker.
+
+    Every row is published as one Set RPC carrying speed, distance and
+    target (the value types are looked up once up front); batch_rows > 1
+    (fast mode only) packs several rows into a single Set for throughput. The broker applies a batch as one update, so subscribers
+    only see the last row of each batch for every signal: the rows in
+    between are coalesced away. In realtime mode the schedule is anchored to
+    the first row, so time spent writing or printing does not accumulate as
+    drift. Returns a summary dict with the achieved rate and lag; `rpcs`
+    counts every RPC the kuksa client issues, including type lookups.
+    """
+    if mode not in REPLAY_MODES:
+        raise ValueError(f"mode must be one of {REPLAY_MODES}, got {mode!r}")
+    if speedup <= 0:
+        raise ValueError("speedup must be positive")
+    batch_rows = max(1, int(batch_rows))
+    if batch_rows > 1 and mode != "fast":
+        # a paced replay exists to show every row at its time; batching would
+        # hold rows back and then drop all but the last one of each batch
+        raise ValueError(f"batch_rows > 1 needs mode='fast', got mode={mode!r}")
+
+    if publish_to_kuksa and client is None and not KUKSA_AVAILABLE:
         print("kuksa-client not available; set publish_to_kuksa=False or install kuksa-client")
         publish_to_kuksa = False
 
-    client = None
-    if publish_to_kuksa:
-        client = VSSClient(BROKER_IP, BROKER_PORT)
+    handle = None
+    if publish_to_kuksa and client is None:
+        handle = client = CONNECTIONS.acquire(BROKER_IP, BROKER_PORT, factory=VSSClient)
 
-    if publish_to_kuksa:
-        client.__enter__()
+    batch = []
+    types = {}
+    rows = updates = rpcs = 0
+    max_lag = total_lag = 0.0
+    t_first = None
+    start = time.perf_counter()
 
-    with open(gap_csv, newline='') as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            t = float(r["time_s"])
-            ego_speed = float(r["ego_speed"]) if r["ego_speed"] else 0.0
-            dist = float(r["distance_m"]) if r["distance_m"] else None
+    try:
+        if publish_to_kuksa:
+            types = _value_types(client)
+            rpcs += 1
+        for t, ego_speed, dist in _rows(gap_csv):
+            if mode == "realtime":
+                if t_first is None:
+                    t_first = t
+                due = start + (t - t_first) / speedup
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                lag = max(0.0, time.perf_counter() - due)
+                total_lag += lag
+                max_lag = max(max_lag, lag)
 
             target, action = decide_target(ego_speed, dist)
-            print(f"[REPLAY] t={t:.2f} ego_sp={ego_speed:.1f} dist={dist} -> target={target:.1f} action={action}")
+            if not quiet:
+                print(f"[REPLAY] t={t:.2f} ego_sp={ego_speed:.1f} dist={dist} -> target={target:.1f} action={action}")
 
             if publish_to_kuksa:
-                payload = {SIG_SPEED: float(ego_speed)}
+                row = [(SIG_SPEED, float(ego_speed))]
                 if dist is not None:
-                    payload[SIG_DISTANCE] = float(dist)
-                client.set_current_values(payload)
-                client.set_current_values({SIG_TARGET: float(target)})
+                    row.append((SIG_DISTANCE, float(dist)))
+                row.append((SIG_TARGET, float(target)))
+                batch.append(row)
+                updates += len(row)
+                if len(batch) >= batch_rows:
+                    rpcs += _publish(client, batch, types)
+                    batch = []
+            rows += 1
+
+            if mode == "step":
+                time.sleep(step_s)
+
+        if batch:
+            rpcs += _publish(client, batch, types)
+    finally:
+        if handle is not None:
+            handle.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "rows": rows,
+        "updates": updates,
+        "rpcs": rpcs,
+        "elapsed_s": elapsed,
+        "rows_per_s": rows / elapsed if elapsed > 0 else 0.0,
+        "updates_per_s": updates / elapsed if elapsed > 0 else 0.0,
+        "mean_lag_s": total_lag / rows if rows and mode == "realtime" else 0.0,
+        "max_lag_s": max_lag,
+    }
+    print(
+        f"[REPLAY] {rows} rows, {updates} updates in {rpcs} RPCs, {elapsed:.3f}s "
+        f"({stats['rows_per_s']:.0f} rows/s, {stats['updates_per_s']:.0f} updates/s)"
+        + (f", lag mean {stats['mean_lag_s'] * 1e3:.2f} ms max {max_lag * 1e3:.2f} ms" if mode == "realtime" else "")
+    )
+    return stats
+
 
-            time.sleep(step_s)
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Replay gap.csv through the ADAS decision logic into the Databroker")
+    p.add_argument("gap_csv")
+    p.add_argument("publish", nargs="?", default="false",
+                   help="True to publish to the Databroker (positional, kept for old invocations)")
+    p.add_argument("--mode", choices=REPLAY_MODES, default="step")
+    p.add_argument("--step", type=float, default=0.1, help="Pause per row in step mode (s)")
+    p.add_argument("--speedup", type=float, default=1.0, help="Time compression in realtime mode")
+    p.add_argument("--batch-rows", type=int, default=1,
+                   help="Rows per Databroker RPC in fast mode; subscribers only see the last row of a batch")
+    p.add_argument("--quiet", action="store_true", help="Only print the final summary")
+    return p.parse_args(argv)
 
-    if publish_to_kuksa:
-        client.__exit__(None, None, None)
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: replay_gap_to_kuksa.py gap.csv [publish_to_kuksa True/False]")
-        sys.exit(1)
-    gap = sys.argv[1]
-    pub = (len(sys.argv) >= 3 and sys.argv[2].lower() == "true")
-    replay(gap, publish_to_kuksa=pub)
\ No newline at end of file
+    args = parse_args()
+    replay(
+        args.gap_csv,
+        publish_to_kuksa=args.publish.lower() == "true",
+        step_s=args.step,
+        mode=args.mode,
+        speedup=args.speedup,
+        batch_rows=args.batch_rows,
+        quiet=args.quiet,
+    )
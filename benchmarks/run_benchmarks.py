@@ -0,0 +1,404 @@
+"""
+Benchmarks for the project's hot paths on synthetic data.
+
+    python benchmarks/run_benchmarks.py                     # small + medium, compare to baseline
+    python benchmarks/run_benchmarks.py --sizes large --only fcd
+    python benchmarks/run_benchmarks.py --update-baseline   # accept current numbers
+
+Results are written to reports/benchmarks.json (git-ignored, see --out).
+Every case is compared with benchmarks/baseline.json; a rate more than
+--tolerance below the baseline is reported as a regression and makes the run
+exit with status 1. Rates depend on the machine, so refresh the baseline
+when the reference machine changes.
+"""
+import argparse
+import contextlib
+import csv
+import importlib.util
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+ADAS = os.path.join(ROOT, "adas")
+if ADAS not in sys.path:
+    sys.path.insert(0, ADAS)  # replay_gap_to_kuksa.py does `from decide import ...`
+
+DEFAULT_REPORT = os.path.join(ROOT, "reports", "benchmarks.json")
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# scale factor per size: samples/rows = 1000 * scale, FCD timesteps = 100 * scale
+SIZES = {"tiny": 1, "small": 10, "medium": 100, "large": 1000}
+FCD_VEHICLES = 10
+
+BENCHMARKS = {}
+
+
+def benchmark(name, unit):
+    """Register fn(scale, workdir) -> (run, work); `run` is timed, `work` is in `unit`."""
+    def register(fn):
+        BENCHMARKS[name] = (fn, unit)
+        return fn
+    return register
+
+
+def load_script(relpath):
+    path = os.path.join(ROOT, relpath)
+    name = "_bench_" + relpath.replace("/", "_").replace("-", "_").replace(".py", "")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ----------------------------------------------------------------------
+# Synthetic data
+# ----------------------------------------------------------------------
+def make_speeds(n, seed=1):
+    rng = random.Random(seed)
+    return [rng.uniform(0.0, 160.0) for _ in range(n)]
+
+
+def make_fcd(path, steps, vehicles=FCD_VEHICLES, dt=0.1, seed=1):
+    """FCD XML with ego, lead and vehicles-2 other cars on two lanes."""
+    rng = random.Random(seed)
+    ids = ["lead", "ego"] + [f"veh{i}" for i in range(vehicles - 2)]
+    pos = {vid: 200.0 - 12.0 * i for i, vid in enumerate(ids)}
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<fcd-export>\n')
+        for s in range(steps):
+            f.write(f'  <timestep time="{s * dt:.2f}">\n')
+            for i, vid in enumerate(ids):
+                speed = max(0.0, 12.0 + rng.uniform(-3.0, 3.0))
+                pos[vid] += speed * dt
+                lane = "e0_0" if i < 2 or i % 2 else "e0_1"
+                y = -1.6 if lane == "e0_0" else 1.6
+                f.write(f'    <vehicle id="{vid}" x="{pos[vid]:.2f}" y="{y:.2f}" angle="90.00" type="car" '
+                        f'speed="{speed:.2f}" pos="{pos[vid]:.2f}" lane="{lane}" slope="0.00"/>\n')
+            f.write("  </timestep>\n")
+        f.write("</fcd-export>\n")
+    return os.path.getsize(path)
+
+
+def make_vehicles_csv(path, rows, vehicles=FCD_VEHICLES, dt=0.1, seed=1):
+    rng = random.Random(seed)
+    ids = ["lead", "ego"] + [f"veh{i}" for i in range(vehicles - 2)]
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["time_s", "veh_id", "x", "y", "speed"])
+        for r in range(rows):
+            step, i = divmod(r, vehicles)
+            w.writerow([round(step * dt, 2), ids[i], round(100 - 12 * i + step * 1.2, 2), -1.6,
+                        round(rng.uniform(9.0, 15.0), 2)])
+
+
+def make_gap_csv(path, rows, dt=0.1, seed=1):
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["time_s", "ego_id", "lead_id", "ego_speed", "lead_speed", "distance_m"])
+        for r in range(rows):
+            w.writerow([round(r * dt, 2), "ego", "lead", round(rng.uniform(0, 15), 2),
+                        round(rng.uniform(0, 15), 2), "" if r % 50 == 0 else round(rng.uniform(1, 30), 2)])
+
+
+# ----------------------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------------------
+@benchmark("on_speed", "samples")
+def bench_on_speed(scale, workdir):
+    from speedMonitor.core import SpeedMonitor, Thresholds
+
+    speeds = make_speeds(1000 * scale)
+    mon = SpeedMonitor(Thresholds(80.0))
+    return (lambda: mon.on_speed(speeds)), len(speeds)
+
+
+@benchmark("on_speed_batch", "samples")
+def bench_on_speed_batch(scale, workdir):
+    from speedMonitor.core import SpeedMonitor, Thresholds
+
+    speeds = make_speeds(1000 * scale)
+    mon = SpeedMonitor(Thresholds(80.0))
+    return (lambda: mon.on_speed_batch(speeds)), len(speeds)
+
+
+@benchmark("detectors", "samples")
+def bench_detectors(scale, workdir):
+    from speedMonitor.core import SIG_SPEED
+    from speedMonitor.detectors import DetectorBank, default_detectors
+
+    n = 10000 * scale
+    speeds = make_speeds(n)
+    stamps = [i * 1e-5 for i in range(n)]       # 100 kHz stream
+    bank = DetectorBank(default_detectors())
+
+    def run():
+        bank.reset()
+        bank.update_many(SIG_SPEED, speeds, stamps)
+    return run, n
+
+
+@benchmark("pipeline", "samples")
+def bench_pipeline(scale, workdir):
+    # same stream as "detectors", 16 vehicles sharded over one worker per CPU;
+    # depends on the core count, so it is not part of the stored baseline
+    from speedMonitor.parallel import DetectionPipeline
+
+    n = 10000 * scale
+    speeds = make_speeds(n)
+    stamps = [i * 1e-5 for i in range(n)]
+
+    def run():
+        with DetectionPipeline() as pipe:
+            for k in range(16):
+                pipe.submit_many(f"car{k}", speeds[k::16], stamps[k::16])
+            pipe.finish()
+            for _ in pipe.alerts():
+                pass
+    return run, n
+
+
+def _sink_bench(scale, workdir, **kwargs):
+    from speedMonitor.io import AlertSink
+
+    n = 1000 * scale
+    path = os.path.join(workdir, "alerts.csv")
+
+    def run():
+        sink = AlertSink(path, verbose=False, **kwargs)
+        for i in range(n):
+            sink.write("SPEEDING", 100.0 + i % 50, "speed exceeds 80")
+        sink.close()
+    return run, n
+
+
+@benchmark("sink_write", "rows")
+def bench_sink_write(scale, workdir):
+    return _sink_bench(scale, workdir)
+
+
+@benchmark("sink_write_buffered", "rows")
+def bench_sink_write_buffered(scale, workdir):
+    return _sink_bench(scale, workdir, buffered=True, durability="batch")
+
+
+@benchmark("fcd_adas", "MB")
+def bench_fcd_adas(scale, workdir):
+    mod = load_script("adas/fcd_to_csv.py")
+    xml = os.path.join(workdir, "fcd.xml")
+    size = make_fcd(xml, 100 * scale)
+    out = os.path.join(workdir, "vehicles.csv")
+    return (lambda: mod.fcd_xml_to_csv(xml, out)), size / 1e6
+
+
+@benchmark("fcd_demo", "MB")
+def bench_fcd_demo(scale, workdir):
+    mod = load_script("sumo-acc-demo/fcd_to_csv.py")
+    xml = os.path.join(workdir, "fcd.xml")
+    size = make_fcd(xml, 100 * scale)
+
+    def run():
+        df_scene = mod.stream_fcd(xml, os.path.join(workdir, "fcd_all.csv"))[0]
+        df_scene = mod.mark_brake_and_speeding(df_scene, min_gap_m=2.0, time_headway_s=1.5, ttc_thresh_s=2.0)
+        df_scene.to_csv(os.path.join(workdir, "scenario.csv"), index=False)
+        mod.emit_alerts(df_scene, os.path.join(workdir, "alerts.csv"))
+    return run, size / 1e6
+
+
+@benchmark("fcd_demo_cached", "MB")
+def bench_fcd_demo_cached(scale, workdir):
+    # threshold re-analysis: the columnar cache is built once, every run reads it
+    mod = load_script("sumo-acc-demo/fcd_to_csv.py")
+    xml = os.path.join(workdir, "fcd.xml")
+    size = make_fcd(xml, 100 * scale)
+    all_out = os.path.join(workdir, "fcd_all.csv")
+    mod.load_or_stream_fcd(xml, all_out)
+
+    def run():
+        (df_scene, _, _), hit = mod.load_or_stream_fcd(xml, all_out)
+        assert hit
+        df_scene = mod.mark_brake_and_speeding(df_scene, min_gap_m=2.0, time_headway_s=1.5, ttc_thresh_s=2.0)
+        df_scene.to_csv(os.path.join(workdir, "scenario.csv"), index=False)
+        mod.emit_alerts(df_scene, os.path.join(workdir, "alerts.csv"))
+    return run, size / 1e6
+
+
+@benchmark("compute_gap", "rows")
+def bench_compute_gap(scale, workdir):
+    mod = load_script("adas/compute_gap.py")
+    src = os.path.join(workdir, "vehicles.csv")
+    n = 1000 * scale
+    make_vehicles_csv(src, n)
+    out = os.path.join(workdir, "gap.csv")
+    return (lambda: mod.compute_gap(src, out_csv=out)), n
+
+
+@benchmark("compute_gap_store", "rows")
+def bench_compute_gap_store(scale, workdir):
+    # same input through the indexed FCD store, built once: only ego/lead rows are read
+    from speedMonitor.fcd_store import open_store
+
+    mod = load_script("adas/compute_gap.py")
+    src = os.path.join(workdir, "vehicles.csv")
+    n = 1000 * scale
+    make_vehicles_csv(src, n)
+    out = os.path.join(workdir, "gap.csv")
+    open_store(src).close()
+    return (lambda: mod.compute_gap(src, out_csv=out, store=True)), n
+
+
+@benchmark("decide_target", "decisions")
+def bench_decide_target(scale, workdir):
+    from decide import decide_target
+
+    rng = random.Random(1)
+    n = 10000 * scale
+    inputs = [(rng.uniform(0, 40), None if i % 20 == 0 else rng.uniform(0, 30)) for i in range(n)]
+
+    def run():
+        for speed, dist in inputs:
+            decide_target(speed, dist)
+    return run, n
+
+
+@benchmark("replay", "rows")
+def bench_replay(scale, workdir):
+    from speedMonitor.fake_broker import FakeDatabroker
+
+    mod = load_script("adas/replay_gap_to_kuksa.py")
+    gap = os.path.join(workdir, "gap.csv")
+    n = 1000 * scale
+    make_gap_csv(gap, n)
+    client = FakeDatabroker().client()
+    return (lambda: mod.replay(gap, publish_to_kuksa=True, mode="fast", quiet=True, client=client)), n
+
+
+# ----------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------
+def run_case(name, size, repeat=3):
+    fn, unit = BENCHMARKS[name]
+    scale = SIZES[size]
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir, \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        run, work = fn(scale, workdir)
+        times = []
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - t0)
+    best = min(times)
+    return {
+        "name": name,
+        "size": size,
+        "work": work,
+        "unit": unit,
+        "best_s": best,
+        "mean_s": sum(times) / len(times),
+        "rate": work / best if best > 0 else float("inf"),
+        "rate_unit": f"{unit}/s",
+    }
+
+
+def run_all(names, sizes, repeat=3, log=print):
+    results = {}
+    for size in sizes:
+        for name in names:
+            r = run_case(name, size, repeat)
+            results[f"{name}/{size}"] = r
+            log(f"{name + '/' + size:<28} {r['rate']:>14,.1f} {r['rate_unit']:<14} best {r['best_s'] * 1e3:9.2f} ms")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a message for every case whose rate dropped more than `tolerance` below the baseline."""
+    regressions = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        floor = base["rate"] * (1.0 - tolerance)
+        if r["rate"] < floor:
+            regressions.append(
+                f"{key}: {r['rate']:,.1f} {r['rate_unit']} is {1 - r['rate'] / base['rate']:.0%} "
+                f"below baseline {base['rate']:,.1f}"
+            )
+    return regressions
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get("results", {})
+
+
+def write_report(path, results):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Run the project benchmarks")
+    p.add_argument("--sizes", default="small,medium", help=f"Comma separated, from {', '.join(SIZES)}")
+    p.add_argument("--only", default=None, help="Comma separated name prefixes, e.g. fcd,sink")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per case, the best one counts")
+    p.add_argument("--out", default=DEFAULT_REPORT)
+    p.add_argument("--baseline", default=DEFAULT_BASELINE)
+    p.add_argument("--tolerance", type=float, default=0.3, help="Allowed slowdown vs baseline (0.3 = 30%%)")
+    p.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        raise SystemExit(f"unknown sizes: {unknown}")
+
+    names = list(BENCHMARKS)
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(","))
+        names = [n for n in names if n.startswith(prefixes)]
+
+    results = run_all(names, sizes, args.repeat)
+    write_report(args.out, results)
+    print(f"✅ Wrote {args.out}")
+
+    if args.update_baseline:
+        merged = load_baseline(args.baseline)
+        merged.update(results)
+        write_report(args.baseline, merged)
+        print(f"✅ Updated baseline {args.baseline}")
+        return 0
+
+    regressions = compare(results, load_baseline(args.baseline), args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark regression(s):")
+        for msg in regressions:
+            print(f"  {msg}")
+        return 1
+    print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,9 @@
+import os
 from kuksa_client.grpc import VSSClient, Datapoint
 
-DATABROKER_HOST = 'localhost'
-DATABROKER_PORT = 55556
+# override with KUKSA_DATABROKER_HOST / KUKSA_DATABROKER_PORT, e.g. for python -m speedMonitor.fake_broker
+DATABROKER_HOST = os.environ.get('KUKSA_DATABROKER_HOST', 'localhost')
+DATABROKER_PORT = int(os.environ.get('KUKSA_DATABROKER_PORT', '55556'))
 ACTUATOR_PATH = 'Vehicle.Body.Windshield.Front.Wiping.System.TargetPosition'
 
 print(f"--- Testing Actuator: Setting {ACTUATOR_PATH} ---")
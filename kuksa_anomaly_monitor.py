@@ -5,8 +5,11 @@ sys.path.append(os.path.dirname(__file__))
 
 import argparse, time, signal
 from kuksa_client.grpc import VSSClient, VSSClientError
+from speedMonitor.cooldown import Cooldown
 from speedMonitor.core import SpeedMonitor, Thresholds
 from speedMonitor.io import AlertSink
+from speedMonitor.parallel import DetectionPipeline
+from speedMonitor.rules import OVERSPEED, brake_accel_conflict_rule, load_rules
 
 # --- 1. Argument Parsing ---
 def parse_args():
@@ -16,13 +19,45 @@ def parse_args():
     p.add_argument("--max-speed", type=float, default=80.0)
     p.add_argument("--csv", default="alerts.csv")
     p.add_argument("--hz", type=float, default=1.0, help="Polling frequency in Hz")
+    p.add_argument("--max-brake-accel", type=float, default=None,
+                   help="Log CRITICAL_CONFLICT when brake and accelerator pedal both exceed this percent")
+    p.add_argument("--rules", default=None, help="JSON rule file with extra rules (see config/rules.json)")
+    p.add_argument("--workers", type=int, default=0,
+                   help="Run speed detection (threshold + streaming detectors) in a worker process "
+                        "instead of the polling loop. The monitor polls one Vehicle.Speed, i.e. one "
+                        "key, so more than one worker adds no parallelism and is capped at 1")
+    p.add_argument("--cooldown", type=float, default=None,
+                   help="Log a repeated alert of the same kind and source at most once per this many seconds")
     return p.parse_args()
 
+
+def poll_samples(c, mon, period, is_running, rules=()):
+    """
+    Ingestion side of the --workers pipeline: yields (key, speed, t) per poll.
+    There is a single key, Vehicle.Speed, so all samples go to one worker.
+    """
+    while is_running():
+        cur = c.get_current_values(mon.paths)
+        now = time.time()
+        if rules:
+            mon.evaluate({p: getattr(dp, "value", None) for p, dp in cur.items()}, now)
+        speed = getattr(cur.get("Vehicle.Speed"), "value", None)
+        if speed is not None:
+            yield "Vehicle.Speed", float(speed), now
+        time.sleep(period)
+
 # --- 2. Main Execution (POLLING METHOD) ---
 def main():
     args = parse_args()
-    mon  = SpeedMonitor(Thresholds(args.max_speed))
-    sink = AlertSink(args.csv)
+    # the pipeline writes alerts from two threads, the buffered sink serialises them
+    sink = AlertSink(args.csv, buffered=args.workers > 0,
+                     cooldown=Cooldown(args.cooldown) if args.cooldown else None)
+    # speed alerts keep coming from on_speed(); the extra rules are evaluated on the same poll
+    rules = [r for r in (load_rules(args.rules) if args.rules else []) if r.name != OVERSPEED]
+    if args.max_brake_accel is not None:
+        rules.append(brake_accel_conflict_rule(args.max_brake_accel))
+    mon  = SpeedMonitor(Thresholds(args.max_speed), rules=rules,
+                        on_alert=lambda a: sink.write(a.kind, a.speed, a.reason, a.rule or ""))
 
     c = VSSClient(args.host, args.port)
     
@@ -40,11 +75,22 @@ def main():
             nonlocal running; running = False
         signal.signal(signal.SIGINT, _stop)
         signal.signal(signal.SIGTERM, _stop)
-        
+
+        if args.workers > 0:
+            if args.workers > 1:
+                print("--workers: one signal is polled, so detection runs in 1 worker process")
+            with DetectionPipeline(workers=1, max_speed=args.max_speed) as pipe:
+                pipe.start_ingest(poll_samples(c, mon, period, lambda: running, rules))
+                for a in pipe.alerts():
+                    sink.write(a.kind, a.speed, a.reason, a.key)
+            return
+
         while running:
             # 1. SYNCHRONOUSLY GET DATA
-            cur = c.get_current_values(["Vehicle.Speed"])
+            cur = c.get_current_values(mon.paths)
             speed = cur["Vehicle.Speed"].value
+            if rules:
+                mon.evaluate({p: getattr(dp, "value", None) for p, dp in cur.items()}, time.time())
 
             # 2. RUN MONITOR LOGIC
             alerts = mon.on_speed(speed)
@@ -52,7 +98,7 @@ def main():
             # 3. LOG ALERTS using the required sink.write() method
             for a in alerts:
                 # Use the Alert object's properties to call the sink.write function
-                sink.write(a.kind, a.speed, a.reason)
+                sink.write(a.kind, a.speed, a.reason, a.rule or "")
 
             # 4. PAUSE
             time.sleep(period)
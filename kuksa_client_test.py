@@ -1,8 +1,10 @@
+import os
 from kuksa_client.grpc import VSSClient, VSSClientError
 
 # The Data Broker is accessible on localhost:55556 (external port)
-DATABROKER_HOST = 'localhost'
-DATABROKER_PORT = 55556
+# override with KUKSA_DATABROKER_HOST / KUKSA_DATABROKER_PORT, e.g. for python -m speedMonitor.fake_broker
+DATABROKER_HOST = os.environ.get('KUKSA_DATABROKER_HOST', 'localhost')
+DATABROKER_PORT = int(os.environ.get('KUKSA_DATABROKER_PORT', '55556'))
 
 print(f"Attempting to connect to {DATABROKER_HOST}:{DATABROKER_PORT}...")
 
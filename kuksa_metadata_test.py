@@ -1,8 +1,10 @@
 from kuksa_client.grpc import VSSClient
+import os
 import sys # Import the system module
 
-DATABROKER_HOST = 'localhost'
-DATABROKER_PORT = 55556
+# override with KUKSA_DATABROKER_HOST / KUKSA_DATABROKER_PORT, e.g. for python -m speedMonitor.fake_broker
+DATABROKER_HOST = os.environ.get('KUKSA_DATABROKER_HOST', 'localhost')
+DATABROKER_PORT = int(os.environ.get('KUKSA_DATABROKER_PORT', '55556'))
 SIGNAL_PATH = 'Vehicle.Speed'
 
 print(f"--- Verifying Metadata for {SIGNAL_PATH} ---")
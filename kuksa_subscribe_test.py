@@ -1,7 +1,9 @@
+import os
 from kuksa_client.grpc import VSSClient, VSSClientError
 
-DATABROKER_HOST = 'localhost'
-DATABROKER_PORT = 55556
+# override with KUKSA_DATABROKER_HOST / KUKSA_DATABROKER_PORT, e.g. for python -m speedMonitor.fake_broker
+DATABROKER_HOST = os.environ.get('KUKSA_DATABROKER_HOST', 'localhost')
+DATABROKER_PORT = int(os.environ.get('KUKSA_DATABROKER_PORT', '55556'))
 SIGNAL_PATH = 'Vehicle.Speed'
 
 print(f"Attempting to subscribe to {SIGNAL_PATH} at {DATABROKER_HOST}:{DATABROKER_PORT}...")
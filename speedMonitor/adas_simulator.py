@@ -1,16 +1,31 @@
-import traci
+import argparse
 import time
 from kuksa_client.grpc import VSSClient, Datapoint
+from adas.decide import decide_target
+from speedMonitor.brake_controller import AutoBrakeSystem
+from speedMonitor.connection import CONNECTIONS
+from speedMonitor import sumo_backend
+from speedMonitor.sumo_backend import (
+    VAR_DEPARTED_VEHICLES_IDS, VAR_LEADER, VAR_MIN_EXPECTED_VEHICLES, VAR_SPEED, VAR_TIME,
+)
 
 SUMO_BINARY = "sumo"   # or "sumo-gui" if you want visuals
 CONFIG_FILE = "sumo_scenarios/simple_highway/sumo_config.sumocfg"
 SPEED_SIGNAL = "Vehicle.Speed"
 DIST_SIGNAL = "Vehicle.Distance"
+MIN_DIST_M = 10
+LEADER_LOOKAHEAD_M = 200.0
 
-def run_sumo_adas(ip="127.0.0.1", port=55556):
-    traci.start([SUMO_BINARY, "-c", CONFIG_FILE])
+def run_sumo_adas(ip="127.0.0.1", port=55556, backend="auto"):
+    # libsumo (in-process) when available, otherwise SUMO over the TraCI socket
+    traci = sumo_backend.start(["-c", CONFIG_FILE], backend=backend, binary=SUMO_BINARY)
 
-    with VSSClient(ip, port) as client:
+    # one brake controller for the whole run; its ramp is advanced by tick()
+    # each step so the simulation keeps running while it brakes
+    brake = AutoBrakeSystem(ip=ip, port=port, threshold=20)
+
+    # shares one channel with the brake controller below
+    with CONNECTIONS.acquire(ip, port, factory=VSSClient) as client:
         while traci.simulation.getMinExpectedNumber() > 0:
             traci.simulationStep()
             vehs = traci.vehicle.getIDList()
@@ -30,11 +45,169 @@ def run_sumo_adas(ip="127.0.0.1", port=55556):
                 })
 
                 # Safety logic
-                if dist < 10:
-                    print("[ADAS] 🚨 Too close! Triggering AutoBrake...")
-                    from speedMonitor.brake_controller import AutoBrakeSystem
-                    AutoBrakeSystem(threshold=20).engage_brake(speed)
+                if dist < MIN_DIST_M:
+                    if not brake.active:
+                        print("[ADAS] 🚨 Too close! Triggering AutoBrake...")
+                        brake.engage_brake(speed, blocking=False)
+                    else:
+                        brake.observe(speed)
+                else:
+                    brake.cancel("gap restored")
+            else:
+                brake.cancel("lead vehicle lost")
 
+            brake.tick()
             time.sleep(0.5)
 
-    traci.close()
\ No newline at end of file
+    brake.close()
+    traci.close()
+
+
+# ----------------------------------------------------------------------
+# Headless closed loop: decide_target() for every vehicle, every step
+# ----------------------------------------------------------------------
+def plan_step(results):
+    """
+    One batched pass over a step's subscription results ({veh_id: {var: value}}).
+    Returns (commands, actions): commands are ("slowDown" | "setSpeed", veh_id,
+    target m/s) and actions counts the decide_target() outcomes.
+
+    decide_target() works in km/h here. SOFT_BRAKE eases down with slowDown()
+    over one step, HARD_BRAKE pins the target with setSpeed() until a later
+    decision releases the vehicle (setSpeed -1) back to SUMO's car following.
+    """
+    commands = []
+    actions = {}
+    for vid, res in results.items():
+        speed_kmh = res[VAR_SPEED] * 3.6
+        leader = res.get(VAR_LEADER)
+        gap = leader[1] if leader and leader[0] else None
+
+        target_kmh, action = decide_target(speed_kmh, gap)
+        actions[action] = actions.get(action, 0) + 1
+        if action == "HARD_BRAKE":
+            commands.append(("setSpeed", vid, target_kmh / 3.6))
+        elif action == "SOFT_BRAKE":
+            commands.append(("slowDown", vid, target_kmh / 3.6))
+    return commands, actions
+
+
+def run_closed_loop(
+    config=CONFIG_FILE,
+    backend="auto",
+    step_length=None,
+    realtime=False,
+    speedup=1.0,
+    max_steps=None,
+    quiet=False,
+):
+    """
+    Drive every vehicle in the scenario through decide_target() each step and
+    feed the targets back into SUMO. Runs as fast as SUMO can step unless
+    realtime=True, which paces steps to simulation time / speedup (anchored
+    to the start, so slow steps do not accumulate drift).
+    Returns a summary dict (steps, vehicle_steps, actions, elapsed_s, ...).
+    """
+    args = ["-c", config]
+    if step_length is not None:
+        args += ["--step-length", str(step_length)]
+    traci = sumo_backend.start(args, backend=backend, binary=SUMO_BINARY)
+
+    def subscribe(vid):
+        # one subscription per vehicle: speed and leader arrive with every step
+        traci.vehicle.subscribe(vid, (VAR_SPEED, VAR_LEADER),
+                                parameters={VAR_LEADER: ("d", LEADER_LOOKAHEAD_M)})
+
+    traci.simulation.subscribe((VAR_TIME, VAR_MIN_EXPECTED_VEHICLES, VAR_DEPARTED_VEHICLES_IDS))
+    for vid in traci.vehicle.getIDList():
+        subscribe(vid)
+    sim = traci.simulation.getSubscriptionResults()
+    duration_ms = int(traci.simulation.getDeltaT() * 1000)     # slowDown() spans one step
+
+    held = set()        # vehicles pinned with setSpeed()
+    actions = {}
+    steps = vehicle_steps = commands_sent = 0
+    t_first = None
+    start = time.perf_counter()
+    try:
+        while sim[VAR_MIN_EXPECTED_VEHICLES] > 0 and (max_steps is None or steps < max_steps):
+            traci.simulationStep()
+            sim = traci.simulation.getSubscriptionResults()
+            t = sim[VAR_TIME]
+            for vid in sim[VAR_DEPARTED_VEHICLES_IDS]:
+                subscribe(vid)
+
+            results = traci.vehicle.getAllSubscriptionResults()
+            commands, step_actions = plan_step(results)
+            for action, n in step_actions.items():
+                actions[action] = actions.get(action, 0) + n
+
+            pinned = set()
+            for method, vid, target_ms in commands:
+                if method == "setSpeed":
+                    traci.vehicle.setSpeed(vid, target_ms)
+                    pinned.add(vid)
+                else:
+                    traci.vehicle.slowDown(vid, target_ms, duration_ms)
+            for vid in held - pinned:
+                if vid in results:
+                    traci.vehicle.setSpeed(vid, -1)
+            held = pinned
+            commands_sent += len(commands)
+
+            steps += 1
+            vehicle_steps += len(results)
+            if not quiet:
+                print(f"[ADAS] t={t:.1f} vehicles={len(results)} commands={len(commands)}")
+
+            if realtime:
+                if t_first is None:
+                    t_first = t
+                delay = start + (t - t_first) / speedup - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+    finally:
+        traci.close()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "steps": steps,
+        "vehicle_steps": vehicle_steps,
+        "commands": commands_sent,
+        "actions": actions,
+        "elapsed_s": elapsed,
+        "vehicle_steps_per_s": vehicle_steps / elapsed if elapsed > 0 else 0.0,
+        "backend": sumo_backend.backend_name(traci),
+    }
+    print(f"[ADAS] {steps} steps, {vehicle_steps} vehicle-steps, {commands_sent} commands in {elapsed:.2f}s "
+          f"({summary['vehicle_steps_per_s']:.0f} vehicle-steps/s, {summary['backend']})")
+    return summary
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="SUMO-driven ADAS simulator")
+    p.add_argument("--closed-loop", action="store_true",
+                   help="Headless: apply decide_target() to every vehicle instead of publishing to KUKSA")
+    p.add_argument("--config", default=CONFIG_FILE)
+    p.add_argument("--backend", choices=sumo_backend.BACKENDS, default="auto")
+    p.add_argument("--step-length", type=float, default=None)
+    p.add_argument("--realtime", action="store_true", help="Pace the closed loop to simulation time")
+    p.add_argument("--speedup", type=float, default=1.0, help="Time compression with --realtime")
+    p.add_argument("--max-steps", type=int, default=None)
+    p.add_argument("--quiet", action="store_true")
+    p.add_argument("--ip", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=55556)
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.closed_loop:
+        run_closed_loop(args.config, args.backend, args.step_length, args.realtime,
+                        args.speedup, args.max_steps, args.quiet)
+    else:
+        run_sumo_adas(args.ip, args.port, args.backend)
+
+
+if __name__ == "__main__":
+    main()
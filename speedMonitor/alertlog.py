@@ -0,0 +1,292 @@
+"""
+Compact append-only binary alert log.
+
+A log is two files:
+  <name>          16-byte header followed by fixed-width 40-byte records
+  <name>.strings  string table (one entry per line) for kinds, vehicle ids
+                  and reasons; records store indices into it
+
+The reader memory-maps the record file, so loading weeks of alerts is a
+single mmap plus one read of the string table.
+"""
+import argparse
+import csv
+import math
+import os
+import re
+import struct
+import time
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # writer works without numpy, the reader needs it
+    np = None
+
+MAGIC = b"KALERT1\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHHB3x")          # magic, version, record size, schema
+RECORD = struct.Struct("<dddIII4x")         # timestamp, speed, distance, vehicle, reason, kind
+NO_STRING = 0xFFFFFFFF
+
+# CSV layouts produced in this project
+SCHEMA_SINK = 0        # AlertSink: timestamp,kind,speed,reason
+SCHEMA_SCENARIO = 1    # sumo-acc-demo/fcd_to_csv.py: timestamp,kind,speed,distance,reason
+SCHEMA_TRACI = 2       # sumo-acc-demo/dump_via_traci.py: time_s,kind,subject,details
+
+SCHEMA_HEADERS = {
+    SCHEMA_SINK: ["timestamp", "kind", "speed", "reason"],
+    SCHEMA_SCENARIO: ["timestamp", "kind", "speed", "distance", "reason"],
+    SCHEMA_TRACI: ["time_s", "kind", "subject", "details"],
+}
+
+SINK_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+if np is not None:
+    RECORD_DTYPE = np.dtype({
+        "names": ["timestamp", "speed", "distance", "vehicle", "reason", "kind"],
+        "formats": ["<f8", "<f8", "<f8", "<u4", "<u4", "<u4"],
+        "offsets": [0, 8, 16, 24, 28, 32],
+        "itemsize": RECORD.size,
+    })
+
+
+def _escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+
+
+_UNESCAPE = re.compile(r"\\(.)")
+
+
+def _unescape(s: str) -> str:
+    if "\\" not in s:
+        return s
+    return _UNESCAPE.sub(lambda m: {"n": "\n", "r": "\r"}.get(m.group(1), m.group(1)), s)
+
+
+def _read_strings(path: str) -> List[str]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8", newline="") as f:
+        data = f.read()
+    if not data:
+        return []
+    return [_unescape(s) for s in data[:-1].split("\n")]
+
+
+class AlertLogWriter:
+    """
+    Appends alerts to a binary log; reopening an existing log continues it
+    (the schema must match the one it was created with). New strings are
+    written through to the string table as they are interned, so a record
+    on disk never points at a string that is not there yet.
+    """
+
+    def __init__(self, path: str, schema: int = SCHEMA_SINK):
+        self.path = path
+        self.strings_path = path + ".strings"
+
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            with open(path, "rb") as f:
+                magic, version, size, existing = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or size != RECORD.size:
+                raise ValueError(f"{path} is not an alert log (version {version})")
+            if existing != schema:
+                raise ValueError(f"{path} was written with schema {existing}, cannot append schema {schema}")
+            self.file = open(path, "ab")
+        else:
+            self.file = open(path, "wb")
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, schema))
+
+        self.schema = schema
+        self._strings: Dict[str, int] = {s: i for i, s in enumerate(_read_strings(self.strings_path))}
+        self.strings_file = open(self.strings_path, "a", encoding="utf-8", newline="")
+
+    def _intern(self, s: Optional[str]) -> int:
+        if s is None:
+            return NO_STRING
+        idx = self._strings.get(s)
+        if idx is None:
+            idx = len(self._strings)
+            self._strings[s] = idx
+            self.strings_file.write(_escape(s) + "\n")
+            # the record buffer may reach the disk at any time, the string must be there first
+            self.strings_file.flush()
+        return idx
+
+    def write(
+        self,
+        timestamp: float,
+        kind: str,
+        speed: float = math.nan,
+        distance: float = math.nan,
+        vehicle: Optional[str] = None,
+        reason: Optional[str] = None,
+    ):
+        self.file.write(RECORD.pack(
+            timestamp, speed, distance,
+            self._intern(vehicle), self._intern(reason), self._intern(kind),
+        ))
+
+    def flush(self):
+        self.strings_file.flush()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.strings_file.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class AlertLog:
+    """Memory-mapped view of a binary alert log."""
+
+    def __init__(self, path: str):
+        if np is None:
+            raise ImportError("reading alert logs requires numpy")
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, size, schema = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or size != RECORD.size:
+            raise ValueError(f"{path} is not an alert log (version {version})")
+        self.schema = schema
+
+        n = (os.path.getsize(path) - HEADER.size) // RECORD.size
+        if n:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(n,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        self._strings = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def strings(self) -> List[str]:
+        if self._strings is None:
+            self._strings = _read_strings(self.path + ".strings")
+        return self._strings
+
+    def decode(self, codes) -> List[Optional[str]]:
+        strings = self.strings
+        return [None if c == NO_STRING else strings[c] for c in codes.tolist()]
+
+    def columns(self) -> Dict[str, "np.ndarray"]:
+        """Raw columns; kind/vehicle/reason are string-table codes."""
+        return {name: self.records[name] for name in RECORD_DTYPE.names}
+
+    def to_dataframe(self, reasons: bool = True):
+        import pandas as pd
+
+        categories = pd.Index(self.strings, dtype=object)
+
+        def column(codes):
+            # string-table codes map straight onto categorical codes
+            codes = codes.astype(np.int64)
+            codes[codes == NO_STRING] = -1
+            return pd.Categorical.from_codes(codes, categories=categories)
+
+        df = pd.DataFrame({
+            "timestamp": np.asarray(self.records["timestamp"]),
+            "kind": column(self.records["kind"]).remove_unused_categories(),
+            "speed": np.asarray(self.records["speed"]),
+            "distance": np.asarray(self.records["distance"]),
+            "vehicle": column(self.records["vehicle"]),
+        })
+        if reasons:
+            df["reason"] = column(self.records["reason"])
+        return df
+
+
+def open_alert_log(path: str) -> AlertLog:
+    return AlertLog(path)
+
+
+def _float(value: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def csv_to_alert_log(csv_path: str, log_path: str) -> int:
+    """Convert any of the project's alert CSV layouts into a binary log."""
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        schema = next((s for s, h in SCHEMA_HEADERS.items() if h == header), None)
+        if schema is None:
+            raise ValueError(f"unknown alert CSV header: {header}")
+
+        n = 0
+        with AlertLogWriter(log_path, schema) as log:
+            for row in reader:
+                if schema == SCHEMA_SINK:
+                    ts = time.mktime(time.strptime(row[0], SINK_TIME_FORMAT))
+                    log.write(ts, row[1], _float(row[2]), reason=row[3])
+                elif schema == SCHEMA_SCENARIO:
+                    log.write(_float(row[0]), row[1], _float(row[2]), _float(row[3]), reason=row[4])
+                else:
+                    log.write(_float(row[0]), row[1], vehicle=row[2], reason=row[3])
+                n += 1
+    return n
+
+
+def alert_log_to_csv(log_path: str, csv_path: str) -> int:
+    """Write a binary log back out in the CSV layout it was created from."""
+    log = AlertLog(log_path)
+    strings = log.strings
+    rec = log.records
+
+    def s(code):
+        return "" if code == NO_STRING else strings[code]
+
+    def num(v):
+        return "" if math.isnan(v) else v
+
+    with open(csv_path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(SCHEMA_HEADERS[log.schema])
+        for ts, speed, dist, veh, reason, kind in zip(
+            rec["timestamp"].tolist(), rec["speed"].tolist(), rec["distance"].tolist(),
+            rec["vehicle"].tolist(), rec["reason"].tolist(), rec["kind"].tolist(),
+        ):
+            if log.schema == SCHEMA_SINK:
+                w.writerow([time.strftime(SINK_TIME_FORMAT, time.localtime(ts)), s(kind), num(speed), s(reason)])
+            elif log.schema == SCHEMA_SCENARIO:
+                w.writerow([ts, s(kind), num(speed), num(dist), s(reason)])
+            else:
+                w.writerow([ts, s(kind), s(veh), s(reason)])
+    return len(log)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Convert alert CSV files to/from the binary alert log")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    to_bin = sub.add_parser("to-bin", help="alerts.csv -> binary log")
+    to_bin.add_argument("csv")
+    to_bin.add_argument("log")
+    to_csv = sub.add_parser("to-csv", help="binary log -> alerts.csv")
+    to_csv.add_argument("log")
+    to_csv.add_argument("csv")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.cmd == "to-bin":
+        n = csv_to_alert_log(args.csv, args.log)
+        print(f"✅ Wrote {args.log} with {n} alerts")
+    else:
+        n = alert_log_to_csv(args.log, args.csv)
+        print(f"✅ Wrote {args.csv} with {n} alerts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Alert record and thresholds shared by the monitor (core.py), the rule
+engine (rules.py) and the streaming detectors (detectors.py).
+"""
+from dataclasses import dataclass
+from typing import Any
+
+SIG_SPEED = "Vehicle.Speed"
+OVERSPEED = "overspeed"     # name of the built-in rule, see rules.overspeed_rule
+
+
+@dataclass
+class Alert:
+    """
+    `speed` is the vehicle speed when the alert was raised (NaN if it is not
+    known, e.g. a rule over pedal signals only). `signal` and `value` are
+    the input that triggered it: the rule's first signal or the detector's
+    signal; they default to Vehicle.Speed and `speed`.
+    """
+    kind: str
+    speed: float
+    reason: str
+    rule: str | None = None   # name of the rule that raised it (rule engine only)
+    signal: str = SIG_SPEED
+    value: Any = None
+
+    def __post_init__(self):
+        if self.value is None and self.signal == SIG_SPEED:
+            self.value = self.speed
+
+
+class Thresholds:
+    def __init__(self, max_speed: float = 100.0):
+        self.max_speed = max_speed
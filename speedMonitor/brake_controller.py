@@ -1,36 +1,133 @@
+import threading
 import time
 from kuksa_client.grpc import VSSClient, Datapoint
+from speedMonitor.connection import CONNECTIONS
+from speedMonitor.metrics import METRICS
 
 SPEED_SIGNAL = "Vehicle.Speed"
 
 class AutoBrakeSystem:
-    def __init__(self, ip="127.0.0.1", port=55556, threshold=100, reduction_rate=10):
+    def __init__(self, ip="127.0.0.1", port=55556, threshold=100, reduction_rate=10, step_interval=1.0,
+                 metrics=METRICS):
         """
-        AutoBrakeSystem simulates an automatic braking system that 
+        AutoBrakeSystem simulates an automatic braking system that
         slows the vehicle to a safe speed when overspeed is detected.
+
+        The brake ramp is a small state machine: engage_brake(blocking=False)
+        arms it and every tick() applies at most one step (one step per
+        step_interval seconds), so the caller keeps observing samples while
+        braking. The Databroker connection comes from the shared connection
+        manager, so the brake reuses the monitor's channel to the same broker.
         """
         self.ip = ip
         self.port = port
         self.threshold = threshold
         self.reduction_rate = reduction_rate
+        self.step_interval = step_interval
         self.active = False
 
-    def engage_brake(self, current_speed):
-        print(f"[BRAKE] ⚠️ Overspeed detected: {current_speed:.2f} km/h")
-        self.active = True
-
-        with VSSClient(self.ip, self.port) as client:
-            while current_speed > self.threshold:
-                current_speed -= self.reduction_rate
-                if current_speed < 0:
-                    current_speed = 0
-
-                try:
-                    client.set_current_values({SPEED_SIGNAL: Datapoint(current_speed)})
-                    print(f"[BRAKE] Applying brakes... Speed = {current_speed:.2f}")
-                except Exception as e:
-                    print(f"[BRAKE] Error setting speed: {e}")
-                time.sleep(1)
-
-        print("[BRAKE] Vehicle speed normalized.")
-        self.active = False
\ No newline at end of file
+        self.current_speed = None
+        self.next_step_at = 0.0
+        self.metrics = metrics
+        self._engaged_at = None
+        self._lock = threading.RLock()
+        self._client = None
+
+    # ------------------------------------------------------------------
+    # Connection
+    # ------------------------------------------------------------------
+    def _connect(self):
+        if self._client is None:
+            self._client = CONNECTIONS.acquire(self.ip, self.port, factory=VSSClient)
+        return self._client
+
+    def close(self):
+        """Release the Databroker connection (it is reacquired on the next step)."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+            self._client = None
+
+    # ------------------------------------------------------------------
+    # State machine
+    # ------------------------------------------------------------------
+    def engage_brake(self, current_speed, blocking=True):
+        """
+        Start a brake ramp from current_speed. With blocking=True (the old
+        behaviour) this returns once the speed is normalized; otherwise the
+        ramp is advanced by tick() calls.
+        """
+        with self._lock:
+            print(f"[BRAKE] ⚠️ Overspeed detected: {current_speed:.2f} km/h")
+            self.active = True
+            self.current_speed = current_speed
+            self.next_step_at = time.monotonic()
+            self._engaged_at = time.perf_counter()
+
+        if blocking:
+            self.run()
+
+    def run(self):
+        """Block until the current ramp is finished or cancelled."""
+        while self.tick():
+            time.sleep(max(0.0, self.next_step_at - time.monotonic()))
+
+    def tick(self, now=None):
+        """Apply one ramp step if it is due. Returns True while braking."""
+        with self._lock:
+            if not self.active:
+                return False
+            now = time.monotonic() if now is None else now
+            if now < self.next_step_at:
+                return True
+
+            if self.current_speed <= self.threshold:
+                self._finish("[BRAKE] Vehicle speed normalized.")
+                return False
+
+            self.current_speed -= self.reduction_rate
+            if self.current_speed < 0:
+                self.current_speed = 0
+
+            try:
+                sent = time.perf_counter()
+                self._connect().set_current_values({SPEED_SIGNAL: Datapoint(self.current_speed)})
+                self.metrics.elapsed("actuator_write", sent)
+                if self._engaged_at is not None:
+                    self.metrics.elapsed("engage_to_command", self._engaged_at)
+                    self._engaged_at = None
+                print(f"[BRAKE] Applying brakes... Speed = {self.current_speed:.2f}")
+            except Exception as e:
+                # the shared channel is marked broken and reconnects on the next step
+                print(f"[BRAKE] Error setting speed: {e}")
+
+            self.next_step_at = now + self.step_interval
+            if self.current_speed <= self.threshold:
+                self._finish("[BRAKE] Vehicle speed normalized.")
+            return self.active
+
+    def observe(self, speed):
+        """Feed a measured speed: a ramp never commands more than what is measured."""
+        with self._lock:
+            if not self.active:
+                return
+            if speed <= self.threshold:
+                self._finish("[BRAKE] Vehicle speed normalized.")
+            elif speed < self.current_speed:
+                self.current_speed = speed
+
+    def retarget(self, threshold):
+        """Change the speed the ramp brakes down to."""
+        with self._lock:
+            self.threshold = threshold
+            if self.active and self.current_speed <= threshold:
+                self._finish("[BRAKE] Vehicle speed normalized.")
+
+    def cancel(self, reason="cancelled"):
+        with self._lock:
+            if self.active:
+                self._finish(f"[BRAKE] Brake released ({reason}).")
+
+    def _finish(self, message):
+        print(message)
+        self.active = False
@@ -0,0 +1,238 @@
+import inspect
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from kuksa_client.grpc import VSSClient
+
+
+class _Entry:
+    def __init__(self, factory, host, port, kwargs):
+        self.factory = factory
+        self.host = host
+        self.port = port
+        self.kwargs = kwargs
+        self.refs = 0
+        self.closed = False
+        self.channel: Optional["_Channel"] = None
+        # serialises connecting and health checks of this key only
+        self.lock = threading.Lock()
+
+
+class _Channel:
+    """One opened client; `active` counts the calls and streams running on it."""
+    def __init__(self, entry: _Entry, conn, client, now: float):
+        self.entry = entry
+        self.conn = conn
+        self.client = client
+        self.last_check = now
+        self.active = 0
+        self.stale = False
+
+
+class SharedClient:
+    """
+    Handle returned by ConnectionManager.acquire(). Behaves like a VSSClient;
+    a failing call marks the shared channel as broken so the next call
+    reconnects. Calls and streams already running on the old channel are
+    left alone, it is closed once the last of them is done. close() (or
+    leaving the `with` block) releases the handle.
+    """
+    def __init__(self, manager: "ConnectionManager", key: Tuple):
+        self._manager = manager
+        self._key = key
+        self._released = False
+
+    def __getattr__(self, name):
+        manager, key = self._manager, self._key
+        channel = manager._checkout(key, health_check=False)
+        try:
+            attr = getattr(channel.client, name)
+        finally:
+            manager._checkin(channel)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            # look the method up again: the channel may have been replaced since
+            channel = manager._checkout(key)
+            try:
+                result = getattr(channel.client, name)(*args, **kwargs)
+            except Exception:
+                manager.invalidate(key, channel)
+                manager._checkin(channel)
+                raise
+            if inspect.isgenerator(result):
+                return self._guard(result, channel)
+            manager._checkin(channel)
+            return result
+        return call
+
+    def _guard(self, stream, channel: _Channel):
+        # subscriptions fail while iterating, not when they are created
+        try:
+            yield from stream
+        except Exception:
+            self._manager.invalidate(self._key, channel)
+            raise
+        finally:
+            self._manager._checkin(channel)
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._manager.release(self._key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ConnectionManager:
+    """
+    Process-wide pool of Databroker connections keyed by host, port and
+    credentials. Handles are reference counted: the channel is opened on
+    first use, shared by every holder and closed when the last handle is
+    released. A connection idle for more than health_interval seconds is
+    checked with get_server_info() before it is handed out again.
+    Connecting and health checks only hold the lock of their own key, so a
+    slow or unreachable broker does not stall handles to other brokers.
+    """
+    def __init__(self, health_interval: float = 30.0):
+        self.health_interval = health_interval
+        self._entries: Dict[Tuple, _Entry] = {}
+        self._lock = threading.RLock()
+
+    def acquire(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 55556,
+        token: Optional[str] = None,
+        root_certificates=None,
+        tls_server_name: Optional[str] = None,
+        factory=VSSClient,
+    ) -> SharedClient:
+        kwargs = {}
+        if token is not None:
+            kwargs["token"] = token
+        if root_certificates is not None:
+            kwargs["root_certificates"] = root_certificates
+        if tls_server_name is not None:
+            kwargs["tls_server_name"] = tls_server_name
+
+        # different client classes (e.g. test doubles) never share a channel
+        key = (host, int(port), token, str(root_certificates), tls_server_name, factory)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(factory, host, port, kwargs)
+            entry.refs += 1
+        return SharedClient(self, key)
+
+    def release(self, key: Tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            del self._entries[key]
+        self._close_entry(entry)
+
+    def invalidate(self, key: Tuple, channel: Optional[_Channel] = None):
+        """
+        Drop the channel of `key` (only if it still is `channel`, when given);
+        the next call reconnects.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return
+        with entry.lock:
+            if channel is None:
+                channel = entry.channel
+            if channel is not None:
+                self._retire(entry, channel)
+
+    def _checkout(self, key: Tuple, health_check: bool = True) -> _Channel:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            raise RuntimeError("connection handle used after close()")
+
+        with entry.lock:
+            if entry.closed:
+                raise RuntimeError("connection handle used after close()")
+            channel = entry.channel
+            now = time.monotonic()
+            if health_check and channel is not None and now - channel.last_check > self.health_interval:
+                channel.last_check = now
+                try:
+                    channel.client.get_server_info()
+                except Exception as e:
+                    print(f"[CONN] {entry.host}:{entry.port} failed health check ({e}), reconnecting")
+                    self._retire(entry, channel)
+                    channel = None
+
+            if channel is None:
+                conn = entry.factory(entry.host, entry.port, **entry.kwargs)
+                channel = entry.channel = _Channel(entry, conn, conn.__enter__(), now)
+            channel.active += 1
+            return channel
+
+    def _checkin(self, channel: _Channel):
+        with channel.entry.lock:
+            channel.active -= 1
+            if channel.stale and channel.active <= 0:
+                self._disconnect(channel)
+
+    def _retire(self, entry: _Entry, channel: _Channel):
+        # entry.lock held: new calls get a fresh channel, running ones finish on this one
+        if entry.channel is channel:
+            entry.channel = None
+        channel.stale = True
+        if channel.active <= 0:
+            self._disconnect(channel)
+
+    def _close_entry(self, entry: _Entry):
+        with entry.lock:
+            entry.closed = True
+            if entry.channel is not None:
+                self._retire(entry, entry.channel)
+
+    @staticmethod
+    def _disconnect(channel: _Channel):
+        if channel.conn is not None:
+            try:
+                channel.conn.__exit__(None, None, None)
+            except Exception:
+                pass
+        channel.conn = None
+        channel.client = None
+
+    def stats(self) -> Dict[str, int]:
+        """Open channels and handles, keyed by host:port."""
+        with self._lock:
+            out: Dict[str, int] = {}
+            for e in self._entries.values():
+                name = f"{e.host}:{e.port}"
+                out[name] = out.get(name, 0) + e.refs
+            return out
+
+    def close_all(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._close_entry(entry)
+
+
+# default process-wide manager used by the monitor, brake controller and simulators
+CONNECTIONS = ConnectionManager()
+
+
+def shared_client(host: str = "127.0.0.1", port: int = 55556, **kwargs) -> SharedClient:
+    return CONNECTIONS.acquire(host, port, **kwargs)
@@ -0,0 +1,116 @@
+"""
+Bounded alert cooldown / deduplication.
+
+Keyed state such as "when did vehicle v last raise OVERSPEED" grows with
+every subject ever seen unless it is evicted. TtlCache drops an entry
+`ttl` seconds (of the caller's clock: simulation time, sample time or
+wall time) after it was last written and never holds more than
+`max_entries`, evicting the least recently written entry first, so its
+size stays flat however many subjects pass through.
+
+Cooldown builds alert suppression on it, keyed by (subject, kind):
+
+  cooldown = Cooldown(period=2.0)
+  if cooldown.allow("veh42", "OVERSPEED", t):
+      write_alert(...)
+
+It is shared by sumo-acc-demo/dump_via_traci.py, SpeedMonitor(cooldown=...)
+and AlertSink(cooldown=...); the latter two keep every alert when no
+cooldown is given.
+"""
+from collections import OrderedDict
+from typing import Any, Hashable, Iterator, Optional, Tuple
+
+
+class TtlCache:
+    """
+    Mapping with expiry by caller-supplied time and a size cap. Entries are
+    kept in write order, so with a non-decreasing clock expired entries
+    are always at the front and eviction is amortised O(1) per write.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.expired = 0          # entries dropped by the ttl
+        self.evicted = 0          # entries dropped by the size cap
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None, now: Optional[float] = None) -> Any:
+        """Value of `key`, or `default` if missing or (given `now`) expired."""
+        entry = self._data.get(key)
+        if entry is None or (now is not None and now - entry[0] >= self.ttl):
+            return default
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, now: float):
+        data = self._data
+        data[key] = (now, value)
+        data.move_to_end(key)
+        self.expire(now)
+        while len(data) > self.max_entries:
+            data.popitem(last=False)
+            self.evicted += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def expire(self, now: float):
+        """Drop every entry last written `ttl` or more before `now`."""
+        data = self._data
+        while data:
+            key, (stamp, _) = next(iter(data.items()))
+            if now - stamp < self.ttl:
+                break
+            del data[key]
+            self.expired += 1
+
+    def clear(self):
+        self._data.clear()
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        for key, (_, value) in self._data.items():
+            yield key, value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class Cooldown:
+    """
+    Lets one alert per (subject, kind) through every `period` seconds.
+    Entries live `ttl` seconds (default: the period, after which they no
+    longer suppress anything); at most `max_entries` are kept.
+    """
+
+    def __init__(self, period: float, ttl: Optional[float] = None, max_entries: int = 10000):
+        if period <= 0:
+            raise ValueError("period must be positive")
+        self.period = period
+        self.suppressed = 0
+        self._last = TtlCache(max(period, ttl or period), max_entries)
+
+    def allow(self, subject: Hashable, kind: str, now: float) -> bool:
+        """True if the alert may be raised at `now`; it then starts a new period."""
+        key = (subject, kind)
+        last = self._last.get(key, None, now)
+        if last is not None and now - last < self.period:
+            self.suppressed += 1
+            return False
+        self._last.set(key, now, now)
+        return True
+
+    def clear(self):
+        self._last.clear()
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        return len(self._last)
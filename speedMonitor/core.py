@@ -1,24 +1,51 @@
+import threading
 import time
+from datetime import datetime
+from array import array
 from dataclasses import dataclass
-from typing import List, Any
+from typing import List, Any, Iterator, Iterable, Callable
 from collections.abc import Iterable as IterableABC
 
+try:
+    import numpy as np
+except ImportError:  # batch path falls back to array.array
+    np = None
+
 from kuksa_client.grpc import VSSClient
+from speedMonitor.alerts import OVERSPEED, SIG_SPEED, Alert, Thresholds
 from speedMonitor.brake_controller import AutoBrakeSystem
-
-SIG_SPEED = "Vehicle.Speed"
+from speedMonitor.connection import CONNECTIONS
+from speedMonitor.cooldown import Cooldown
+from speedMonitor.detectors import DetectorBank
+from speedMonitor.metrics import METRICS, Metrics, MetricsServer, SummaryReporter
+from speedMonitor.rules import RuleEngine, overspeed_rule
 
 
 @dataclass
-class Alert:
-    kind: str
-    speed: float
-    reason: str
+class AlertBatch:
+    """
+    Columnar SPEEDING alerts produced by SpeedMonitor.on_speed_batch.
+    `indices` point into the input batch; reason strings are only built
+    when an alert is rendered.
+    """
+    indices: Any
+    speeds: Any
+    max_speed: float
+    timestamps: Any = None
+    kind: str = "SPEEDING"
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def reason(self, i: int) -> str:
+        return f"speed {float(self.speeds[i])} exceeds max threshold {self.max_speed}"
 
+    def __iter__(self) -> Iterator[Alert]:
+        for i in range(len(self.indices)):
+            yield Alert(kind=self.kind, speed=float(self.speeds[i]), reason=self.reason(i))
 
-class Thresholds:
-    def __init__(self, max_speed: float = 100.0):
-        self.max_speed = max_speed
+    def to_alerts(self) -> List[Alert]:
+        return list(self)
 
 
 class SpeedMonitor:
@@ -32,21 +59,77 @@ class SpeedMonitor:
         interval: float = 1.0,
         safe_speed: float = 80.0,
         alerts_csv_path: str | None = None,  # kept for compatibility, not used
+        brake_tick: float = 0.1,
+        metrics: Metrics = METRICS,
+        rules: Iterable[Any] = (),
+        on_alert: Callable[[Alert], None] | None = None,
+        detectors: Any = (),
+        cooldown: Cooldown | None = None,
+        resubscribe_backoff: float = 1.0,
+        resubscribe_max_backoff: float = 30.0,
     ):
+        """
+        The live overspeed/hold check is the built-in `overspeed` rule of a
+        RuleEngine (see rules.py); a rule named `overspeed` in `rules`
+        replaces it. Extra `rules` are compiled into the same plan; start()
+        subscribes to every path they read and hands their alerts to
+        on_alert (printed when not given). A RuleEngine passed as `rules`
+        is forked, so many monitors can share one compiled plan.
+
+        `detectors` are streaming anomaly detectors (see detectors.py), a
+        list for Vehicle.Speed or a mapping signal -> list. on_speed() adds
+        their alerts to its result, start() hands them to on_alert.
+
+        `cooldown` (see cooldown.py) suppresses repeats of an alert per
+        (rule or detector, kind) on the sample clock; without it every
+        alert is reported.
+
+        When a live subscription fails or ends, start() polls and tries to
+        resubscribe after `resubscribe_backoff` seconds, doubling the delay
+        up to `resubscribe_max_backoff` while attempts keep failing.
+        """
         self.thresholds = thresholds
         self.hold = hold
         self.interval = interval
         self.safe_speed = safe_speed
-
-        self.overspeed_start = None
-        self.brake_system = AutoBrakeSystem(
-            threshold=self.thresholds.max_speed,
-            reduction_rate=10,
-        )
+        self.brake_tick = brake_tick
+        self.metrics = metrics
+        self.on_alert = on_alert
+        self.cooldown = cooldown
+        self.resubscribe_backoff = resubscribe_backoff
+        self.resubscribe_max_backoff = resubscribe_max_backoff
+
+        if isinstance(rules, RuleEngine):
+            # an already compiled plan (shared by many monitors): only the state is per monitor
+            self.rules = rules.fork()
+            if OVERSPEED not in {r.name for r in self.rules.rules}:
+                self.rules.add(overspeed_rule(thresholds.max_speed, hold))
+        else:
+            rules = list(rules)
+            if not any(r.name == OVERSPEED for r in rules):
+                rules.insert(0, overspeed_rule(thresholds.max_speed, hold))
+            self.rules = RuleEngine(rules)
+        self.detectors = detectors if isinstance(detectors, DetectorBank) else DetectorBank(detectors)
+        self._offline_t = 0.0     # sample clock for on_speed() input without timestamps
+        self._brake_system = None
 
         # tests handle file writing via sink.write(), so we ignore alerts_csv_path
         self.alerts_csv_path = alerts_csv_path
 
+    @property
+    def brake_system(self) -> AutoBrakeSystem:
+        # created on first use, monitors that never brake (fleet, workers) do not carry one
+        if self._brake_system is None:
+            self._brake_system = AutoBrakeSystem(
+                threshold=self.thresholds.max_speed,
+                reduction_rate=10,
+            )
+        return self._brake_system
+
+    @brake_system.setter
+    def brake_system(self, brake: AutoBrakeSystem):
+        self._brake_system = brake
+
     # ------------------------------------------------------------------
     # Offline processing for tests
     # ------------------------------------------------------------------
@@ -61,11 +144,15 @@ class SpeedMonitor:
         else:
             iterable = [samples]
 
+        detectors = self.detectors
+        cooldown = self.cooldown
         for item in iterable:
+            t = None
             try:
                 if isinstance(item, (int, float)):
                     speed = float(item)
                 elif isinstance(item, dict):
+                    t = item.get("timestamp")
                     if "speed" in item:
                         speed = float(item["speed"])
                     elif "value" in item:
@@ -77,8 +164,13 @@ class SpeedMonitor:
             except (TypeError, ValueError):
                 continue
 
+            if detectors or cooldown is not None:
+                # samples without a timestamp are taken to be `interval` seconds apart
+                self._offline_t = float(t) if t is not None else self._offline_t + self.interval
+
             # boundary_equals_threshold: only > threshold triggers alert
-            if speed > self.thresholds.max_speed:
+            if speed > self.thresholds.max_speed and (
+                    cooldown is None or cooldown.allow(SIG_SPEED, "SPEEDING", self._offline_t)):
                 alert = Alert(
                     kind="SPEEDING",
                     speed=speed,
@@ -86,48 +178,228 @@ class SpeedMonitor:
                 )
                 alerts.append(alert)
 
+            if detectors:
+                for alert in detectors.update(SIG_SPEED, speed, self._offline_t):
+                    if cooldown is None or self._allow(alert, self._offline_t):
+                        alerts.append(alert)
+
         return alerts
 
+    def on_speed_batch(self, speeds: Any, timestamps: Any = None) -> AlertBatch:
+        """
+        Batch variant of on_speed for clean numeric data: a NumPy array,
+        array.array or any buffer-protocol object of speeds, plus optional
+        timestamps of the same length. Uses NumPy when it is installed.
+        """
+        max_speed = self.thresholds.max_speed
+
+        if np is not None:
+            values = np.asarray(speeds, dtype=np.float64).ravel()
+            indices = np.flatnonzero(values > max_speed)
+            ts = None
+            if timestamps is not None:
+                ts = np.asarray(timestamps, dtype=np.float64).ravel()
+                if len(ts) != len(values):
+                    raise ValueError("timestamps and speeds must have the same length")
+                ts = ts[indices]
+            return AlertBatch(indices, values[indices], max_speed, ts)
+
+        values = speeds if isinstance(speeds, array) else array("d", speeds)
+        indices = array("q", [i for i, v in enumerate(values) if v > max_speed])
+        ts = None
+        if timestamps is not None:
+            if len(timestamps) != len(values):
+                raise ValueError("timestamps and speeds must have the same length")
+            ts = array("d", [timestamps[i] for i in indices])
+        return AlertBatch(indices, array("d", [values[i] for i in indices]), max_speed, ts)
+
     # ------------------------------------------------------------------
     # Realtime monitoring loop
     # ------------------------------------------------------------------
-    def start(self, ip: str = "127.0.0.1", port: int = 55556):
-        print(f"[MON] Connecting to Databroker at {ip}:{port}")
+    @property
+    def paths(self) -> List[str]:
+        """Every VSS path read by the rules and detectors."""
+        return list(dict.fromkeys([*self.rules.paths, *self.detectors.paths]))
+
+    @property
+    def overspeed_start(self) -> float | None:
+        return self.rules.since(OVERSPEED)
+
+    def check_hold(self, speed: float, now: float) -> bool:
+        """
+        Track how long speed has stayed above max_speed. Returns True once
+        the overspeed has persisted for longer than `hold` seconds.
+        """
+        return self.evaluate({SIG_SPEED: speed}, now)
+
+    def evaluate(self, values: dict, now: float) -> bool:
+        """
+        Feed new signal values to the rule engine and the detectors, dispatch
+        alerts of the extra rules and detectors and return whether the overspeed rule is firing.
+        """
+        for alert in self.rules.update(values, now):
+            if alert.rule != OVERSPEED and self._allow(alert, now):
+                self._emit(alert)
+        if self.detectors:
+            for path, value in values.items():
+                if value is not None:
+                    for alert in self.detectors.update(path, value, now):
+                        if self._allow(alert, now):
+                            self._emit(alert)
+        return self.rules.is_firing(OVERSPEED)
+
+    def _allow(self, alert: Alert, now: float) -> bool:
+        return self.cooldown is None or self.cooldown.allow(alert.rule or SIG_SPEED, alert.kind, now)
+
+    def _emit(self, alert: Alert):
+        if self.on_alert is not None:
+            self.on_alert(alert)
+        else:
+            print(f"[MON] 🚨 {alert.kind}: {alert.reason}")
+
+    def _receive(self, dp) -> float:
+        """perf_counter() mark for a received datapoint; records its age since the broker stamped it."""
+        received = time.perf_counter()
+        stamp = getattr(dp, "timestamp", None)
+        if isinstance(stamp, datetime):
+            self.metrics.since("broker_to_receipt", stamp.timestamp())
+        return received
+
+    def _on_sample(self, speed: float, received: float | None = None, values: dict | None = None):
+        """Apply the overspeed/hold logic (and the extra rules) to one live update."""
+        print(f"[MON] Vehicle.Speed = {speed:.2f}")
+
+        received = time.perf_counter() if received is None else received
+        persisted = self.evaluate(values or {SIG_SPEED: speed}, time.time())
+        # releases a running ramp once the measured speed is back under the limit
+        self.brake_system.observe(speed)
+        if persisted and not self.brake_system.active:
+            print("[MON] Overspeed persisted → auto brake")
+            self.brake_system.engage_brake(speed, blocking=False)
+        self.metrics.elapsed("receipt_to_decision", received)
+
+    def _tick_brake(self, stop: threading.Event):
+        # advances the brake ramp independently of how often samples arrive
+        while not stop.wait(self.brake_tick):
+            try:
+                self.brake_system.tick()
+            except Exception as e:
+                print(f"[MON] Brake error: {e}")
+
+    def _run_subscription(self, client, max_cycles: int | None = None, cycles: int = 0):
+        """
+        Evaluate every update pushed by the Databroker. Returns the cycle
+        count and the exception that broke the stream (None if it ended or
+        max_cycles was reached); the caller decides what to do next.
+        """
+        try:
+            # one subscription for every path the rules and detectors read
+            for updates in client.subscribe_current_values(self.paths):
+                dp = updates.get(SIG_SPEED)
+                speed = getattr(dp, "value", None)
+                values = {p: getattr(d, "value", None) for p, d in updates.items()}
+                if speed is not None:
+                    self._on_sample(speed, self._receive(dp), values)
+                elif values:
+                    self.evaluate(values, time.time())
+
+                cycles += 1
+                if max_cycles is not None and cycles >= max_cycles:
+                    break
+        except Exception as e:
+            return cycles, e
+        return cycles, None
+
+    def _run_resubscribing(self, client, max_cycles: int | None = None) -> int:
+        """
+        Subscription mode: whenever the stream fails or ends, poll until the
+        next attempt. The delay doubles per failed attempt and resets once a
+        subscription delivered updates again.
+        """
+        cycles, delay = 0, self.resubscribe_backoff
+        while True:
+            before = cycles
+            cycles, error = self._run_subscription(client, max_cycles, cycles)
+            if max_cycles is not None and cycles >= max_cycles:
+                return cycles
+            if cycles > before:
+                delay = self.resubscribe_backoff
+            reason = f"failed ({error})" if error is not None else "ended"
+            print(f"[MON] Subscription {reason}, polling for {delay:.1f}s before resubscribing")
+            cycles = self._run_polling(client, max_cycles, cycles, until=time.monotonic() + delay)
+            if max_cycles is not None and cycles >= max_cycles:
+                return cycles
+            delay = min(delay * 2, self.resubscribe_max_backoff)
+
+    def _run_polling(self, client, max_cycles: int | None = None, cycles: int = 0,
+                     until: float | None = None) -> int:
+        """Poll every `interval` seconds until max_cycles or the time.monotonic() deadline `until`."""
+        while (max_cycles is None or cycles < max_cycles) and (until is None or time.monotonic() < until):
+            cycles += 1
+            try:
+                values = client.get_current_values(self.paths)
+                dp = values.get(SIG_SPEED)
+                speed = getattr(dp, "value", None)
 
-        with VSSClient(ip, port) as client:
-            print(f"[MON] Connected to Databroker at {ip}:{port}")
+                if speed is not None:
+                    self._on_sample(speed, self._receive(dp),
+                                    {p: getattr(d, "value", None) for p, d in values.items()})
+                else:
+                    print("No Vehicle.Speed data available.")
 
-            while True:
-                try:
-                    values = client.get_current_values([SIG_SPEED])
-                    speed = getattr(values.get(SIG_SPEED), "value", None)
-
-                    if speed is not None:
-                        print(f"[MON] Vehicle.Speed = {speed:.2f}")
-
-                        if speed > self.thresholds.max_speed:
-                            if self.overspeed_start is None:
-                                self.overspeed_start = time.time()
-                            elif (
-                                time.time() - self.overspeed_start > self.hold
-                                and not self.brake_system.active
-                            ):
-                                print("[MON] Overspeed persisted → auto brake")
-                                self.brake_system.engage_brake(speed)
-                        else:
-                            self.overspeed_start = None
-                            self.brake_system.active = False
-                    else:
-                        print("No Vehicle.Speed data available.")
+                time.sleep(self.interval)
 
-                    time.sleep(self.interval)
+            except Exception as e:
+                print(f"[MON] Error: {e}")
+                time.sleep(2)
+        return cycles
 
-                except KeyboardInterrupt:
-                    print("\n[MON] Monitoring stopped by user.")
-                    break
-                except Exception as e:
-                    print(f"[MON] Error: {e}")
-                    time.sleep(2)
+    def start(
+        self,
+        ip: str = "127.0.0.1",
+        port: int = 55556,
+        mode: str = "subscribe",
+        max_cycles: int | None = None,
+        metrics_port: int | None = None,
+        summary_interval: float | None = None,
+    ):
+        """
+        mode="subscribe" reacts to every update pushed by the Databroker; if
+        the subscription cannot be opened or ends it polls every `interval`
+        seconds and resubscribes with backoff. mode="poll" only polls.
+        max_cycles limits the number of samples handled (None = run forever).
+        metrics_port serves the latency histograms over HTTP while running,
+        summary_interval prints a latency summary line every N seconds.
+        """
+        if mode not in ("subscribe", "poll"):
+            raise ValueError(f"unknown monitor mode: {mode!r}")
+
+        print(f"[MON] Connecting to Databroker at {ip}:{port}")
+
+        stop = threading.Event()
+        ticker = threading.Thread(target=self._tick_brake, args=(stop,), daemon=True)
+        server = MetricsServer(self.metrics, port=metrics_port) if metrics_port is not None else None
+        reporter = SummaryReporter(self.metrics, summary_interval) if summary_interval else None
+
+        with CONNECTIONS.acquire(ip, port, factory=VSSClient) as client:
+            print(f"[MON] Connected to Databroker at {ip}:{port}")
+            ticker.start()
+
+            try:
+                if mode == "subscribe":
+                    self._run_resubscribing(client, max_cycles)
+                else:
+                    self._run_polling(client, max_cycles)
+            except KeyboardInterrupt:
+                print("\n[MON] Monitoring stopped by user.")
+            finally:
+                stop.set()
+                ticker.join()
+                if server is not None:
+                    server.close()
+                if reporter is not None:
+                    reporter.close()
+                    print(self.metrics.summary_line())
 
 
 def monitor_speed(
@@ -136,50 +408,10 @@ def monitor_speed(
     threshold: float = 120,
     hold: float = 2,
     interval: float = 1,
+    mode: str = "subscribe",
+    max_cycles: int | None = None,
+    metrics_port: int | None = None,
+    summary_interval: float | None = None,
 ):
     thresholds = Thresholds(threshold)
-    SpeedMonitor(thresholds, hold, interval).start(ip, port)
-
-
-
-
-# import time
-# from kuksa_client.grpc import VSSClient
-# from speedMonitor.brake_controller import AutoBrakeSystem
-
-# SIG_SPEED = "Vehicle.Speed"
-
-# def monitor_speed(ip="127.0.0.1", port=55556, threshold=120, hold=2, interval=1):
-#     with VSSClient(ip, port) as client:
-#         print(f"[MON] Connected to Databroker at {ip}:{port}")
-#         overspeed_start = None
-#         brake_system = AutoBrakeSystem(ip=ip, port=port, threshold=100, reduction_rate=10)
-
-#         while True:
-#             try:
-#                 values = client.get_current_values([SIG_SPEED])
-#                 speed = getattr(values.get(SIG_SPEED), "value", None)
-
-#                 if speed is not None:
-#                     print(f"[MON] Vehicle.Speed = {speed:.2f}")
-
-#                     if speed > threshold:
-#                         if overspeed_start is None:
-#                             overspeed_start = time.time()
-#                         elif time.time() - overspeed_start > hold and not brake_system.active:
-#                             print("[MON] ⚠️ Overspeed persisted! Activating auto brake...")
-#                             brake_system.engage_brake(speed)
-#                     else:
-#                         overspeed_start = None
-
-#                 else:
-#                     print("No Vehicle.Speed data available yet.")
-
-#                 time.sleep(interval)
-
-#             except KeyboardInterrupt:
-#                 print("\nMonitoring stopped by user.")
-#                 break
-#             except Exception as e:
-#                 print(f"[MON] Error: {e}")
-#                 time.sleep(2)
+    SpeedMonitor(thresholds, hold, interval).start(ip, port, mode, max_cycles, metrics_port, summary_interval)
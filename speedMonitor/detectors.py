@@ -0,0 +1,289 @@
+"""
+Streaming anomaly detectors for speed (and other scalar) signals.
+
+Every detector does O(1) work per sample and keeps its state in
+preallocated array.array ring buffers or plain floats, so feeding it does
+not allocate; an Alert object is only built when a detector starts firing.
+
+  EwmaZScore   sample deviates from the EWMA mean by more than z_max
+               standard deviations (EWMA variance, after a warm-up)
+  RollingRange max - min over the last `window` samples exceeds max_spread
+               (sliding min/max with monotonic deques)
+  RateLimit    |dv/dt| exceeds max_rate and/or |d2v/dt2| (jerk) exceeds max_jerk
+
+DetectorBank groups detectors per signal and reports edges only: a
+detector alerts when it starts firing and stays quiet until a sample
+brings it back to normal, which debounces a noisy stream.
+"""
+import math
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+from speedMonitor.alerts import Alert, SIG_SPEED
+
+
+class RingBuffer:
+    """Fixed-capacity float ring buffer backed by array('d')."""
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.data = array("d", bytes(8 * capacity))
+        self.count = 0            # total samples pushed
+
+    def push(self, x: float):
+        self.data[self.count % self.capacity] = x
+        self.count += 1
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def __getitem__(self, i: int) -> float:
+        """i = 0 is the oldest sample still held, -1 the newest."""
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(i)
+        return self.data[(self.count - n + i) % self.capacity]
+
+    def values(self) -> List[float]:
+        return [self[i] for i in range(len(self))]
+
+
+class Detector(ABC):
+    """Base class: update() returns True while the sample is anomalous."""
+
+    kind = "ANOMALY"
+
+    @abstractmethod
+    def update(self, x: float, t: float) -> bool:
+        ...
+
+    def reason(self) -> str:
+        return self.kind
+
+    def reset(self):
+        pass
+
+
+class EwmaZScore(Detector):
+    """
+    Exponentially weighted mean/variance; a sample is anomalous when it is
+    more than z_max deviations from the mean seen *before* it. min_std
+    keeps a perfectly steady signal from flagging tiny changes.
+    """
+
+    kind = "SPEED_ANOMALY"
+
+    def __init__(self, alpha: float = 0.05, z_max: float = 4.0, warmup: int = 20, min_std: float = 0.5):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.z_max = z_max
+        self.warmup = warmup
+        self.min_std = min_std
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.z = 0.0
+        self.last = 0.0
+
+    def update(self, x: float, t: float) -> bool:
+        self.last = x
+        if self.n == 0:
+            self.mean = x
+            self.n = 1
+            return False
+        d = x - self.mean
+        std = math.sqrt(self.var)
+        self.z = d / (std if std > self.min_std else self.min_std)
+        a = self.alpha
+        self.mean += a * d
+        self.var = (1.0 - a) * (self.var + a * d * d)
+        self.n += 1
+        return self.n > self.warmup and abs(self.z) > self.z_max
+
+    def reason(self) -> str:
+        return f"value {self.last:.2f} is {self.z:+.1f} sigma from the moving mean {self.mean:.2f}"
+
+
+class RollingRange(Detector):
+    """Sliding-window max - min over the last `window` samples via monotonic deques."""
+
+    kind = "SPEED_FLUCTUATION"
+
+    def __init__(self, window: int = 50, max_spread: float = 30.0):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.max_spread = max_spread
+        self.values = RingBuffer(window)
+        # deques hold sample numbers; both are bounded by the window
+        self._max = array("q", bytes(8 * window))
+        self._min = array("q", bytes(8 * window))
+        self.reset()
+
+    def reset(self):
+        self.values.count = 0
+        self._max_head = self._max_len = 0
+        self._min_head = self._min_len = 0
+
+    @property
+    def max(self) -> float:
+        return self.values.data[self._max[self._max_head] % self.window]
+
+    @property
+    def min(self) -> float:
+        return self.values.data[self._min[self._min_head] % self.window]
+
+    def update(self, x: float, t: float) -> bool:
+        w = self.window
+        vals = self.values.data
+        i = self.values.count
+        self.values.push(x)
+        oldest = i - w + 1
+
+        dq, head, size = self._max, self._max_head, self._max_len
+        if size and dq[head] < oldest:
+            head = (head + 1) % w
+            size -= 1
+        while size and vals[dq[(head + size - 1) % w] % w] <= x:
+            size -= 1
+        dq[(head + size) % w] = i
+        self._max_head, self._max_len = head, size + 1
+
+        dq, head, size = self._min, self._min_head, self._min_len
+        if size and dq[head] < oldest:
+            head = (head + 1) % w
+            size -= 1
+        while size and vals[dq[(head + size - 1) % w] % w] >= x:
+            size -= 1
+        dq[(head + size) % w] = i
+        self._min_head, self._min_len = head, size + 1
+
+        return self.max - self.min > self.max_spread
+
+    def reason(self) -> str:
+        return (f"spread {self.max - self.min:.2f} (min {self.min:.2f}, max {self.max:.2f}) "
+                f"over the last {len(self.values)} samples exceeds {self.max_spread}")
+
+
+class RateLimit(Detector):
+    """
+    Rate of change (units per second) and jerk (rate of change of the rate)
+    between consecutive samples. Either limit may be None.
+    """
+
+    kind = "RATE_LIMIT"
+
+    def __init__(self, max_rate: Optional[float] = None, max_jerk: Optional[float] = None):
+        if max_rate is None and max_jerk is None:
+            raise ValueError("RateLimit needs max_rate and/or max_jerk")
+        self.max_rate = max_rate
+        self.max_jerk = max_jerk
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.x = self.t = 0.0
+        self.rate = self.jerk = 0.0
+        self._exceeded = ""
+
+    def update(self, x: float, t: float) -> bool:
+        n = self.n
+        self.n = n + 1
+        dt = t - self.t
+        if n == 0 or dt <= 0.0:
+            self.x, self.t = x, t
+            return False
+        rate = (x - self.x) / dt
+        self.jerk = (rate - self.rate) / dt if n > 1 else 0.0
+        self.rate = rate
+        self.x, self.t = x, t
+
+        if self.max_rate is not None and abs(rate) > self.max_rate:
+            self._exceeded = "rate"
+            return True
+        if self.max_jerk is not None and n > 1 and abs(self.jerk) > self.max_jerk:
+            self._exceeded = "jerk"
+            return True
+        return False
+
+    def reason(self) -> str:
+        if self._exceeded == "jerk":
+            return f"jerk {self.jerk:.2f}/s² exceeds {self.max_jerk}"
+        return f"rate of change {self.rate:.2f}/s exceeds {self.max_rate}"
+
+
+class DetectorBank:
+    """
+    Detectors per signal with edge-triggered alerts. `detectors` is either
+    a list (applied to Vehicle.Speed) or a mapping signal -> list.
+    """
+
+    def __init__(self, detectors: Union[Iterable[Detector], Mapping[str, Iterable[Detector]]] = ()):
+        if isinstance(detectors, Mapping):
+            items = detectors.items()
+        else:
+            items = [(SIG_SPEED, detectors)]
+        self.by_signal: Dict[str, List[Detector]] = {}
+        self._active: Dict[str, array] = {}
+        for signal, dets in items:
+            dets = list(dets)
+            if dets:
+                self.by_signal[signal] = dets
+                self._active[signal] = array("b", bytes(len(dets)))
+
+    def __bool__(self) -> bool:
+        return bool(self.by_signal)
+
+    @property
+    def paths(self) -> List[str]:
+        return list(self.by_signal)
+
+    def update(self, signal: str, x: float, t: float) -> List[Alert]:
+        dets = self.by_signal.get(signal)
+        if not dets:
+            return []
+        active = self._active[signal]
+        alerts = None
+        for i, det in enumerate(dets):
+            if det.update(x, t):
+                if not active[i]:
+                    active[i] = 1
+                    if alerts is None:
+                        alerts = []
+                    alerts.append(Alert(kind=det.kind, speed=x if signal == SIG_SPEED else math.nan,
+                                        reason=det.reason(), rule=type(det).__name__, signal=signal, value=x))
+            elif active[i]:
+                active[i] = 0
+        return alerts or []
+
+    def update_many(self, signal: str, values: Sequence[float], timestamps: Sequence[float]) -> List[Alert]:
+        """Feed a block of samples; same result as calling update() per sample."""
+        if len(values) != len(timestamps):
+            raise ValueError("timestamps and values must have the same length")
+        update = self.update
+        alerts: List[Alert] = []
+        for x, t in zip(values, timestamps):
+            found = update(signal, x, t)
+            if found:
+                alerts.extend(found)
+        return alerts
+
+    def reset(self):
+        for signal, dets in self.by_signal.items():
+            for det in dets:
+                det.reset()
+            self._active[signal] = array("b", bytes(len(dets)))
+
+
+def default_detectors() -> List[Detector]:
+    """A reasonable speed set: z-score, 30 km/h swing within 50 samples, 30 km/h per second."""
+    return [EwmaZScore(), RollingRange(window=50, max_spread=30.0), RateLimit(max_rate=30.0)]
@@ -0,0 +1,466 @@
+"""
+In-process stand-in for the KUKSA Databroker.
+
+FakeDatabroker keeps the signal tree from adas/adas_vss.json (plus the
+standard signals this project uses) in memory. It can be used directly
+through FakeVSSClient, which implements the part of the VSSClient surface
+the project calls, or served over gRPC with serve() so unmodified code and
+the kuksa_*_test.py scripts can talk to it:
+
+    python -m speedMonitor.fake_broker --port 55556
+
+The gRPC server implements kuksa.val.v1 Get/Set/Subscribe/GetServerInfo and
+kuksa.val.v2 GetValue/GetValues/Subscribe/PublishValue/GetServerInfo, which
+is what kuksa-client uses for reads, writes, metadata and subscriptions.
+"""
+import argparse
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+from concurrent import futures
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from kuksa_client.grpc import (
+    DataType,
+    Datapoint,
+    EntryType,
+    Field,
+    Metadata,
+    ServerInfo,
+    VSSClientError,
+)
+
+DEFAULT_VSS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "adas", "adas_vss.json")
+SERVER_NAME = "fake-databroker"
+SERVER_VERSION = "0.1"
+
+# signals from the standard VSS tree that the project reads or writes
+BASE_SIGNALS = {
+    "Vehicle.Speed": ("float", "sensor", "km/h", "Vehicle speed."),
+    "Vehicle.CurrentLocation.Longitude": ("double", "sensor", "degrees", "Current longitude of vehicle in WGS 84 geodetic coordinates."),
+    "Vehicle.Acceleration.Longitudinal": ("float", "sensor", "m/s^2", "Vehicle acceleration in X (longitudinal acceleration)."),
+    "Vehicle.Body.Windshield.Front.Wiping.System.TargetPosition": ("float", "actuator", "degrees", "Requested position of main wiper blade."),
+    "Vehicle.Chassis.Brake.PedalPosition": ("uint8", "sensor", "percent", "Brake pedal position as percent. 0 = Not depressed. 100 = Fully depressed."),
+    "Vehicle.Chassis.Accelerator.PedalPosition": ("uint8", "sensor", "percent", "Accelerator pedal position as percent. 0 = Not depressed. 100 = Fully depressed."),
+}
+
+_DATATYPES = {
+    "string": DataType.STRING, "boolean": DataType.BOOLEAN,
+    "int8": DataType.INT8, "int16": DataType.INT16, "int32": DataType.INT32, "int64": DataType.INT64,
+    "uint8": DataType.UINT8, "uint16": DataType.UINT16, "uint32": DataType.UINT32, "uint64": DataType.UINT64,
+    "float": DataType.FLOAT, "double": DataType.DOUBLE,
+}
+_ENTRY_TYPES = {"sensor": EntryType.SENSOR, "actuator": EntryType.ACTUATOR, "attribute": EntryType.ATTRIBUTE}
+
+# protobuf value field per data type (identical in the v1 Datapoint and the v2 Value)
+_PROTO_FIELD = {
+    DataType.STRING: "string", DataType.BOOLEAN: "bool",
+    DataType.INT8: "int32", DataType.INT16: "int32", DataType.INT32: "int32", DataType.INT64: "int64",
+    DataType.UINT8: "uint32", DataType.UINT16: "uint32", DataType.UINT32: "uint32", DataType.UINT64: "uint64",
+    DataType.FLOAT: "float", DataType.DOUBLE: "double",
+}
+
+
+@dataclass
+class Signal:
+    path: str
+    data_type: DataType
+    entry_type: EntryType
+    unit: Optional[str] = None
+    description: Optional[str] = None
+    value: Optional[Datapoint] = None
+
+    def metadata(self) -> Metadata:
+        return Metadata(data_type=self.data_type, entry_type=self.entry_type,
+                        description=self.description, unit=self.unit)
+
+
+def _not_found(path: str) -> VSSClientError:
+    return VSSClientError(
+        error={"code": 404, "reason": "not_found", "message": f"{path} not found"},
+        errors=[{"path": path, "error": {"code": 404, "reason": "not_found", "message": f"{path} not found"}}],
+    )
+
+
+def load_vss(path: str) -> Dict[str, Signal]:
+    """Flatten a VSS JSON tree (nested dicts, with or without `children`) into signals."""
+    with open(path) as f:
+        tree = json.load(f)
+
+    signals: Dict[str, Signal] = {}
+
+    def walk(prefix: str, node: Dict[str, Any]):
+        for name, child in node.items():
+            if not isinstance(child, dict):
+                continue
+            path = f"{prefix}.{name}" if prefix else name
+            kind = child.get("type")
+            if kind in _ENTRY_TYPES:
+                signals[path] = Signal(
+                    path,
+                    _DATATYPES.get(child.get("datatype", ""), DataType.UNSPECIFIED),
+                    _ENTRY_TYPES[kind],
+                    child.get("unit"),
+                    child.get("description"),
+                )
+            else:
+                walk(path, child.get("children", child))
+
+    walk("", tree)
+    return signals
+
+
+def _infer_type(value: Any) -> DataType:
+    if isinstance(value, bool):
+        return DataType.BOOLEAN
+    if isinstance(value, int):
+        return DataType.INT64
+    if isinstance(value, float):
+        return DataType.DOUBLE
+    return DataType.STRING
+
+
+class FakeDatabroker:
+    """
+    Thread-safe in-memory signal store with subscriptions. With strict=False
+    (default) writing an unknown path registers it; with strict=True unknown
+    paths fail like on the real broker.
+    """
+    def __init__(self, vss_path: Optional[str] = DEFAULT_VSS, strict: bool = False):
+        self.strict = strict
+        self.signals: Dict[str, Signal] = {
+            p: Signal(p, _DATATYPES[t], _ENTRY_TYPES[e], unit, desc)
+            for p, (t, e, unit, desc) in BASE_SIGNALS.items()
+        }
+        if vss_path:
+            self.signals.update(load_vss(vss_path))
+
+        self.sets = 0
+        self.updates = 0
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[frozenset, "queue.SimpleQueue"]] = []
+        self._closed = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Store
+    # ------------------------------------------------------------------
+    def _signal(self, path: str) -> Signal:
+        sig = self.signals.get(path)
+        if sig is None:
+            raise _not_found(path)
+        return sig
+
+    def get(self, paths: Iterable[str]) -> Dict[str, Optional[Datapoint]]:
+        with self._lock:
+            return {p: self._signal(p).value for p in paths}
+
+    def lookup(self, path: str) -> Tuple[Optional[Signal], Optional[Datapoint]]:
+        """Signal of `path` and its current value read together; (None, None) if unknown."""
+        with self._lock:
+            sig = self.signals.get(path)
+            return sig, (sig.value if sig is not None else None)
+
+    def metadata(self, paths: Iterable[str]) -> Dict[str, Metadata]:
+        with self._lock:
+            return {p: self._signal(p).metadata() for p in paths}
+
+    def set(self, values: Iterable[Tuple[str, Any]]):
+        """Store (path, value) pairs; subscribers get one notification per call."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        changed: Dict[str, Datapoint] = {}
+        with self._lock:
+            for path, value in values:
+                if isinstance(value, Datapoint):
+                    value = value.value
+                sig = self.signals.get(path)
+                if sig is None:
+                    if self.strict:
+                        raise _not_found(path)
+                    sig = self.signals[path] = Signal(path, _infer_type(value), EntryType.SENSOR)
+                sig.value = changed[path] = Datapoint(value, now)
+            self.sets += 1
+            self.updates += len(changed)
+            subscribers = list(self._subscribers)
+
+        for paths, q in subscribers:
+            hit = {p: dp for p, dp in changed.items() if p in paths}
+            if hit:
+                q.put(hit)
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+    def subscribe(self, paths: Iterable[str], poll: float = 0.5, alive=None) -> Iterator[Dict[str, Datapoint]]:
+        """
+        Yield the current values of `paths`, then every change. Ends when the
+        broker is closed or `alive()` (if given) returns False.
+        """
+        paths = frozenset(paths)
+        q: "queue.SimpleQueue" = queue.SimpleQueue()
+        with self._lock:
+            initial = {p: self._signal(p).value for p in paths}
+            entry = (paths, q)
+            self._subscribers.append(entry)
+        try:
+            yield initial
+            while not self._closed.is_set() and (alive is None or alive()):
+                try:
+                    yield q.get(timeout=poll)
+                except queue.Empty:
+                    continue
+        finally:
+            with self._lock:
+                self._subscribers.remove(entry)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def close(self):
+        """End all subscriptions."""
+        self._closed.set()
+
+    # ------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------
+    def client(self, host: str = "127.0.0.1", port: int = 55556, **kwargs) -> "FakeVSSClient":
+        """VSSClient-compatible factory, e.g. patch("speedMonitor.core.VSSClient", broker.client)."""
+        return FakeVSSClient(self, host, port)
+
+
+class FakeVSSClient:
+    """The VSSClient calls used in this project, served from a FakeDatabroker."""
+
+    def __init__(self, broker: FakeDatabroker, host: str = "127.0.0.1", port: int = 55556):
+        self.broker = broker
+        self.host = host
+        self.port = port
+        self.connected = False
+
+    def connect(self):
+        self.connected = True
+
+    def disconnect(self):
+        self.connected = False
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disconnect()
+
+    def get_current_values(self, paths: Iterable[str], **rpc_kwargs) -> Dict[str, Optional[Datapoint]]:
+        return self.broker.get(paths)
+
+    def set_current_values(self, updates: Dict[str, Datapoint], **rpc_kwargs) -> None:
+        self.broker.set(updates.items())
+
+    def set(self, updates, **rpc_kwargs) -> None:
+        self.broker.set(
+            (u.entry.path, u.entry.value) for u in updates if Field.VALUE in tuple(u.fields)
+        )
+
+    def subscribe_current_values(self, paths: Iterable[str], **rpc_kwargs) -> Iterator[Dict[str, Datapoint]]:
+        return self.broker.subscribe(paths)
+
+    def get_metadata(self, paths: Iterable[str], field=None, **rpc_kwargs) -> Dict[str, Metadata]:
+        return self.broker.metadata(paths)
+
+    def get_server_info(self, **rpc_kwargs) -> ServerInfo:
+        return ServerInfo(name=SERVER_NAME, version=SERVER_VERSION)
+
+
+# ----------------------------------------------------------------------
+# gRPC server
+# ----------------------------------------------------------------------
+def _servicers(broker: FakeDatabroker):
+    import grpc
+    from google.protobuf.timestamp_pb2 import Timestamp
+    from kuksa.val.v1 import types_pb2 as types_v1, val_pb2 as val_v1, val_pb2_grpc as val_grpc_v1
+    from kuksa.val.v2 import types_pb2 as types_v2, val_pb2 as val_v2, val_pb2_grpc as val_grpc_v2
+
+    metadata_fields = {f.value for f in Field if f.name.startswith("METADATA")}
+
+    def fill(msg, sig: Signal, dp: Datapoint):
+        # msg is a v1 Datapoint or a v2 Value, both use the same field names
+        field = _PROTO_FIELD.get(sig.data_type) or _PROTO_FIELD[_infer_type(dp.value)]
+        setattr(msg, field, dp.value)
+
+    def timestamp(dp: Datapoint) -> Timestamp:
+        ts = Timestamp()
+        if dp.timestamp is not None:
+            ts.FromDatetime(dp.timestamp)
+        return ts
+
+    def v1_datapoint(sig, dp):
+        msg = types_v1.Datapoint(timestamp=timestamp(dp))
+        fill(msg, sig, dp)
+        return msg
+
+    def v2_datapoint(sig, dp):
+        msg = types_v2.Datapoint(timestamp=timestamp(dp))
+        fill(msg.value, sig, dp)
+        return msg
+
+    def not_found(path):
+        return types_v1.Error(code=404, reason="not_found", message=f"{path} not found")
+
+    class ValV1(val_grpc_v1.VALServicer):
+        def Get(self, request, context):
+            resp = val_v1.GetResponse()
+            for req in request.entries:
+                sig, value = broker.lookup(req.path)
+                if sig is None:
+                    resp.errors.add(path=req.path, error=not_found(req.path))
+                    resp.error.CopyFrom(not_found(req.path))
+                    continue
+                entry = resp.entries.add(path=req.path)
+                want_meta = req.view == types_v1.VIEW_METADATA or metadata_fields.intersection(req.fields)
+                if want_meta:
+                    entry.metadata.CopyFrom(types_v1.Metadata(
+                        data_type=sig.data_type.value, entry_type=sig.entry_type.value,
+                        **{k: v for k, v in (("unit", sig.unit), ("description", sig.description)) if v is not None},
+                    ))
+                elif value is not None:
+                    entry.value.CopyFrom(v1_datapoint(sig, value))
+            return resp
+
+        def Set(self, request, context):
+            resp = val_v1.SetResponse()
+            values = []
+            for upd in request.updates:
+                if types_v1.FIELD_VALUE in upd.fields and upd.entry.value.WhichOneof("value"):
+                    values.append((upd.entry.path, getattr(upd.entry.value, upd.entry.value.WhichOneof("value"))))
+            try:
+                broker.set(values)
+            except VSSClientError as e:
+                resp.error.CopyFrom(types_v1.Error(code=404, reason="not_found", message=str(e.error["message"])))
+            return resp
+
+        def Subscribe(self, request, context):
+            paths = [e.path for e in request.entries]
+            try:
+                stream = broker.subscribe(paths, alive=context.is_active)
+                for changed in stream:
+                    resp = val_v1.SubscribeResponse()
+                    for path, dp in changed.items():
+                        if dp is None:
+                            continue
+                        upd = resp.updates.add(fields=[types_v1.FIELD_VALUE])
+                        upd.entry.path = path
+                        upd.entry.value.CopyFrom(v1_datapoint(broker.signals[path], dp))
+                    yield resp
+            except VSSClientError as e:
+                context.abort(grpc.StatusCode.NOT_FOUND, e.error["message"])
+
+        def GetServerInfo(self, request, context):
+            return val_v1.GetServerInfoResponse(name=SERVER_NAME, version=SERVER_VERSION)
+
+    class ValV2(val_grpc_v2.VALServicer):
+        def _value(self, signal_id, context):
+            sig, value = broker.lookup(signal_id.path)
+            if sig is None:
+                context.abort(grpc.StatusCode.NOT_FOUND, f"{signal_id.path} not found")
+            return sig, value
+
+        def GetValue(self, request, context):
+            sig, value = self._value(request.signal_id, context)
+            resp = val_v2.GetValueResponse()
+            if value is not None:
+                resp.data_point.CopyFrom(v2_datapoint(sig, value))
+            return resp
+
+        def GetValues(self, request, context):
+            resp = val_v2.GetValuesResponse()
+            for signal_id in request.signal_ids:
+                sig, value = self._value(signal_id, context)
+                dp = resp.data_points.add()
+                if value is not None:
+                    dp.CopyFrom(v2_datapoint(sig, value))
+            return resp
+
+        def PublishValue(self, request, context):
+            if broker.strict:
+                self._value(request.signal_id, context)
+            fields = request.data_point.value.ListFields()
+            if fields:
+                broker.set([(request.signal_id.path, fields[0][1])])
+            return val_v2.PublishValueResponse()
+
+        def Subscribe(self, request, context):
+            try:
+                for changed in broker.subscribe(request.signal_paths, alive=context.is_active):
+                    resp = val_v2.SubscribeResponse()
+                    for path, dp in changed.items():
+                        if dp is not None:
+                            resp.entries[path].CopyFrom(v2_datapoint(broker.signals[path], dp))
+                    if resp.entries:
+                        yield resp
+            except VSSClientError as e:
+                context.abort(grpc.StatusCode.NOT_FOUND, e.error["message"])
+
+        def GetServerInfo(self, request, context):
+            return val_v2.GetServerInfoResponse(name=SERVER_NAME, version=SERVER_VERSION)
+
+    return (ValV1(), val_grpc_v1.add_VALServicer_to_server), (ValV2(), val_grpc_v2.add_VALServicer_to_server)
+
+
+class FakeBrokerServer:
+    """A FakeDatabroker served on a local gRPC port (port=0 picks a free one)."""
+
+    def __init__(self, broker: Optional[FakeDatabroker] = None, host: str = "127.0.0.1", port: int = 0, max_workers: int = 16):
+        import grpc
+
+        self.broker = broker or FakeDatabroker()
+        self.host = host
+        self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+        for servicer, add in _servicers(self.broker):
+            add(servicer, self.server)
+        self.port = self.server.add_insecure_port(f"{host}:{port}")
+        self.server.start()
+
+    def stop(self, grace: Optional[float] = None):
+        self.broker.close()
+        self.server.stop(grace)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def serve(broker: Optional[FakeDatabroker] = None, host: str = "127.0.0.1", port: int = 0) -> FakeBrokerServer:
+    return FakeBrokerServer(broker, host, port)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Local fake KUKSA Databroker (no Docker needed)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=55556)
+    p.add_argument("--vss", default=DEFAULT_VSS, help="VSS JSON overlay to load")
+    p.add_argument("--strict", action="store_true", help="Reject writes to unknown signals")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    server = serve(FakeDatabroker(args.vss, strict=args.strict), args.host, args.port)
+    print(f"[FAKE] Databroker listening on {args.host}:{server.port} ({len(server.broker.signals)} signals)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\n[FAKE] Stopped.")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
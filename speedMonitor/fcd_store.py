@@ -0,0 +1,358 @@
+"""
+Indexed store for the flat FCD CSVs (sumo-acc-demo fcd_all.csv,
+outputs/fcd_traci.csv, adas/vehicles.csv).
+
+open_store() reads the CSV once and writes <csv>.store/ next to it: the
+rows sorted by time as fixed-width binary columns plus three indices
+
+  step index     time and first row of every timestep    -> time ranges
+  vehicle index  the rows of every vehicle in time order  -> trajectories
+  x index        per timestep, the rows ordered by x      -> bounding boxes
+
+Later opens memory-map those files, so a query costs O(log n) index
+lookups plus the rows it returns, instead of a scan of the whole CSV:
+
+  with open_store("outputs/fcd_traci.csv") as store:
+      rows = list(store.time_range(10.0, 20.0))
+      ego = store.trajectory("ego", 10.0, 20.0)
+      near = store.bbox(0.0, -5.0, 100.0, 5.0, t0=15.0, t1=15.0)
+
+The store is rebuilt when the CSV's size or mtime changes. Speeds keep
+the unit of the source column (`speed_unit`: km/h for speed_kmh, m/s for
+speed); speed_text() returns a row's speed as written in the CSV, for
+output that has to match tools reading the CSV directly.
+"""
+import bisect
+import csv
+import json
+import math
+import mmap
+import os
+import shutil
+from array import array
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # the indices are then built in pure Python
+    np = None
+
+STORE_VERSION = 2
+
+# store column -> accepted CSV header names, first match wins
+COLUMN_ALIASES = {
+    "time_s": ("time_s", "time"),
+    "veh_id": ("veh_id", "id"),
+    "x": ("x_m", "x"),
+    "y": ("y_m", "y"),
+    "speed": ("speed_kmh", "speed"),
+}
+
+# file -> array typecode
+_FILES = {
+    "times": "d",          # one per timestep
+    "step_offsets": "q",   # first row of every timestep, plus the row count
+    "time": "d",           # per row
+    "veh": "i",            # per row, index into ids
+    "x": "d",
+    "y": "d",
+    "speed": "d",
+    "speed_text": "B",     # the CSV speed fields, utf-8, concatenated
+    "speed_offsets": "q",  # start of every row's field in speed_text, plus its length
+    "veh_offsets": "q",    # first veh_rows entry of every vehicle, plus the row count
+    "veh_rows": "q",       # row numbers grouped by vehicle, in time order
+    "x_order": "q",        # row numbers, per timestep ordered by x
+}
+
+
+class FcdRow(NamedTuple):
+    time_s: float
+    veh_id: str
+    x: float
+    y: float
+    speed: float
+
+
+def default_store_dir(csv_path: str) -> str:
+    return str(csv_path) + ".store"
+
+
+def _float(value: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _source_stamp(csv_path: str) -> Dict[str, int]:
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _resolve_columns(header: List[str]) -> Dict[str, str]:
+    columns = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        found = next((a for a in aliases if a in header), None)
+        if found is None:
+            raise ValueError(f"FCD CSV has no {' / '.join(aliases)} column (header: {header})")
+        columns[name] = found
+    return columns
+
+
+def _index_numpy(time, veh, xs, ys, speed, speed_text, speed_offsets, n_ids):
+    time = np.frombuffer(time, dtype=np.float64)
+    veh = np.frombuffer(veh, dtype=np.int32)
+    xs, ys, speed = (np.frombuffer(a, dtype=np.float64) for a in (xs, ys, speed))
+    speed_offsets = np.frombuffer(speed_offsets, dtype=np.int64)
+    n = len(time)
+
+    # SUMO writes in time order; anything else is sorted once here (stable,
+    # so repeated rows of a vehicle keep their order and the last still wins)
+    if n and np.any(time[1:] < time[:-1]):
+        order = np.argsort(time, kind="stable")
+        time, veh, xs, ys, speed = (a[order] for a in (time, veh, xs, ys, speed))
+        starts, lengths = speed_offsets[:-1][order], np.diff(speed_offsets)[order]
+        speed_offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        text = np.frombuffer(speed_text, dtype=np.uint8)
+        speed_text = text[np.repeat(starts - speed_offsets[:-1], lengths) + np.arange(speed_offsets[-1])]
+
+    first = np.flatnonzero(np.concatenate(([True], time[1:] != time[:-1]))) if n else np.empty(0, np.int64)
+    times = time[first]
+    step_offsets = np.append(first, n).astype(np.int64)
+
+    # rows of one vehicle stay in time order
+    veh_rows = np.argsort(veh, kind="stable").astype(np.int64)
+    veh_offsets = np.concatenate(([0], np.cumsum(np.bincount(veh, minlength=n_ids)))).astype(np.int64)
+
+    # per timestep by x, NaN last; lexsort is stable and its last key is the primary one
+    step = np.repeat(np.arange(len(times)), np.diff(step_offsets))
+    x_order = np.lexsort((xs, np.isnan(xs), step)).astype(np.int64)
+
+    return {"times": times, "step_offsets": step_offsets, "time": time, "veh": veh, "x": xs, "y": ys,
+            "speed": speed, "speed_text": speed_text, "speed_offsets": speed_offsets,
+            "veh_offsets": veh_offsets, "veh_rows": veh_rows, "x_order": x_order}
+
+
+def _index_python(time, veh, xs, ys, speed, speed_text, speed_offsets, n_ids):
+    n = len(time)
+    if any(time[i] < time[i - 1] for i in range(1, n)):
+        order = sorted(range(n), key=time.__getitem__)
+        time, veh, xs, ys, speed = (array(a.typecode, (a[i] for i in order)) for a in (time, veh, xs, ys, speed))
+        text, offsets = speed_text, speed_offsets
+        speed_text, speed_offsets = array("B"), array("q", [0])
+        for i in order:
+            speed_text.extend(text[offsets[i]:offsets[i + 1]])
+            speed_offsets.append(len(speed_text))
+
+    times, step_offsets = array("d"), array("q")
+    for i in range(n):
+        if not times or time[i] != times[-1]:
+            times.append(time[i])
+            step_offsets.append(i)
+    step_offsets.append(n)
+
+    # counting sort by vehicle: rows of one vehicle stay in time order
+    veh_offsets = array("q", bytes(8 * (n_ids + 1)))
+    for code in veh:
+        veh_offsets[code + 1] += 1
+    for k in range(n_ids):
+        veh_offsets[k + 1] += veh_offsets[k]
+    fill = array("q", veh_offsets)
+    veh_rows = array("q", bytes(8 * n))
+    for i, code in enumerate(veh):
+        veh_rows[fill[code]] = i
+        fill[code] += 1
+
+    x_order = array("q")
+    for k in range(len(times)):
+        lo, hi = step_offsets[k], step_offsets[k + 1]
+        x_order.extend(sorted(range(lo, hi), key=lambda i: (math.isnan(xs[i]), xs[i])))   # NaN last
+
+    return {"times": times, "step_offsets": step_offsets, "time": time, "veh": veh, "x": xs, "y": ys,
+            "speed": speed, "speed_text": speed_text, "speed_offsets": speed_offsets,
+            "veh_offsets": veh_offsets, "veh_rows": veh_rows, "x_order": x_order}
+
+
+def build_store(csv_path: str, store_dir: Optional[str] = None) -> str:
+    """
+    Read `csv_path` once and write its indexed store; returns the store
+    directory. Rows are parsed into typed arrays and the indices are built
+    with numpy sorts (pure Python when numpy is missing).
+    """
+    store_dir = store_dir or default_store_dir(csv_path)
+    stamp = _source_stamp(csv_path)
+
+    ids: Dict[str, int] = {}
+    time, veh, xs, ys, speed = array("d"), array("i"), array("d"), array("d"), array("d")
+    speed_text, speed_offsets = array("B"), array("q", [0])
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        columns = _resolve_columns(header)
+        it, iv, ix, iy, isp = (header.index(columns[c]) for c in ("time_s", "veh_id", "x", "y", "speed"))
+        for r in reader:
+            if not r:
+                continue
+            time.append(float(r[it]))
+            veh.append(ids.setdefault(r[iv], len(ids)))
+            xs.append(_float(r[ix]))
+            ys.append(_float(r[iy]))
+            speed.append(_float(r[isp]))
+            speed_text.frombytes(r[isp].encode())
+            speed_offsets.append(len(speed_text))
+    n = len(time)
+
+    index = _index_numpy if np is not None else _index_python
+    data = index(time, veh, xs, ys, speed, speed_text, speed_offsets, len(ids))
+
+    tmp_dir = store_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name in _FILES:
+        with open(os.path.join(tmp_dir, name + ".bin"), "wb") as f:
+            data[name].tofile(f)
+    meta = {
+        "version": STORE_VERSION,
+        "source": os.path.abspath(csv_path),
+        "stamp": stamp,
+        "columns": columns,
+        "rows": n,
+        "steps": len(data["times"]),
+        "ids": list(ids),
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    return store_dir
+
+
+class FcdStore:
+    """Read-only, memory-mapped view of a store written by build_store()."""
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != STORE_VERSION:
+            raise ValueError(f"unsupported FCD store version in {store_dir}")
+        self.ids: List[str] = self.meta["ids"]
+        self._codes = {vid: k for k, vid in enumerate(self.ids)}
+        self._maps: List[mmap.mmap] = []
+        self._views: List[memoryview] = []
+        for name, typecode in _FILES.items():
+            setattr(self, "_" + name, self._map(os.path.join(store_dir, name + ".bin"), typecode))
+
+    def _map(self, path: str, typecode: str):
+        if os.path.getsize(path) == 0:
+            return array(typecode)
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm).cast(typecode)
+        self._maps.append(mm)
+        self._views.append(view)
+        return view
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        for mm in self._maps:
+            mm.close()
+        self._views, self._maps = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.meta["rows"]
+
+    @property
+    def n_steps(self) -> int:
+        return self.meta["steps"]
+
+    @property
+    def speed_unit(self) -> str:
+        return "km/h" if self.meta["columns"]["speed"] == "speed_kmh" else "m/s"
+
+    def times(self) -> List[float]:
+        return self._times.tolist()
+
+    def row(self, i: int) -> FcdRow:
+        return FcdRow(self._time[i], self.ids[self._veh[i]], self._x[i], self._y[i], self._speed[i])
+
+    def speed_text(self, i: int) -> str:
+        """Speed of row `i` exactly as written in the CSV ("" where it was empty)."""
+        return bytes(self._speed_text[self._speed_offsets[i]:self._speed_offsets[i + 1]]).decode()
+
+    def step_range(self, t0: Optional[float] = None, t1: Optional[float] = None) -> range:
+        """Indices of the timesteps with t0 <= time <= t1 (open ends when None)."""
+        lo = 0 if t0 is None else bisect.bisect_left(self._times, t0)
+        hi = len(self._times) if t1 is None else bisect.bisect_right(self._times, t1)
+        return range(lo, max(lo, hi))
+
+    def _row_range(self, t0, t1) -> range:
+        steps = self.step_range(t0, t1)
+        return range(self._step_offsets[steps.start], self._step_offsets[steps.stop])
+
+    def time_range(self, t0: Optional[float] = None, t1: Optional[float] = None) -> Iterator[FcdRow]:
+        """Rows with t0 <= time_s <= t1 in file order."""
+        for i in self._row_range(t0, t1):
+            yield self.row(i)
+
+    def steps(self, t0: Optional[float] = None,
+              t1: Optional[float] = None) -> Iterator[Tuple[float, List[FcdRow]]]:
+        """(time_s, rows) per timestep with t0 <= time_s <= t1."""
+        for k in self.step_range(t0, t1):
+            rows = range(self._step_offsets[k], self._step_offsets[k + 1])
+            yield self._times[k], [self.row(i) for i in rows]
+
+    def trajectory(self, veh_id: str, t0: Optional[float] = None, t1: Optional[float] = None) -> List[FcdRow]:
+        """Rows of one vehicle with t0 <= time_s <= t1, in time order."""
+        return [self.row(i) for i in self.trajectory_rows(veh_id, t0, t1)]
+
+    def trajectory_rows(self, veh_id: str, t0: Optional[float] = None,
+                        t1: Optional[float] = None) -> List[int]:
+        """Row numbers of trajectory(), for row() and speed_text()."""
+        code = self._codes.get(veh_id)
+        if code is None:
+            return []
+        lo, hi = self._veh_offsets[code], self._veh_offsets[code + 1]
+        key = self._time.__getitem__
+        if t0 is not None:
+            lo = bisect.bisect_left(self._veh_rows, t0, lo, hi, key=key)
+        if t1 is not None:
+            hi = bisect.bisect_right(self._veh_rows, t1, lo, hi, key=key)
+        return [self._veh_rows[j] for j in range(lo, hi)]
+
+    def bbox(self, xmin: float, ymin: float, xmax: float, ymax: float,
+             t0: Optional[float] = None, t1: Optional[float] = None) -> List[FcdRow]:
+        """Rows inside [xmin, xmax] x [ymin, ymax] with t0 <= time_s <= t1, in time order."""
+        out = []
+        x, y, key = self._x, self._y, self._x.__getitem__
+        for k in self.step_range(t0, t1):
+            lo, hi = self._step_offsets[k], self._step_offsets[k + 1]
+            lo = bisect.bisect_left(self._x_order, xmin, lo, hi, key=key)
+            for j in range(lo, hi):
+                i = self._x_order[j]
+                if not x[i] <= xmax:         # past xmax, or the NaN tail
+                    break
+                if ymin <= y[i] <= ymax:
+                    out.append(self.row(i))
+        return out
+
+
+def open_store(csv_path: str, store_dir: Optional[str] = None) -> FcdStore:
+    """Open the store of `csv_path`, building it first if missing or stale."""
+    store_dir = store_dir or default_store_dir(csv_path)
+    try:
+        with open(os.path.join(store_dir, "meta.json")) as f:
+            meta = json.load(f)
+        fresh = meta.get("version") == STORE_VERSION and meta.get("stamp") == _source_stamp(csv_path)
+    except (OSError, ValueError):
+        fresh = False
+    if not fresh:
+        build_store(csv_path, store_dir)
+    return FcdStore(store_dir)
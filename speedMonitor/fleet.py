@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from kuksa_client.grpc.aio import VSSClient as AsyncVSSClient
+
+from speedMonitor.core import SIG_SPEED, SpeedMonitor, Thresholds
+from speedMonitor.detectors import DetectorBank
+from speedMonitor.io import AlertSink
+from speedMonitor.rules import RuleEngine, overspeed_rule
+
+
+@dataclass
+class Vehicle:
+    vehicle_id: str
+    host: str = "127.0.0.1"
+    port: int = 55556
+
+
+class FleetMonitor:
+    """
+    Watches many vehicles from a single asyncio event loop.
+
+    Every vehicle gets its own SpeedMonitor (so hold state stays per vehicle)
+    and its own Databroker subscription; all alerts go to one shared sink.
+    The monitors share one compiled rule plan and an empty detector bank,
+    and only build a brake system when auto_brake is on.
+
+    sink.write() runs on the event loop, so pass a buffered AlertSink: an
+    unbuffered one does file I/O between every two samples. Brake ramps
+    write through the blocking client and run on a dedicated thread pool,
+    one thread per braking vehicle at most, so they neither queue behind
+    each other nor compete with the loop's default executor.
+
+    Like SpeedMonitor.start(), a vehicle whose subscription fails or ends
+    is polled until the next subscription attempt, `resubscribe_backoff`
+    seconds later, doubling up to `resubscribe_max_backoff` while attempts
+    keep failing.
+    """
+    def __init__(
+        self,
+        thresholds: Thresholds,
+        sink: Optional[AlertSink] = None,
+        hold: float = 2.0,
+        interval: float = 1.0,
+        reconnect_delay: float = 2.0,
+        max_concurrent_connects: int = 50,
+        auto_brake: bool = False,
+        resubscribe_backoff: float = 1.0,
+        resubscribe_max_backoff: float = 30.0,
+    ):
+        self.thresholds = thresholds
+        self.sink = sink
+        self.hold = hold
+        self.interval = interval
+        self.reconnect_delay = reconnect_delay
+        self.auto_brake = auto_brake
+        self.resubscribe_backoff = resubscribe_backoff
+        self.resubscribe_max_backoff = resubscribe_max_backoff
+
+        self.vehicles: Dict[str, Vehicle] = {}
+        self.monitors: Dict[str, SpeedMonitor] = {}
+        self.samples = 0
+        self.alerts = 0
+
+        self._connect_slots = asyncio.Semaphore(max_concurrent_connects)
+        self._running = False
+        # stateless parts shared by every vehicle's monitor
+        self._plan = RuleEngine([overspeed_rule(thresholds.max_speed, hold)])
+        self._no_detectors = DetectorBank()
+        self._brake_pool: Optional[ThreadPoolExecutor] = None
+
+    def add_vehicle(self, vehicle_id: str, host: str = "127.0.0.1", port: int = 55556) -> SpeedMonitor:
+        vehicle = Vehicle(vehicle_id, host, port)
+        mon = SpeedMonitor(self.thresholds, hold=self.hold, interval=self.interval,
+                           rules=self._plan, detectors=self._no_detectors)
+        if self.auto_brake:
+            mon.brake_system.ip = host
+            mon.brake_system.port = port
+
+        self.vehicles[vehicle_id] = vehicle
+        self.monitors[vehicle_id] = mon
+        return mon
+
+    # ------------------------------------------------------------------
+    # Per-sample logic (runs on the event loop, must never block)
+    # ------------------------------------------------------------------
+    def handle_speed(self, vehicle_id: str, speed: float, now: Optional[float] = None):
+        mon = self.monitors[vehicle_id]
+        self.samples += 1
+
+        for a in mon.on_speed(speed):
+            self.alerts += 1
+            if self.sink is not None:
+                self.sink.write(a.kind, a.speed, f"{vehicle_id}: {a.reason}")
+
+        persisted = mon.check_hold(speed, time.time() if now is None else now)
+        if not self.auto_brake:
+            return
+        brake = mon.brake_system
+        brake.observe(speed)
+        if persisted and not brake.active:
+            print(f"[FLEET] {vehicle_id}: overspeed persisted → auto brake")
+            brake.engage_brake(speed, blocking=False)
+            # the ramp writes through the blocking client, keep it off the event loop
+            asyncio.get_running_loop().run_in_executor(self._brake_executor(), brake.run)
+
+    def _brake_executor(self) -> ThreadPoolExecutor:
+        if self._brake_pool is None:
+            # threads are only started on demand, the bound just lets every vehicle ramp at once
+            self._brake_pool = ThreadPoolExecutor(max_workers=max(1, len(self.monitors)),
+                                                  thread_name_prefix="FleetBrake")
+        return self._brake_pool
+
+    # ------------------------------------------------------------------
+    # Connection handling
+    # ------------------------------------------------------------------
+    async def _watch(self, vehicle: Vehicle):
+        while self._running:
+            try:
+                client = AsyncVSSClient(vehicle.host, vehicle.port)
+                try:
+                    async with self._connect_slots:
+                        await client.connect()
+                    await self._stream(vehicle, client)
+                finally:
+                    # also closes the channel of a connect() that failed half way
+                    await client.disconnect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[FLEET] {vehicle.vehicle_id}@{vehicle.host}:{vehicle.port} error: {e}")
+
+            if self._running:
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _stream(self, vehicle: Vehicle, client):
+        """
+        Subscribe; whenever the stream fails or ends, poll until the next
+        attempt. The delay doubles per failed attempt and resets once a
+        subscription delivered updates again.
+        """
+        delay = self.resubscribe_backoff
+        while self._running:
+            received, error = await self._subscribe(vehicle, client)
+            if not self._running:
+                return
+            if received:
+                delay = self.resubscribe_backoff
+            reason = f"failed ({error})" if error is not None else "ended"
+            print(f"[FLEET] {vehicle.vehicle_id}: subscription {reason}, "
+                  f"polling for {delay:.1f}s before resubscribing")
+            await self._poll(vehicle, client, until=time.monotonic() + delay)
+            delay = min(delay * 2, self.resubscribe_max_backoff)
+
+    async def _subscribe(self, vehicle: Vehicle, client):
+        """Handle pushed updates; returns (updates received, exception that broke the stream or None)."""
+        received = 0
+        try:
+            async for updates in client.subscribe_current_values([SIG_SPEED]):
+                received += 1
+                speed = getattr(updates.get(SIG_SPEED), "value", None)
+                if speed is not None:
+                    self.handle_speed(vehicle.vehicle_id, speed)
+                if not self._running:
+                    break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return received, e
+        return received, None
+
+    async def _poll(self, vehicle: Vehicle, client, until: float):
+        """Poll every `interval` seconds until the time.monotonic() deadline `until`."""
+        while self._running and time.monotonic() < until:
+            values = await client.get_current_values([SIG_SPEED])
+            speed = getattr(values.get(SIG_SPEED), "value", None)
+            if speed is not None:
+                self.handle_speed(vehicle.vehicle_id, speed)
+            await asyncio.sleep(self.interval)
+
+    async def run(self, duration: Optional[float] = None):
+        """Watch all registered vehicles until stop() is called or duration elapses."""
+        self._running = True
+        tasks = [asyncio.create_task(self._watch(v)) for v in self.vehicles.values()]
+        print(f"[FLEET] Watching {len(tasks)} vehicles")
+        try:
+            if duration is None:
+                await asyncio.gather(*tasks)
+            else:
+                await asyncio.wait(tasks, timeout=duration)
+        finally:
+            self._running = False
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self._brake_pool is not None:
+                self._brake_pool.shutdown(wait=False)
+                self._brake_pool = None
+            print(f"[FLEET] Stopped after {self.samples} samples, {self.alerts} alerts")
+
+    def stop(self):
+        self._running = False
+
+
+def parse_vehicles(specs: List[str]) -> List[Vehicle]:
+    """Parse `ID=HOST:PORT` specs, e.g. `car7=10.0.0.7:55556`."""
+    vehicles = []
+    for spec in specs:
+        vehicle_id, _, addr = spec.partition("=")
+        host, _, port = addr.rpartition(":")
+        if not vehicle_id or not host or not port:
+            raise ValueError(f"invalid vehicle spec {spec!r}, expected ID=HOST:PORT")
+        vehicles.append(Vehicle(vehicle_id, host, int(port)))
+    return vehicles
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Fleet speed monitor (one process, many Databrokers)")
+    p.add_argument("--vehicle", action="append", default=[],
+                   help="Vehicle to watch as ID=HOST:PORT (repeatable)")
+    p.add_argument("--vehicles-file", help="Text file with one ID=HOST:PORT per line")
+    p.add_argument("--max-speed", type=float, default=80.0)
+    p.add_argument("--hold", type=float, default=2.0)
+    p.add_argument("--csv", default="alerts.csv")
+    p.add_argument("--auto-brake", action="store_true")
+    p.add_argument("--duration", type=float, default=None, help="Stop after N seconds")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    specs = list(args.vehicle)
+    if args.vehicles_file:
+        with open(args.vehicles_file) as f:
+            specs += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    # buffered: rows are written by the sink's own thread, not on the event loop
+    sink = AlertSink(args.csv, buffered=True)
+    fleet = FleetMonitor(Thresholds(args.max_speed), sink, hold=args.hold, auto_brake=args.auto_brake)
+    for v in parse_vehicles(specs):
+        fleet.add_vehicle(v.vehicle_id, v.host, v.port)
+
+    try:
+        asyncio.run(fleet.run(args.duration))
+    except KeyboardInterrupt:
+        print("\n[FLEET] Monitoring stopped by user.")
+    finally:
+        sink.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,211 @@
 import csv
+import os
+import queue
+import threading
 import time
 # Note: List is not strictly needed here anymore, but keeping for reference if using other functions
-from typing import List 
-from .core import Alert 
+from typing import List, Optional
+from .alerts import Alert
+from .alertlog import AlertLogWriter
+from .cooldown import Cooldown
+from .metrics import METRICS, Metrics
+
+# flush: flush after every row (default, every alert is on disk immediately)
+# batch: flush once per written batch
+# fsync: no intermediate flushes, flush + fsync when the sink is closed
+DURABILITY_MODES = ("flush", "batch", "fsync")
+
+_STOP = object()
+
 
 class AlertSink:
-    def __init__(self, filename: str):
+    def __init__(
+        self,
+        filename: str,
+        buffered: bool = False,
+        durability: str = "flush",
+        batch_size: int = 256,
+        max_latency: float = 0.5,
+        queue_size: int = 10000,
+        on_full: str = "block",
+        verbose: bool = True,
+        binary_log: Optional[str] = None,
+        metrics: Metrics = METRICS,
+        cooldown: Optional[Cooldown] = None,
+    ):
+        """
+        buffered=True hands alerts to a background writer thread through a
+        bounded queue; rows are committed in batches of `batch_size` or after
+        `max_latency` seconds, whichever comes first. When the queue is full,
+        on_full="block" waits for the writer and on_full="drop" discards the
+        alert (counted in `dropped`). close() always drains the queue. If the
+        writer thread fails, its exception is re-raised by the next write()
+        and by close().
+        binary_log mirrors every row into a binary alert log (see alertlog.py).
+        The write() -> row-on-disk latency is recorded as the sink_write stage.
+        cooldown (see cooldown.py) drops repeats of a (subject, kind) alert
+        within its period, counted in `suppressed`; by default nothing is dropped.
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got {durability!r}")
+        if on_full not in ("block", "drop"):
+            raise ValueError(f"on_full must be 'block' or 'drop', got {on_full!r}")
+
         self.filename = filename
+        self.buffered = buffered
+        self.durability = durability
+        self.batch_size = max(1, batch_size)
+        self.max_latency = max_latency
+        self.on_full = on_full
+        self.verbose = verbose
+        self.dropped = 0
+        self.suppressed = 0
+        self.cooldown = cooldown
+        self.metrics = metrics
+        self._pending = 0
+        self._last_sec = None
+        self._last_stamp = ""
+
         # Ensure the file is opened for writing
         self.file = open(filename, 'w', newline='')
         self.writer = csv.writer(self.file)
         self.writer.writerow(['timestamp', 'kind', 'speed', 'reason'])
+        self.file.flush()
+        self._binlog = AlertLogWriter(binary_log) if binary_log else None
+
+        self._queue = None
+        self._thread = None
+        self._error: Optional[BaseException] = None
+        if buffered:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._writer_loop, name="AlertSinkWriter", daemon=True)
+            self._thread.start()
         print(f"Alerts will be logged to: {filename}")
 
+    def _stamp(self, ts: float) -> str:
+        # alerts arrive in bursts, so only re-format when the second changes
+        sec = int(ts)
+        if sec != self._last_sec:
+            self._last_sec = sec
+            self._last_stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec))
+        return self._last_stamp
+
+    def _commit(self, batch):
+        for ts, kind, speed, reason in batch:
+            self.writer.writerow([self._stamp(ts), kind, speed, reason])
+            if self._binlog is not None:
+                self._binlog.write(ts, kind, float(speed), reason=reason)
+            if self.verbose:
+                print(f"🚨 ALERT LOGGED: {reason}")
+            if self.durability == "flush":
+                # Force the OS to write data to disk immediately (fixes empty CSV files)
+                self.file.flush()
+
+        if self.durability == "batch":
+            self._pending += len(batch)
+            if self._pending >= self.batch_size or self.buffered:
+                self.file.flush()
+                self._pending = 0
+
+        if self.metrics.enabled:
+            done = time.time()
+            for item in batch:
+                self.metrics.since("sink_write", item[0], done)
+            self.metrics.incr("alerts_written", len(batch))
+
+    def _writer_loop(self):
+        batch = []
+        deadline = None
+        stop = False
+        while not stop:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            while item is not None:
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.max_latency
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if batch and (stop or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    # keep it for write()/close(); they stop waiting on this thread
+                    self._error = e
+                    print(f"⚠️ Alert writer failed: {e!r}")
+                    return
+                batch = []
+                deadline = None
+
+    def _check_writer(self):
+        if self._error is not None:
+            raise self._error
+
+    def _put(self, item):
+        # a plain put() would block forever on a full queue once the writer is gone
+        while True:
+            self._check_writer()
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    raise RuntimeError("alert writer thread is not running")
+
     # Renamed from 'log' to 'write' and updated arguments to match polling loop
-    def write(self, kind: str, speed: float, reason: str):
-        current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Write the row using the explicit arguments
-        self.writer.writerow([current_time, kind, speed, reason])
-        
-        # Print to console
-        print(f"🚨 ALERT LOGGED: {reason}")
-        
-        # Force the OS to write data to disk immediately (fixes empty CSV files)
-        self.file.flush() 
-        
+    def write(self, kind: str, speed: float, reason: str, subject: str = ""):
+        item = (time.time(), kind, speed, reason)
+        if self.cooldown is not None and not self.cooldown.allow(subject, kind, item[0]):
+            self.suppressed += 1
+            return
+
+        if self._queue is None:
+            self._commit((item,))
+            return
+
+        self._check_writer()
+        if self.on_full == "drop":
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+        else:
+            self._put(item)
+
     def close(self):
-        self.file.close()
-        print(f"Alert logging finished. File closed: {self.filename}")
\ No newline at end of file
+        if self._thread is not None:
+            # _put waits until the writer made room, so nothing queued is lost
+            try:
+                self._put(_STOP)
+            except Exception:
+                pass                    # the writer is gone, its error is raised below
+            self._thread.join()
+            self._thread = None
+
+        try:
+            self.file.flush()
+            if self.durability == "fsync":
+                os.fsync(self.file.fileno())
+        finally:
+            self.file.close()
+            if self._binlog is not None:
+                self._binlog.close()
+        if self._error is not None:
+            raise self._error
+        if self.dropped:
+            print(f"⚠️ {self.dropped} alerts dropped (queue full)")
+        if self.suppressed:
+            print(f"ℹ️ {self.suppressed} repeated alerts suppressed (cooldown)")
+        print(f"Alert logging finished. File closed: {self.filename}")
@@ -0,0 +1,248 @@
+"""
+Low-overhead latency instrumentation for the live path.
+
+Stages recorded by the monitor, sink and brake controller (all in seconds):
+  broker_to_receipt   Databroker timestamp on the datapoint -> sample received
+  receipt_to_decision sample received -> overspeed/hold decision made
+  sink_write          AlertSink.write() called -> row written to the CSV
+  engage_to_command   brake engaged -> first actuator write acknowledged
+  actuator_write      duration of one brake set_current_values() call
+
+Every stage is an HDR-style histogram (log-linear buckets, ~1% relative
+error, O(1) record), so leaving it on in production costs one bucket
+increment per sample. Read it with Metrics.snapshot(), MetricsServer
+(HTTP, /metrics for Prometheus text or /metrics.json) or SummaryReporter.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+# values are recorded in integer microseconds; SUB_BITS significant bits are kept
+SUB_BITS = 7
+SUB_COUNT = 1 << SUB_BITS
+HALF_COUNT = SUB_COUNT >> 1
+MAX_VALUE_US = 3600 * 1_000_000          # larger values are clamped to one hour
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+def _index(v: int) -> int:
+    if v < SUB_COUNT:
+        return v
+    shift = v.bit_length() - SUB_BITS
+    return SUB_COUNT + (shift - 1) * HALF_COUNT + ((v >> shift) - HALF_COUNT)
+
+
+def _upper_bound(idx: int) -> int:
+    """Largest value (us) that maps to bucket idx."""
+    if idx < SUB_COUNT:
+        return idx
+    shift, sub = divmod(idx - SUB_COUNT, HALF_COUNT)
+    shift += 1
+    return ((sub + HALF_COUNT + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram; record() takes seconds, reports in seconds."""
+
+    def __init__(self):
+        self.counts = [0] * (_index(MAX_VALUE_US) + 1)
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        v = int(seconds * 1_000_000)
+        if v < 0:
+            v = 0
+        elif v > MAX_VALUE_US:
+            v = MAX_VALUE_US
+        with self._lock:
+            self.counts[_index(v)] += 1
+            self.count += 1
+            self.total_us += v
+            if v > self.max_us:
+                self.max_us = v
+            if self.min_us is None or v < self.min_us:
+                self.min_us = v
+
+    def percentile(self, p: float) -> float:
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, int(round(p / 100.0 * self.count)))
+            seen = 0
+            for idx, c in enumerate(self.counts):
+                seen += c
+                if seen >= rank:
+                    return min(_upper_bound(idx), self.max_us) / 1e6
+        return self.max_us / 1e6
+
+    def snapshot(self) -> Dict[str, float]:
+        """count plus mean/min/max/pXX in milliseconds."""
+        with self._lock:
+            count, total, lo, hi = self.count, self.total_us, self.min_us, self.max_us
+        snap = {
+            "count": count,
+            "mean_ms": total / count / 1e3 if count else 0.0,
+            "min_ms": (lo or 0) / 1e3,
+            "max_ms": hi / 1e3,
+        }
+        for p in PERCENTILES:
+            snap[f"p{p:g}_ms"] = self.percentile(p) * 1e3
+        return snap
+
+    def merge(self, other: "LatencyHistogram"):
+        with other._lock:
+            counts, count, total, lo, hi = list(other.counts), other.count, other.total_us, other.min_us, other.max_us
+        with self._lock:
+            for i, c in enumerate(counts):
+                if c:
+                    self.counts[i] += c
+            self.count += count
+            self.total_us += total
+            self.max_us = max(self.max_us, hi)
+            if lo is not None and (self.min_us is None or lo < self.min_us):
+                self.min_us = lo
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * len(self.counts)
+            self.count = 0
+            self.total_us = 0
+            self.min_us = None
+            self.max_us = 0
+
+
+class Metrics:
+    """Named latency histograms plus simple counters."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        h = self.histograms.get(name)
+        if h is None:
+            with self._lock:
+                h = self.histograms.setdefault(name, LatencyHistogram())
+        return h
+
+    def observe(self, stage: str, seconds: float):
+        if self.enabled:
+            self.histogram(stage).record(seconds)
+
+    def since(self, stage: str, start: float, now: Optional[float] = None):
+        """Record now - start on the wall clock (time.time()), for timestamps from outside the process."""
+        if self.enabled:
+            self.histogram(stage).record((time.time() if now is None else now) - start)
+
+    def elapsed(self, stage: str, start: float):
+        """Record time.perf_counter() - start, for stages inside this process."""
+        if self.enabled:
+            self.histogram(stage).record(time.perf_counter() - start)
+
+    def incr(self, name: str, n: int = 1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            names = sorted(self.histograms)
+            counters = dict(self.counters)
+        return {
+            "stages": {name: self.histograms[name].snapshot() for name in names},
+            "counters": counters,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def summary_line(self) -> str:
+        parts = []
+        for name, s in self.snapshot()["stages"].items():
+            if s["count"]:
+                parts.append(f"{name} n={s['count']} p50={s['p50_ms']:.2f}ms "
+                             f"p99={s['p99_ms']:.2f}ms max={s['max_ms']:.2f}ms")
+        return "[METRICS] " + (" | ".join(parts) if parts else "no samples")
+
+    def prometheus(self) -> str:
+        lines = []
+        snap = self.snapshot()
+        for name, s in snap["stages"].items():
+            metric = f"speedmonitor_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for p in PERCENTILES:
+                lines.append(f'{metric}{{quantile="{p / 100:g}"}} {s[f"p{p:g}_ms"] / 1e3:.6f}')
+            lines.append(f"{metric}_sum {s['mean_ms'] * s['count'] / 1e3:.6f}")
+            lines.append(f"{metric}_count {s['count']}")
+        for name, value in snap["counters"].items():
+            lines.append(f"# TYPE speedmonitor_{name}_total counter")
+            lines.append(f"speedmonitor_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+# process-wide registry used by SpeedMonitor, AlertSink and AutoBrakeSystem
+METRICS = Metrics()
+
+
+class MetricsServer:
+    """Serves /metrics (Prometheus text) and /metrics.json on a local port (0 = any free port)."""
+
+    def __init__(self, metrics: Metrics = METRICS, host: str = "127.0.0.1", port: int = 9108):
+        registry = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, ctype = registry.prometheus().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, ctype = json.dumps(registry.snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.host, self.port = self.httpd.server_address[:2]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class SummaryReporter:
+    """Prints metrics.summary_line() every `interval` seconds from a daemon thread."""
+
+    def __init__(self, metrics: Metrics = METRICS, interval: float = 10.0, log: Callable[[str], None] = print):
+        self.metrics = metrics
+        self.interval = interval
+        self.log = log
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="MetricsSummary", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.log(self.metrics.summary_line())
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
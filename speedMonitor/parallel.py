@@ -0,0 +1,404 @@
+"""
+Multi-process detection pipeline.
+
+One ingestion thread in the parent writes samples into per-worker ring
+buffers in multiprocessing.shared_memory; every worker process owns one
+ring (single producer, single consumer, so no locks) and runs a
+SpeedMonitor with detectors per key. Keys are vehicle ids or signal paths
+and are sharded over the workers, so hold/detector state for one key
+always lives in the same process. Workers send compact alert records
+(t, key, kind, speed, reason) back through one queue, one message per
+processed block. A worker that raises reports the error there and flags
+its ring, so the producer raises instead of waiting on a full ring.
+
+Ring layout (float64 records, 3 slots each: t, value, key id):
+
+  header  int64[8]   [0] write count, [1] read count, [2] closed flag,
+                     [3] failed flag (set by a worker that raised)
+  data    float64[capacity * 3]
+
+Throughput scales with the number of workers as long as the producer
+keeps up; feed it in blocks with submit_many() for high rates.
+"""
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from speedMonitor.core import SpeedMonitor, Thresholds
+from speedMonitor.detectors import default_detectors
+
+HEADER_BYTES = 64
+RECORD = 3                 # doubles per sample
+W, R, CLOSED, FAILED = 0, 1, 2, 3     # header slots
+BLOCK = 4096               # max records a worker handles per pass
+IDLE_SLEEP = 0.0005
+
+
+@dataclass
+class AlertRecord:
+    t: float
+    key: str
+    kind: str
+    speed: float
+    reason: str
+
+
+class SharedRing:
+    """Single-producer/single-consumer ring of (t, value, key id) records in shared memory."""
+
+    def __init__(self, capacity: int = 1 << 16, name: Optional[str] = None):
+        self.capacity = capacity
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + capacity * RECORD * 8)
+        else:
+            self.shm = _attach(name)
+        self.header = self.shm.buf[:HEADER_BYTES].cast("q")
+        self.data = self.shm.buf[HEADER_BYTES:HEADER_BYTES + capacity * RECORD * 8].cast("d")
+        if self.owner:
+            for i in range(len(self.header)):
+                self.header[i] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __len__(self) -> int:
+        return self.header[W] - self.header[R]
+
+    def free(self) -> int:
+        return self.capacity - len(self)
+
+    def write(self, records: array, timeout: Optional[float] = None,
+              alive: Optional[Callable[[], bool]] = None) -> int:
+        """
+        Append flat records (t, value, id, t, value, id, ...); waits while the
+        ring is full. Returns the number of records written (fewer only on timeout).
+        Raises RuntimeError instead of waiting on a reader that has failed or,
+        given `alive`, is no longer alive.
+        """
+        n = len(records) // RECORD
+        done = 0
+        deadline = None if timeout is None else time.monotonic() + timeout
+        header, data, cap = self.header, self.data, self.capacity
+        while done < n:
+            free = cap - (header[W] - header[R])
+            if free == 0:
+                if header[FAILED] or (alive is not None and not alive()):
+                    raise RuntimeError("ring reader is gone, %d of %d records not written" % (n - done, n))
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                time.sleep(IDLE_SLEEP)
+                continue
+            w = header[W]
+            count = min(free, n - done, cap - w % cap)       # stop at the wrap point
+            start = (w % cap) * RECORD
+            data[start:start + count * RECORD] = records[done * RECORD:(done + count) * RECORD]
+            header[W] = w + count                             # publish after the data
+            done += count
+        return done
+
+    def read(self, limit: int = BLOCK) -> array:
+        """Take up to `limit` records (flat array('d')); empty when nothing is pending."""
+        header, cap = self.header, self.capacity
+        r = header[R]
+        count = min(header[W] - r, limit, cap - r % cap)
+        if count <= 0:
+            return array("d")
+        start = (r % cap) * RECORD
+        out = array("d", self.data[start:start + count * RECORD])
+        header[R] = r + count
+        return out
+
+    def close(self):
+        self.header.release()
+        self.data.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    @property
+    def closed(self) -> bool:
+        return bool(self.header[CLOSED])
+
+    def mark_closed(self):
+        self.header[CLOSED] = 1
+
+    @property
+    def failed(self) -> bool:
+        return bool(self.header[FAILED])
+
+    def mark_failed(self):
+        self.header[FAILED] = 1
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        # spawned workers share the parent's resource tracker, which
+        # forgets the segment when the parent unlinks it
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker(index: int, ring_name: str, capacity: int, max_speed: float, hold: float,
+            detectors: Optional[Callable[[], list]], keys: "mp.Queue", out: "mp.Queue"):
+    ring = SharedRing(capacity, name=ring_name)
+    names: Dict[int, str] = {}
+    monitors: Dict[int, SpeedMonitor] = {}
+    thresholds = Thresholds(max_speed)
+    samples = 0
+    try:
+        while True:
+            block = ring.read()
+            if not block:
+                if ring.closed and not len(ring):
+                    break
+                time.sleep(IDLE_SLEEP)
+                continue
+
+            alerts = []
+            for i in range(0, len(block), RECORD):
+                t, v, kid = block[i], block[i + 1], int(block[i + 2])
+                mon = monitors.get(kid)
+                if mon is None:
+                    while kid not in names:
+                        key_id, key = keys.get()
+                        names[key_id] = key
+                    mon = monitors[kid] = SpeedMonitor(
+                        thresholds, hold=hold, detectors=detectors() if detectors else ())
+                for a in mon.on_speed({"speed": v, "timestamp": t}):
+                    alerts.append((t, names[kid], a.kind, a.speed, a.reason))
+            samples += len(block) // RECORD
+            if alerts:
+                out.put(("alerts", index, alerts))
+    except BaseException as e:
+        out.put(("error", index, f"{type(e).__name__}: {e}"))
+        ring.mark_failed()       # the producer stops waiting for this ring
+        raise
+    finally:
+        out.put(("done", index, samples))
+        ring.close()
+
+
+class DetectionPipeline:
+    """
+    Shards samples over `workers` processes (default: one per CPU).
+
+        with DetectionPipeline(workers=8, max_speed=80.0) as pipe:
+            pipe.start_ingest(source)            # iterable of (key, value, t)
+            for alert in pipe.alerts():          # AlertRecord, until the source ends
+                sink.write(alert.kind, alert.speed, f"{alert.key}: {alert.reason}")
+
+    `detectors` is a picklable factory returning a fresh detector list per
+    key (None for the plain SPEEDING threshold). Worker processes are
+    started with "spawn" so they do not inherit gRPC threads of the parent.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_speed: float = 80.0,
+        hold: float = 2.0,
+        detectors: Optional[Callable[[], list]] = default_detectors,
+        capacity: int = 1 << 16,
+        start_method: str = "spawn",
+    ):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_speed = max_speed
+        self.hold = hold
+        self.detectors = detectors
+        self.capacity = capacity
+        self._ctx = mp.get_context(start_method)
+        self.key_ids: Dict[str, int] = {}
+        self.keys: List[str] = []
+        self.rings: List[SharedRing] = []
+        self.procs = []
+        self._key_queues = []
+        self._out = None
+        self._ingest: Optional[threading.Thread] = None
+        self._ingest_error: Optional[BaseException] = None
+        self._buffers: List[array] = []
+        self.samples = 0
+        self.processed: Dict[int, int] = {}
+        self._finished = 0
+        self._closed = False
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> "DetectionPipeline":
+        self._out = self._ctx.Queue()
+        for i in range(self.workers):
+            ring = SharedRing(self.capacity)
+            keys = self._ctx.Queue()
+            proc = self._ctx.Process(
+                target=_worker, name=f"detector-{i}", daemon=True,
+                args=(i, ring.name, self.capacity, self.max_speed, self.hold, self.detectors, keys, self._out),
+            )
+            proc.start()
+            self.rings.append(ring)
+            self._key_queues.append(keys)
+            self.procs.append(proc)
+            self._buffers.append(array("d"))
+        return self
+
+    def __enter__(self):
+        return self.start() if not self.procs else self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def finish(self):
+        """No more input: flush, let the workers drain their rings and exit."""
+        if self._ingest is not None and self._ingest is not threading.current_thread():
+            self._ingest.join()
+        try:
+            self.flush()
+        finally:
+            for ring in self.rings:
+                ring.mark_closed()
+
+    def close(self, timeout: float = 10.0):
+        if self._closed:
+            return
+        try:
+            self.finish()
+            # drain the result queue so workers blocked on put() can exit
+            for _ in self.alerts(timeout=timeout):
+                pass
+        finally:
+            for proc in self.procs:
+                proc.join(timeout)
+                if proc.is_alive():
+                    proc.terminate()
+            for ring in self.rings:
+                ring.close()
+            self._closed = True
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    def shard(self, key: str) -> Tuple[int, int]:
+        """(key id, worker index) for a key; new keys are assigned round-robin."""
+        kid = self.key_ids.get(key)
+        if kid is None:
+            kid = self.key_ids[key] = len(self.keys)
+            self.keys.append(key)
+            self._key_queues[kid % self.workers].put((kid, key))
+        return kid, kid % self.workers
+
+    def submit(self, key: str, value: float, t: Optional[float] = None):
+        """Buffer one sample; buffers are written to the rings in blocks (see flush())."""
+        kid, w = self.shard(key)
+        buf = self._buffers[w]
+        buf.extend((time.time() if t is None else t, value, kid))
+        self.samples += 1
+        if len(buf) >= BLOCK * RECORD:
+            self._flush_one(w)
+
+    def submit_many(self, key: str, values: Sequence[float], timestamps: Sequence[float]):
+        """Write a block of samples for one key straight into its worker's ring."""
+        if len(values) != len(timestamps):
+            raise ValueError("timestamps and values must have the same length")
+        kid, w = self.shard(key)
+        self._flush_one(w)
+        records = array("d", bytes(8 * RECORD * len(values)))
+        records[0::RECORD] = array("d", timestamps)
+        records[1::RECORD] = array("d", values)
+        records[2::RECORD] = array("d", [kid]) * len(values)
+        self.rings[w].write(records, alive=self.procs[w].is_alive)
+        self.samples += len(values)
+
+    def flush(self):
+        for w in range(self.workers):
+            self._flush_one(w)
+
+    def _flush_one(self, w: int):
+        buf = self._buffers[w]
+        if buf:
+            self._buffers[w] = array("d")     # dropped, not retried, if the worker is gone
+            self.rings[w].write(buf, alive=self.procs[w].is_alive)
+
+    def start_ingest(self, source: Iterable[Tuple[str, float, float]], finish: bool = True) -> threading.Thread:
+        """
+        Feed (key, value, t) tuples from `source` on a background thread
+        (the rings have a single producer: do not call submit() meanwhile).
+        With finish=True the pipeline is finished when the source ends, so
+        alerts() returns once every sample has been processed.
+        """
+        def run():
+            try:
+                for key, value, t in source:
+                    self.submit(key, value, t)
+                self.flush()
+            except BaseException as e:           # surfaced by alerts()
+                self._ingest_error = e
+            finally:
+                if finish:
+                    self.finish()
+
+        self._ingest = threading.Thread(target=run, name="pipeline-ingest", daemon=True)
+        self._ingest.start()
+        return self._ingest
+
+    def __len__(self) -> int:
+        """Samples written to the rings but not yet picked up by a worker."""
+        return sum(len(r) for r in self.rings)
+
+    # ------------------------------------------------------------------
+    # Consumer side
+    # ------------------------------------------------------------------
+    def alerts(self, timeout: Optional[float] = None) -> Iterable[AlertRecord]:
+        """
+        Yield alerts as the workers report them until every worker has
+        exited (after finish()) or `timeout` seconds pass without a message.
+        """
+        while self._finished < len(self.procs):
+            try:
+                msg = self._out.get(timeout=timeout if timeout is not None else 0.1)
+            except queue.Empty:
+                if self._ingest_error is not None:
+                    raise self._ingest_error
+                failed = [p.name for p in self.procs if p.exitcode not in (None, 0)]
+                if failed:
+                    raise RuntimeError("detector worker exited: " + ", ".join(failed))
+                if timeout is not None:
+                    return
+                if not any(p.is_alive() for p in self.procs):
+                    return
+                continue
+            tag, worker, payload = msg
+            if tag == "done":
+                self.processed[worker] = payload
+                self._finished += 1
+                continue
+            if tag == "error":
+                raise RuntimeError(f"detector-{worker} failed: {payload}")
+            for t, key, kind, speed, reason in payload:
+                yield AlertRecord(t, key, kind, speed, reason)
+        if self._ingest_error is not None:
+            raise self._ingest_error
+
+    def poll_alerts(self) -> List[AlertRecord]:
+        """Alerts reported so far, without waiting."""
+        return list(self.alerts(timeout=0))
+
+
+def run_pipeline(
+    source: Iterable[Tuple[str, float, float]],
+    on_alert: Callable[[AlertRecord], None],
+    **kwargs,
+) -> Dict[str, int]:
+    """Run `source` through a DetectionPipeline to completion; returns sample counts."""
+    with DetectionPipeline(**kwargs) as pipe:
+        pipe.start_ingest(source)
+        for alert in pipe.alerts():
+            on_alert(alert)
+    return {"samples": pipe.samples, "processed": sum(pipe.processed.values()), "workers": pipe.workers}
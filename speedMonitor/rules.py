@@ -0,0 +1,313 @@
+"""
+Multi-signal alert rules.
+
+Rules are declared in JSON (see config/rules.json) and compiled once into an
+evaluation plan: every rule knows the VSS paths it reads, and an update only
+re-evaluates the rules that read one of the changed paths (plus rules with
+a hold timer running). RuleEngine.paths is the union of all inputs, so one
+subscription feeds the whole rule set.
+
+Condition types:
+  range  {"type": "range", "signal": P, "min": a, "max": b}
+         true while the value is > max or < min (the bound itself is fine)
+  rate   {"type": "rate", "signal": P, "max_rate": r, "direction": "both"|"rise"|"fall"}
+         true while |d value / dt| (per second, between the last two updates) > r
+  all    {"type": "all", "conditions": [...]}   conjunction
+  any    {"type": "any", "conditions": [...]}   disjunction
+
+A rule wraps one condition:
+  {"name": "...", "kind": "ALERT_KIND", "hold": seconds, "trigger": "level"|"edge",
+   "message": "format string with {value}, {name} and the condition's keys", ...condition}
+With "hold" the condition must stay true for more than `hold` seconds before
+the rule fires. "level" rules alert on every evaluation while firing, "edge"
+rules only when they start firing.
+"""
+import json
+import math
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from speedMonitor.alerts import Alert, OVERSPEED, SIG_SPEED
+
+SIG_BRAKE = "Vehicle.Chassis.Brake.PedalPosition"
+SIG_ACCEL = "Vehicle.Chassis.Accelerator.PedalPosition"
+
+BRAKE_ACCEL_CONFLICT = "brake_accel_conflict"
+
+TRIGGERS = ("level", "edge")
+
+
+@dataclass
+class Rule:
+    name: str
+    kind: str
+    condition: Dict[str, Any]
+    hold: Optional[float] = None
+    trigger: str = "level"
+    message: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, spec: Mapping[str, Any]) -> "Rule":
+        spec = dict(spec)
+        try:
+            name = spec.pop("name")
+        except KeyError:
+            raise ValueError(f"rule without a name: {spec}") from None
+        kind = spec.pop("kind", name.upper())
+        hold = spec.pop("hold", None)
+        trigger = spec.pop("trigger", "level")
+        message = spec.pop("message", None)
+        condition = spec.pop("condition", spec)
+        return cls(name, kind, condition, hold, trigger, message)
+
+
+def overspeed_rule(max_speed: float, hold: Optional[float] = None) -> Rule:
+    """The SpeedMonitor overspeed check: Vehicle.Speed > max_speed (held for `hold` seconds)."""
+    return Rule(
+        OVERSPEED, "SPEEDING",
+        {"type": "range", "signal": SIG_SPEED, "max": max_speed},
+        hold=hold,
+        message="speed {value} exceeds max threshold {max}",
+    )
+
+
+def brake_accel_conflict_rule(max_brake_accel: float = 5.0, hold: Optional[float] = None) -> Rule:
+    """Brake and accelerator pedal both pressed beyond max_brake_accel percent."""
+    return Rule(
+        BRAKE_ACCEL_CONFLICT, "CRITICAL_CONFLICT",
+        {"type": "all", "conditions": [
+            {"type": "range", "signal": SIG_BRAKE, "max": max_brake_accel},
+            {"type": "range", "signal": SIG_ACCEL, "max": max_brake_accel},
+        ]},
+        hold=hold,
+        trigger="edge",
+        message="brake and accelerator both above {limit}% (brake {value})",
+    )
+
+
+# ----------------------------------------------------------------------
+# Compilation
+# ----------------------------------------------------------------------
+Check = Callable[["RuleEngine"], bool]
+
+
+def compile_condition(spec: Mapping[str, Any]) -> Tuple[Tuple[str, ...], Check]:
+    """Return (input paths, check) for a condition spec."""
+    ctype = spec.get("type")
+
+    if ctype == "range":
+        path, lo, hi = spec["signal"], spec.get("min"), spec.get("max")
+        if lo is None and hi is None:
+            raise ValueError(f"range condition on {path} needs min and/or max")
+
+        def check(engine):
+            v = engine.values.get(path)
+            if v is None:
+                return False
+            return (hi is not None and v > hi) or (lo is not None and v < lo)
+        return (path,), check
+
+    if ctype == "rate":
+        path, limit = spec["signal"], float(spec["max_rate"])
+        direction = spec.get("direction", "both")
+        if direction not in ("both", "rise", "fall"):
+            raise ValueError(f"rate direction must be both, rise or fall, got {direction!r}")
+
+        def check(engine):
+            r = engine.rate(path)
+            if r is None:
+                return False
+            if direction == "rise":
+                return r > limit
+            if direction == "fall":
+                return -r > limit
+            return abs(r) > limit
+        return (path,), check
+
+    if ctype in ("all", "any"):
+        parts = [compile_condition(c) for c in spec.get("conditions", ())]
+        if not parts:
+            raise ValueError(f"{ctype} condition without conditions")
+        paths = tuple(dict.fromkeys(p for ps, _ in parts for p in ps))
+        checks = [c for _, c in parts]
+        if ctype == "all":
+            return paths, lambda engine: all(c(engine) for c in checks)
+        return paths, lambda engine: any(c(engine) for c in checks)
+
+    raise ValueError(f"unknown condition type: {ctype!r}")
+
+
+@dataclass
+class _Compiled:
+    rule: Rule
+    paths: Tuple[str, ...]
+    check: Check
+    since: Optional[float] = None
+    firing: bool = False
+    format_args: Dict[str, Any] = field(default_factory=dict)
+
+
+class RuleEngine:
+    """Evaluates compiled rules incrementally as signal values arrive."""
+
+    def __init__(self, rules: Iterable[Rule] = ()):
+        self.values: Dict[str, Any] = {}
+        self._last: Dict[str, Tuple[Any, float]] = {}
+        self._prev: Dict[str, Tuple[Any, float]] = {}
+        self._plan: List[_Compiled] = []
+        self._by_name: Dict[str, _Compiled] = {}
+        self.by_signal: Dict[str, List[int]] = {}
+        self.paths: List[str] = []
+        self._pending = set()
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: Rule):
+        if rule.name in self._by_name:
+            raise ValueError(f"duplicate rule name: {rule.name}")
+        if rule.trigger not in TRIGGERS:
+            raise ValueError(f"trigger must be one of {TRIGGERS}, got {rule.trigger!r}")
+        paths, check = compile_condition(rule.condition)
+
+        args = {k: v for k, v in rule.condition.items() if not isinstance(v, (list, dict))}
+        limits = [c.get("max", c.get("min")) for c in rule.condition.get("conditions", ())]
+        if limits:
+            args["limit"] = limits[0]
+        compiled = _Compiled(rule, paths, check, format_args=args)
+
+        idx = len(self._plan)
+        self._plan.append(compiled)
+        self._by_name[rule.name] = compiled
+        for p in paths:
+            if p not in self.by_signal:
+                self.by_signal[p] = []
+                self.paths.append(p)
+            self.by_signal[p].append(idx)
+
+    def fork(self) -> "RuleEngine":
+        """
+        A new engine over the same compiled plan: the condition checks are
+        shared, signal values, hold timers and firing state start fresh.
+        """
+        engine = RuleEngine()
+        engine._plan = [replace(c, since=None, firing=False) for c in self._plan]
+        engine._by_name = {c.rule.name: c for c in engine._plan}
+        engine.by_signal = {p: list(ix) for p, ix in self.by_signal.items()}
+        engine.paths = list(self.paths)
+        return engine
+
+    @property
+    def rules(self) -> List[Rule]:
+        return [c.rule for c in self._plan]
+
+    def rule(self, name: str) -> Rule:
+        return self._by_name[name].rule
+
+    def is_firing(self, name: str) -> bool:
+        return self._by_name[name].firing
+
+    def since(self, name: str) -> Optional[float]:
+        """When the condition of `name` became true (None while it is false)."""
+        return self._by_name[name].since
+
+    @property
+    def firing(self) -> List[str]:
+        return [c.rule.name for c in self._plan if c.firing]
+
+    def rate(self, path: str) -> Optional[float]:
+        prev, last = self._prev.get(path), self._last.get(path)
+        if prev is None or last is None or last[1] <= prev[1]:
+            return None
+        return (last[0] - prev[0]) / (last[1] - prev[1])
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+    def update(self, values: Mapping[str, Any], now: Optional[float] = None) -> List[Alert]:
+        """
+        Apply new signal values (path -> number, None is ignored) and return
+        the alerts of the rules that fire. Only rules reading a changed path
+        or waiting on a hold timer are evaluated.
+        """
+        now = time.time() if now is None else now
+        dirty = set(self._pending)
+        for path, v in values.items():
+            if v is None:
+                continue
+            last = self._last.get(path)
+            if last is not None:
+                self._prev[path] = last
+            self._last[path] = (v, now)
+            self.values[path] = v
+            dirty.update(self.by_signal.get(path, ()))
+
+        alerts: List[Alert] = []
+        for idx in sorted(dirty):
+            alert = self._evaluate(idx, now)
+            if alert is not None:
+                alerts.append(alert)
+        return alerts
+
+    def tick(self, now: Optional[float] = None) -> List[Alert]:
+        """Re-evaluate rules with a running hold timer without new values."""
+        return self.update({}, now)
+
+    def _evaluate(self, idx: int, now: float) -> Optional[Alert]:
+        c = self._plan[idx]
+        rule = c.rule
+        was_firing = c.firing
+
+        if not c.check(self):
+            c.since = None
+            c.firing = False
+            self._pending.discard(idx)
+            return None
+
+        if rule.hold is None:
+            c.firing = True
+        else:
+            if c.since is None:
+                c.since = now
+            c.firing = now - c.since > rule.hold
+            self._pending.add(idx)
+
+        if not c.firing or (rule.trigger == "edge" and was_firing):
+            return None
+        signal = c.paths[0]
+        value = self.values.get(signal)
+        return Alert(kind=rule.kind, speed=self.values.get(SIG_SPEED, math.nan), reason=self._reason(c, value),
+                     rule=rule.name, signal=signal, value=value)
+
+    @staticmethod
+    def _reason(c: _Compiled, value: Any) -> str:
+        if c.rule.message:
+            try:
+                return c.rule.message.format(value=value, name=c.rule.name, **c.format_args)
+            except (KeyError, IndexError, ValueError):
+                pass
+        return f"{c.rule.name}: {c.paths[0]} = {value}"
+
+    # ------------------------------------------------------------------
+    # Live input
+    # ------------------------------------------------------------------
+    def run(self, client, on_alert: Callable[[Alert], None], max_updates: Optional[int] = None) -> int:
+        """Feed the engine from one subscription on all referenced paths."""
+        n = 0
+        for updates in client.subscribe_current_values(self.paths):
+            values = {p: getattr(dp, "value", None) for p, dp in updates.items()}
+            for alert in self.update(values):
+                on_alert(alert)
+            n += 1
+            if max_updates is not None and n >= max_updates:
+                break
+        return n
+
+
+def rules_from_config(config: Mapping[str, Any]) -> List[Rule]:
+    return [Rule.from_dict(spec) for spec in config.get("rules", ())]
+
+
+def load_rules(path: str) -> List[Rule]:
+    with open(path) as f:
+        return rules_from_config(json.load(f))
@@ -1,13 +1,14 @@
 import time
 import random
 from kuksa_client.grpc import VSSClient, Datapoint
+from speedMonitor.connection import CONNECTIONS
 
 SPEED_SIGNAL = "Vehicle.Speed"
 
 def main(ip="127.0.0.1", port=55556):
     print("🚗 Starting Vehicle.Speed simulator...")
 
-    with VSSClient(ip, port) as client:
+    with CONNECTIONS.acquire(ip, port, factory=VSSClient) as client:
         while True:
             try:
                 speed = random.uniform(50, 150)  # Simulate speed between 50–150 km/h
@@ -0,0 +1,116 @@
+"""
+SUMO backend selection for the SUMO-driven tools.
+
+libsumo runs the simulation inside this process and exposes the TraCI
+API (simulation, vehicle, ...) without a socket in between, which makes
+headless batch runs much cheaper. It cannot drive sumo-gui and allows a
+single simulation per process; in those cases, or when libsumo is not
+installed, the socket based traci client is used.
+
+  sim = start(["-c", "sumo.sumocfg"])          # libsumo if available
+  while sim.simulation.getMinExpectedNumber() > 0:
+      sim.simulationStep()
+  sim.close()
+
+The backend is chosen with backend="auto" | "libsumo" | "traci"; "auto"
+honours SUMO's own LIBSUMO_AS_TRACI switch and SUMO_BACKEND. Both
+modules are also found in $SUMO_HOME/tools when they are not pip-installed.
+"""
+import importlib
+import os
+import shutil
+import sys
+from typing import List, Optional, Sequence
+
+BACKENDS = ("auto", "libsumo", "traci")
+
+# TraCI variable ids (traci.constants), so per-step logic can run without SUMO installed
+VAR_SPEED = 0x40
+VAR_POSITION = 0x42
+VAR_TIME = 0x66
+VAR_LEADER = 0x68
+VAR_DEPARTED_VEHICLES_IDS = 0x74
+VAR_MIN_EXPECTED_VEHICLES = 0x7d
+
+
+def _add_tools_path():
+    home = os.environ.get("SUMO_HOME")
+    if home:
+        tools = os.path.join(home, "tools")
+        if os.path.isdir(tools) and tools not in sys.path:
+            sys.path.append(tools)
+
+
+def find_sumo_binary(name: str = "sumo") -> str:
+    """
+    Resolve `name` (sumo, sumo-gui or a path) to an executable: an explicit
+    path, then $SUMO_HOME/bin, then PATH. Raises FileNotFoundError.
+    """
+    if os.path.dirname(name):
+        if os.path.isfile(name) and os.access(name, os.X_OK):
+            return name
+        raise FileNotFoundError(f"SUMO binary not found at: {name}")
+
+    home = os.environ.get("SUMO_HOME")
+    if home:
+        for candidate in (name, name + ".exe"):
+            path = os.path.join(home, "bin", candidate)
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                return path
+
+    path = shutil.which(name)
+    if path:
+        return path
+    raise FileNotFoundError(f"{name} not found in $SUMO_HOME/bin or PATH; set SUMO_HOME or install SUMO")
+
+
+def _import(name: str):
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        _add_tools_path()
+        return importlib.import_module(name)
+
+
+def load_backend(backend: str = "auto", gui: bool = False):
+    """Return the libsumo or traci module according to `backend`."""
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+    if backend == "auto":
+        backend = os.environ.get("SUMO_BACKEND", "auto")
+        if backend == "auto" and os.environ.get("LIBSUMO_AS_TRACI"):
+            backend = "libsumo"
+    if backend == "libsumo" and gui:
+        raise ValueError("libsumo cannot drive sumo-gui, use backend='traci'")
+
+    if backend in ("auto", "libsumo") and not gui:
+        try:
+            return _import("libsumo")
+        except ImportError:
+            if backend == "libsumo":
+                raise
+    return _import("traci")
+
+
+def backend_name(module) -> str:
+    return "libsumo" if module.__name__.split(".")[0] == "libsumo" else "traci"
+
+
+def start(args: Sequence[str], backend: str = "auto", binary: str = "sumo", label: Optional[str] = None):
+    """
+    Start a simulation with the SUMO arguments `args` (without the binary)
+    and return the backend module, used like `traci`. The binary is only
+    looked up for the socket backend; libsumo loads SUMO as a library.
+    """
+    gui = os.path.basename(binary).startswith("sumo-gui")
+    sim = load_backend(backend, gui=gui)
+    if backend_name(sim) == "libsumo":
+        cmd: List[str] = [binary, *args]
+        sim.start(cmd)
+    else:
+        cmd = [find_sumo_binary(binary), *args]
+        if label is None:
+            sim.start(cmd)
+        else:
+            sim.start(cmd, label=label)
+    return sim
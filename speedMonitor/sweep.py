@@ -0,0 +1,287 @@
+"""
+Parameter sweep over SUMO scenarios and ADAS thresholds.
+
+Every (scenario, parameter combination) cell runs in its own worker
+process and output directory:
+
+  <out>/<scenario>/<cell>/fcd_traci.csv, alerts.csv   dump_via_traci.py (TraCI/libsumo run)
+  <out>/<scenario>/<cell>/fcd.xml                     SUMO FCD output of the same run
+  <out>/<scenario>/<cell>/scenario.csv, scenario_alerts.csv
+                                                      fcd_to_csv.py ego/lead analysis
+  <out>/<scenario>/<cell>/result.json                 cell metrics, written last
+
+A cell whose result.json exists is finished and is skipped on the next
+run, so an interrupted sweep resumes where it stopped. summary.csv
+collects one row per cell: parameters, the alert counts of the TraCI run
+(DISTANCE_CLOSE among them) and of the FCD analysis (BRAKE among them),
+kept apart because both flag the same close approaches, and the minimum
+TTC.
+
+  python -m speedMonitor.sweep --grid min_gap_m=5,10,15 --grid ttc_thresh_s=1.5,2.0
+"""
+import argparse
+import csv
+import importlib.util
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (sumocfg relative to the repo root, ego id, lead id)
+SCENARIOS = {
+    "simple_highway": ("sumo_scenarios/simple_highway/sumo_config.sumocfg", "veh1", "veh0"),
+    "sumo-acc-demo": ("sumo-acc-demo/sumo.sumocfg", "ego", "lead"),
+    "adas_simple": ("adas/simple.sumocfg", "ego", "lead"),
+}
+
+# min_gap_m / overspeed_tol_kmh drive the TraCI run (dump_via_traci.py),
+# the rest the FCD analysis (fcd_to_csv.py --min-gap-m/--time-headway-s/--ttc-thresh-s)
+DEFAULT_PARAMS = {
+    "min_gap_m": 10.0,
+    "overspeed_tol_kmh": 5.0,
+    "standstill_gap_m": 2.0,
+    "time_headway_s": 1.5,
+    "ttc_thresh_s": 2.0,
+}
+
+RESULT_FILE = "result.json"
+SUMMARY_COLUMNS = ["scenario", "cell", *DEFAULT_PARAMS, "status",
+                   "traci_alerts", "distance_close", "fcd_alerts", "fcd_brake", "min_ttc_s",
+                   "traci_alerts_by_kind", "fcd_alerts_by_kind", "elapsed_s", "error"]
+COUNT_KEYS = ("traci_alerts", "distance_close", "fcd_alerts", "fcd_brake")
+
+
+def load_script(relpath: str):
+    path = os.path.join(ROOT, relpath)
+    name = "_sweep_" + relpath.replace("/", "_").replace("-", "_").replace(".py", "")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def expand_grid(grid: Mapping[str, Sequence]) -> List[Dict[str, float]]:
+    """Cartesian product of `grid` on top of DEFAULT_PARAMS."""
+    unknown = set(grid) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"unknown sweep parameters: {sorted(unknown)}; known: {list(DEFAULT_PARAMS)}")
+    keys = list(grid)
+    cells = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        params = dict(DEFAULT_PARAMS)
+        params.update(zip(keys, values))
+        cells.append(params)
+    return cells
+
+
+def cell_name(params: Mapping[str, float], keys: Iterable[str]) -> str:
+    """Directory name of a cell from the swept parameters, e.g. min_gap_m=5.0_ttc_thresh_s=1.5."""
+    # repr round-trips, so distinct values never share a directory
+    parts = [f"{k}={float(params[k])!r}" for k in keys]
+    return "_".join(parts) or "default"
+
+
+# ----------------------------------------------------------------------
+# One cell (runs in a worker process)
+# ----------------------------------------------------------------------
+def _count_kinds(path: str, column: str) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    if not os.path.exists(path):
+        return counts
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            kind = row.get(column) or ""
+            counts[kind] = counts.get(kind, 0) + 1
+    return counts
+
+
+def run_cell(scenario: str, params: Mapping[str, float], out_dir: str, backend: str = "auto",
+             sumo_bin: Optional[str] = None) -> Dict:
+    """Simulate one cell, analyse it and write result.json (last, so it marks completion)."""
+    cfg, ego_id, lead_id = SCENARIOS[scenario]
+    start = time.perf_counter()
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)          # leftovers of an interrupted attempt
+    os.makedirs(out_dir)
+    fcd_xml = os.path.join(out_dir, "fcd.xml")
+
+    dump = load_script("sumo-acc-demo/dump_via_traci.py")
+    analysis = load_script("sumo-acc-demo/fcd_to_csv.py")
+
+    _, traci_alerts = dump.main(
+        cfg_file=os.path.join(ROOT, cfg), out_dir=out_dir,
+        min_gap_m=params["min_gap_m"], overspeed_tol_kmh=params["overspeed_tol_kmh"],
+        extra_args=["--fcd-output", fcd_xml], backend=backend, sumo_bin=sumo_bin,
+    )
+
+    df_scene = analysis.stream_fcd(fcd_xml, os.path.join(out_dir, "fcd_all.csv"),
+                                   ego_id=ego_id, lead_id=lead_id)[0]
+    df_scene = analysis.mark_brake_and_speeding(
+        df_scene, min_gap_m=params["standstill_gap_m"],
+        time_headway_s=params["time_headway_s"], ttc_thresh_s=params["ttc_thresh_s"],
+    )
+    df_scene.to_csv(os.path.join(out_dir, "scenario.csv"), index=False)
+    scenario_alerts = os.path.join(out_dir, "scenario_alerts.csv")
+    analysis.emit_alerts(df_scene, scenario_alerts)
+
+    traci_by_kind = _count_kinds(str(traci_alerts), "kind")
+    fcd_by_kind = _count_kinds(scenario_alerts, "kind")
+    ttc = df_scene["ttc_s"].astype(float) if "ttc_s" in df_scene else []
+    finite = [v for v in ttc if math.isfinite(v)]
+
+    result = {
+        "scenario": scenario,
+        "params": dict(params),
+        "status": "ok",
+        "traci_alerts": sum(traci_by_kind.values()),
+        "traci_alerts_by_kind": traci_by_kind,
+        "distance_close": traci_by_kind.get("DISTANCE_CLOSE", 0),
+        "fcd_alerts": sum(fcd_by_kind.values()),
+        "fcd_alerts_by_kind": fcd_by_kind,
+        "fcd_brake": fcd_by_kind.get("BRAKE", 0),
+        "min_ttc_s": min(finite) if finite else None,
+        "elapsed_s": time.perf_counter() - start,
+    }
+    _write_result(out_dir, result)
+    return result
+
+
+def _write_result(out_dir: str, result: Dict):
+    tmp = os.path.join(out_dir, RESULT_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(out_dir, RESULT_FILE))
+
+
+def _run_cell_safe(scenario, params, out_dir, backend, sumo_bin):
+    try:
+        return run_cell(scenario, params, out_dir, backend, sumo_bin)
+    except Exception as e:
+        # failed cells are reported but not marked finished, so a rerun retries them
+        return {"scenario": scenario, "params": dict(params), "status": "failed",
+                "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+
+
+def load_result(out_dir: str) -> Optional[Dict]:
+    path = os.path.join(out_dir, RESULT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+# ----------------------------------------------------------------------
+# Sweep
+# ----------------------------------------------------------------------
+def run_sweep(
+    grid: Mapping[str, Sequence],
+    scenarios: Sequence[str] = tuple(SCENARIOS),
+    out_root: str = "outputs/sweep",
+    workers: Optional[int] = None,
+    backend: str = "auto",
+    sumo_bin: Optional[str] = None,
+    log=print,
+) -> List[Dict]:
+    """
+    Run every scenario x grid cell not finished yet on a process pool (one
+    worker per CPU by default) and write <out_root>/summary.csv. Returns the
+    results of all cells, finished earlier or now.
+    """
+    for s in scenarios:
+        if s not in SCENARIOS:
+            raise ValueError(f"unknown scenario {s!r}; known: {list(SCENARIOS)}")
+    cells = [(s, params, os.path.join(out_root, s, cell_name(params, grid)))
+             for s in scenarios for params in expand_grid(grid)]
+
+    results: Dict[str, Dict] = {}
+    todo = []
+    for scenario, params, out_dir in cells:
+        done = load_result(out_dir)
+        if done is not None:
+            results[out_dir] = done
+        else:
+            todo.append((scenario, params, out_dir))
+    log(f"[SWEEP] {len(cells)} cells, {len(cells) - len(todo)} already finished, {len(todo)} to run")
+
+    if todo:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+        # spawn: every cell gets a fresh interpreter, libsumo allows one simulation per process
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+            futures = {pool.submit(_run_cell_safe, s, p, d, backend, sumo_bin): d for s, p, d in todo}
+            for n, fut in enumerate(as_completed(futures), 1):
+                out_dir = futures[fut]
+                res = fut.result()
+                results[out_dir] = res
+                log(f"[SWEEP] {n}/{len(todo)} {os.path.relpath(out_dir, out_root)}: {res['status']}"
+                    + (f" ({res['error']})" if res["status"] != "ok" else
+                       f", {res['traci_alerts']} TraCI / {res['fcd_alerts']} FCD alerts,"
+                       f" min TTC {res['min_ttc_s']}"))
+
+    ordered = [dict(results[d], cell=os.path.basename(d)) for _, _, d in cells]
+    write_summary(os.path.join(out_root, "summary.csv"), ordered)
+    return ordered
+
+
+def write_summary(path: str, results: Sequence[Dict]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS, extrasaction="ignore")
+        w.writeheader()
+        for r in results:
+            row = dict(r.get("params", {}))
+            row.update({k: r.get(k) for k in ("scenario", "cell", "status", *COUNT_KEYS, "min_ttc_s", "error")})
+            for k in ("traci_alerts_by_kind", "fcd_alerts_by_kind"):
+                row[k] = json.dumps(r.get(k, {}), sort_keys=True)
+            row["elapsed_s"] = f"{r['elapsed_s']:.2f}" if r.get("elapsed_s") is not None else ""
+            w.writerow(row)
+
+
+def parse_grid(specs: Sequence[str], grid_file: Optional[str] = None) -> Dict[str, List[float]]:
+    """`name=v1,v2,...` specs (and/or a JSON file {name: [values]}) -> grid."""
+    grid: Dict[str, List[float]] = {}
+    if grid_file:
+        with open(grid_file) as f:
+            grid.update({k: [float(v) for v in vs] for k, vs in json.load(f).items()})
+    for spec in specs:
+        name, sep, values = spec.partition("=")
+        if not sep or not values:
+            raise ValueError(f"invalid grid spec {spec!r}, expected name=v1,v2,...")
+        grid[name.strip()] = [float(v) for v in values.split(",")]
+    return grid
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Sweep SUMO scenarios x ADAS parameters on a process pool")
+    p.add_argument("--grid", action="append", default=[],
+                   help=f"name=v1,v2,... (repeatable); names: {', '.join(DEFAULT_PARAMS)}")
+    p.add_argument("--grid-file", help="JSON file {name: [values]}")
+    p.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                   help="Scenario to include (repeatable, default: all)")
+    p.add_argument("--out", default="outputs/sweep")
+    p.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    p.add_argument("--backend", choices=("auto", "libsumo", "traci"), default="auto")
+    p.add_argument("--sumo", default=None, help="SUMO binary for the socket backend")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    grid = parse_grid(args.grid, args.grid_file)
+    results = run_sweep(grid, args.scenario or tuple(SCENARIOS), args.out, args.workers,
+                        args.backend, args.sumo)
+    failed = [r for r in results if r.get("status") != "ok"]
+    print(f"✅ Wrote {os.path.join(args.out, 'summary.csv')} ({len(results)} cells, {len(failed)} failed)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
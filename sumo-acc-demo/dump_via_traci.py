@@ -1,10 +1,20 @@
+import argparse
 import os
 import csv
 import math
+import sys
 import time
 from pathlib import Path
 
-SUMO_BIN = "/Users/chaomeng/sumo-install/bin/sumo"  #  sumo path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from speedMonitor import sumo_backend
+from speedMonitor.cooldown import Cooldown, TtlCache
+from speedMonitor.sumo_backend import (
+    VAR_DEPARTED_VEHICLES_IDS, VAR_LEADER, VAR_MIN_EXPECTED_VEHICLES, VAR_POSITION, VAR_SPEED, VAR_TIME,
+)
+
+SUMO_BIN = os.environ.get("SUMO_BIN", "sumo")  # name or path; names are looked up in $SUMO_HOME/bin, then PATH
+BACKEND = "auto"                               # libsumo in-process when installed, else TraCI over a socket
 
 CFG_FILE = "sumo.sumocfg"  
 OUT_CSV  = Path("outputs/fcd_traci.csv")
@@ -19,18 +29,16 @@ MIN_GAP_M = 10.0
 GAP_HYSTERESIS = 2.0              
 LEADER_LOOKAHEAD = 200.0         
 ALERT_COOLDOWN_S = 2.0            
+STATE_TTL_S = 10.0                # per-vehicle state is dropped this long (sim time) after a vehicle was last seen
+STATE_MAX_ENTRIES = 100_000
 
 
-last_alert_time = {}  # key=(veh_id, kind) -> sim_time
-brake_active = {}     # key=veh_id -> bool
+# bounded by sim-time TTL and size, so memory stays flat however many vehicles pass through
+alert_cooldown = Cooldown(ALERT_COOLDOWN_S, max_entries=STATE_MAX_ENTRIES)   # key=(veh_id, kind)
+brake_active = TtlCache(STATE_TTL_S, max_entries=STATE_MAX_ENTRIES)          # key=veh_id -> bool
 
 def now_ok_to_alert(veh_id, kind, t):
-    k = (veh_id, kind)
-    last = last_alert_time.get(k, -1e9)
-    if t - last >= ALERT_COOLDOWN_S:
-        last_alert_time[k] = t
-        return True
-    return False
+    return alert_cooldown.allow(veh_id, kind, t)
 
 def kmh_to_ms(v):
     return v / 3.6
@@ -41,99 +49,139 @@ def ms_to_kmh(v):
 def write_alert(writer, t, kind, subject, details):
     writer.writerow([t, kind, subject, details])
 
-def main():
+def subscribe_vehicle(traci, vid):
+    """
+    One-time subscription: position, speed and leader arrive with every
+    simulationStep(). A new subscription replaces the old one for the same
+    vehicle, so the leader lookahead goes into the same call
+    (subscribeLeader() alone would drop position and speed).
+    """
+    traci.vehicle.subscribe(vid, (VAR_POSITION, VAR_SPEED, VAR_LEADER),
+                            parameters={VAR_LEADER: ("d", LEADER_LOOKAHEAD)})
+
+def process_step(t, results, fcd_writer, alert_writer, min_gap_m=None, overspeed_tol_kmh=None):
+    """
+    Single pass over one step's subscription results ({veh_id: {var: value}}):
+    FCD row, gap check and overspeed check per vehicle. Returns the
+    (veh_id, target_ms) slowDown commands; a later command for the same
+    vehicle overrides an earlier one, as in SUMO.
+    min_gap_m / overspeed_tol_kmh default to MIN_GAP_M / OVERSPEED_TOL_KMH.
+    """
+    min_gap_m = MIN_GAP_M if min_gap_m is None else min_gap_m
+    overspeed_tol_kmh = OVERSPEED_TOL_KMH if overspeed_tol_kmh is None else overspeed_tol_kmh
+    commands = []
+    for vid, res in results.items():
+        x, y = res[VAR_POSITION]
+        v_ms = res[VAR_SPEED]
+        v_kmh = ms_to_kmh(v_ms)
+        fcd_writer.writerow([t, vid, x, y, v_kmh])
+
+        # (leader_id, gap) ; gap = front bumper distance (m), ("", -1) without leader
+        leader = res.get(VAR_LEADER)
+        if not leader or not leader[0]:
+            brake_active.set(vid, False, t)
+        else:
+            leader_id, gap_m = leader
+            if gap_m < min_gap_m:
+                # the leader's speed is part of the same batch
+                v_leader_ms = results.get(leader_id, {}).get(VAR_SPEED, kmh_to_ms(SPEED_LIMIT_KMH))
+                target_ms = max(0.0, v_leader_ms - 1.0)
+                commands.append((vid, target_ms))
+                if now_ok_to_alert(vid, "DISTANCE_CLOSE", t):
+                    write_alert(
+                        alert_writer, t, "DISTANCE_CLOSE", vid,
+                        f"gap={gap_m:.2f}m < {min_gap_m:.2f}m; target={ms_to_kmh(target_ms):.1f}km/h"
+                    )
+                brake_active.set(vid, True, t)
+            elif brake_active.get(vid, False, t):
+                if gap_m > min_gap_m + GAP_HYSTERESIS:
+                    if now_ok_to_alert(vid, "DISTANCE_CLEAR", t):
+                        write_alert(
+                            alert_writer, t, "DISTANCE_CLEAR", vid,
+                            f"gap={gap_m:.2f}m >= {min_gap_m + GAP_HYSTERESIS:.2f}m"
+                        )
+                    brake_active.set(vid, False, t)
+                else:
+                    brake_active.set(vid, True, t)     # still inside the hysteresis band, keep it alive
+
+        if v_kmh > SPEED_LIMIT_KMH + overspeed_tol_kmh:
+            commands.append((vid, kmh_to_ms(SPEED_LIMIT_KMH)))
+            if now_ok_to_alert(vid, "OVERSPEED", t):
+                write_alert(
+                    alert_writer, t, "OVERSPEED", vid,
+                    f"speed={v_kmh:.1f}km/h > limit={SPEED_LIMIT_KMH:.1f}km/h"
+                )
+    return commands
+
+def main(cfg_file=None, out_dir=None, min_gap_m=None, overspeed_tol_kmh=None, extra_args=(),
+         backend=None, sumo_bin=None):
+    """
+    Run one simulation. Without arguments it uses the module constants;
+    the sweep runner passes its own config, output directory (fcd_traci.csv
+    and alerts.csv go there), parameters and extra SUMO arguments.
+    Returns (fcd csv path, alerts csv path).
+    """
+    out_csv = Path(out_dir) / OUT_CSV.name if out_dir else OUT_CSV
+    alerts_csv = Path(out_dir) / ALERTS_CSV.name if out_dir else ALERTS_CSV
+
     # export output dir
-    OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    alerts_csv.parent.mkdir(parents=True, exist_ok=True)
+    # one run per call, cooldown and brake state never leak into the next one
+    alert_cooldown.clear()
+    brake_active.clear()
 
     # methods to launch SUMO
-    cmd = [SUMO_BIN, "-c", CFG_FILE, "--step-length", str(STEP_LENGTH_S)]
-
-  
-    import traci
+    args = ["-c", str(cfg_file or CFG_FILE), "--step-length", str(STEP_LENGTH_S), *extra_args]
+    traci = sumo_backend.start(args, backend=backend or BACKEND, binary=sumo_bin or SUMO_BIN)
 
+    # everything the loop reads is delivered with the simulationStep() reply,
+    # so a step costs one round trip plus the slowDown() commands it issues
+    traci.simulation.subscribe((VAR_TIME, VAR_MIN_EXPECTED_VEHICLES, VAR_DEPARTED_VEHICLES_IDS))
+    for vid in traci.vehicle.getIDList():
+        subscribe_vehicle(traci, vid)
+    sim = traci.simulation.getSubscriptionResults()
 
-    traci.start(cmd)
-
-   
-    with OUT_CSV.open("w", newline="") as f_fcd, ALERTS_CSV.open("w", newline="") as f_alerts:
+    with out_csv.open("w", newline="") as f_fcd, alerts_csv.open("w", newline="") as f_alerts:
         fcd_writer = csv.writer(f_fcd)
         alert_writer = csv.writer(f_alerts)
 
         fcd_writer.writerow(["time_s", "veh_id", "x_m", "y_m", "speed_kmh"])
         alert_writer.writerow(["time_s", "kind", "subject", "details"])
 
-      
-        while traci.simulation.getMinExpectedNumber() > 0:
+        while sim[VAR_MIN_EXPECTED_VEHICLES] > 0:
             traci.simulationStep()
-            t = traci.simulation.getTime()  
-
-            veh_ids = list(traci.vehicle.getIDList())
-
-            for vid in veh_ids:
-                x, y = traci.vehicle.getPosition(vid)
-                v_ms = traci.vehicle.getSpeed(vid)
-                fcd_writer.writerow([t, vid, x, y, ms_to_kmh(v_ms)])
+            sim = traci.simulation.getSubscriptionResults()
+            t = sim[VAR_TIME]
 
+            # vehicles that entered in this step are subscribed once; subscribe()
+            # already stores their current values, so they are in this step's results
+            for vid in sim[VAR_DEPARTED_VEHICLES_IDS]:
+                subscribe_vehicle(traci, vid)
 
-            for vid in veh_ids:
+            results = traci.vehicle.getAllSubscriptionResults()
+            for vid, target_ms in process_step(t, results, fcd_writer, alert_writer, min_gap_m, overspeed_tol_kmh):
                 try:
-                    # (leader_id, gap) ; gap = front bumper distance (m)
-                    leader = traci.vehicle.getLeader(vid, LEADER_LOOKAHEAD)
-                except traci.TraCIException:
-                    leader = None
-
-                if not leader:
-
-                    brake_active[vid] = False
-                    continue
-
-                leader_id, gap_m = leader
-
-                if gap_m < MIN_GAP_M:
-       
-                    try:
-                        v_leader_ms = traci.vehicle.getSpeed(leader_id)
-                    except traci.TraCIException:
-                        v_leader_ms = kmh_to_ms(SPEED_LIMIT_KMH)  
-
-                    target_ms = max(0.0, v_leader_ms - 1.0)
-
-                    traci.vehicle.slowDown(vid, target_ms, int(SLOWDOWN_DURATION_S * 1000))
-                    if now_ok_to_alert(vid, "DISTANCE_CLOSE", t):
-                        write_alert(
-                            alert_writer, t, "DISTANCE_CLOSE", vid,
-                            f"gap={gap_m:.2f}m < {MIN_GAP_M:.2f}m; target={ms_to_kmh(target_ms):.1f}km/h"
-                        )
-                    brake_active[vid] = True
-                else:
-
-                    if brake_active.get(vid, False) and gap_m > MIN_GAP_M + GAP_HYSTERESIS:
-                        if now_ok_to_alert(vid, "DISTANCE_CLEAR", t):
-                            write_alert(
-                                alert_writer, t, "DISTANCE_CLEAR", vid,
-                                f"gap={gap_m:.2f}m >= {MIN_GAP_M + GAP_HYSTERESIS:.2f}m"
-                            )
-                        brake_active[vid] = False
-
-            for vid in veh_ids:
-                v_ms = traci.vehicle.getSpeed(vid)
-                v_kmh = ms_to_kmh(v_ms)
-                if v_kmh > SPEED_LIMIT_KMH + OVERSPEED_TOL_KMH:
-                    target_ms = kmh_to_ms(SPEED_LIMIT_KMH)
                     traci.vehicle.slowDown(vid, target_ms, int(SLOWDOWN_DURATION_S * 1000))
-                    if now_ok_to_alert(vid, "OVERSPEED", t):
-                        write_alert(
-                            alert_writer, t, "OVERSPEED", vid,
-                            f"speed={v_kmh:.1f}km/h > limit={SPEED_LIMIT_KMH:.1f}km/h"
-                        )
+                except traci.TraCIException:
+                    pass   # vehicle left the network in this step
 
     traci.close()
-    print(f"✅ Wrote {OUT_CSV} (via TraCI)")
-    print(f"✅ Wrote {ALERTS_CSV} (events)")
+    print(f"✅ Wrote {out_csv} (via {sumo_backend.backend_name(traci)})")
+    print(f"✅ Wrote {alerts_csv} (events)")
+    return out_csv, alerts_csv
 
 if __name__ == "__main__":
-    if not Path(SUMO_BIN).exists():
-        raise SystemExit(f"SUMO binary not found at: {SUMO_BIN}")
+    p = argparse.ArgumentParser(description="Run the ACC scenario through TraCI/libsumo and dump FCD + alerts")
+    p.add_argument("--backend", choices=sumo_backend.BACKENDS, default=BACKEND)
+    p.add_argument("--sumo", default=SUMO_BIN, help="SUMO binary name or path (socket backend)")
+    cli = p.parse_args()
+    BACKEND, SUMO_BIN = cli.backend, cli.sumo
+    try:
+        if sumo_backend.backend_name(sumo_backend.load_backend(BACKEND)) == "traci":
+            sumo_backend.find_sumo_binary(SUMO_BIN)
+    except (ImportError, FileNotFoundError) as e:
+        raise SystemExit(str(e))
     if not Path("sumo.sumocfg").exists() and not (Path("road.net.xml").exists() and Path("routes.rou.xml").exists()):
         raise SystemExit("Missing sumo.sumocfg or (road.net.xml + routes.rou.xml)")
     main()
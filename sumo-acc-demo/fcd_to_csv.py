@@ -1,8 +1,13 @@
 
 
 import argparse
+import hashlib
+import json
 import math
+import os
+import shutil
 import xml.etree.ElementTree as ET
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
@@ -25,6 +30,12 @@ def parse_args():
                    help="TTC阈值（s），默认2.0；当相对速度>0且TTC小于该值时刹车")
     p.add_argument("--ego-len-m", type=float, default=5.0,
                    help="自车长度，用于一维x向间距修正（默认5m）")
+    p.add_argument("--all-pairs-out", default=None,
+                   help="Optional CSV with gap/TTC for every vehicle and its leader on the same lane")
+    p.add_argument("--cache-dir", default=None,
+                   help="Columnar cache of the parsed FCD (default: <in>.cache next to the XML)")
+    p.add_argument("--no-cache", action="store_true",
+                   help="Always parse the XML, neither read nor write the cache")
     return p.parse_args()
 
 def load_xml(path: str):
@@ -34,74 +45,507 @@ def load_xml(path: str):
     tree = ET.parse(str(path))
     return tree.getroot()
 
+def iter_timesteps(path: str):
+    """
+    Stream <timestep> elements with iterparse instead of loading the whole
+    document. Yields (time_s, [vehicle attribute dicts]); every element is
+    cleared as soon as it has been read, so memory stays flat on multi-GB files.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"FCD xml not found: {path.resolve()}")
+
+    context = ET.iterparse(str(path), events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event == "end" and elem.tag == "timestep":
+            t = float(elem.attrib.get("time", "0"))
+            vehicles = [dict(veh.attrib) for veh in elem.findall("vehicle")]
+            root.clear()
+            yield t, vehicles
+
+def iter_timestep_batches(path: str, batch_size: int = 1000):
+    """Group iter_timesteps() output into lists of up to batch_size timesteps."""
+    batch = []
+    for step in iter_timesteps(path):
+        batch.append(step)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _steps(source):
+    # accept a parsed root (old API) or an iterable of (time_s, vehicles)
+    if isinstance(source, ET.Element):
+        return ((float(ts.attrib.get("time", "0")), [veh.attrib for veh in ts.findall("vehicle")])
+                for ts in source.findall("timestep"))
+    return source
+
+SCENE_COLUMNS = [
+    "t_s", "v_self_kmh", "v_lead_kmh", "lead_dist_m",
+    "rel_speed_kmh", "rel_speed_mps", "ttc_s"
+]
+ALL_COLUMNS = ["time_s", "id", "x_m", "y_m", "speed_kmh"]
+ALERT_COLUMNS = ["timestamp", "kind", "speed", "distance", "reason"]
+PAIR_COLUMNS = ["veh_id", "lead_id"] + SCENE_COLUMNS
+
+def _floats(values):
+    return np.fromiter(map(float, values), dtype=np.float64, count=len(values))
+
+def vehicle_frame(steps, step_offset=0):
+    """
+    Turn a list of (time_s, vehicles) into one columnar DataFrame:
+    step, time_s, id, x_m, y_m, speed_kmh (+ lane, pos_m for leader detection).
+    `step` numbers the <timestep> elements so repeated times stay distinct.
+    """
+    counts = [len(vehicles) for _, vehicles in steps]
+    vehs = [veh for _, vehicles in steps for veh in vehicles]
+    return pd.DataFrame({
+        "step": np.repeat(np.arange(step_offset, step_offset + len(steps)), counts),
+        "time_s": np.repeat(np.array([t for t, _ in steps], dtype=np.float64), counts),
+        "id": [veh.get("id", "") for veh in vehs],
+        "x_m": _floats([veh.get("x", "0") for veh in vehs]),
+        "y_m": _floats([veh.get("y", "0") for veh in vehs]),
+        "speed_kmh": _floats([veh.get("speed", "0") for veh in vehs]) * 3.6,
+        "lane": [veh.get("lane", "") for veh in vehs],
+        "pos_m": _floats([veh.get("pos", "nan") for veh in vehs]),
+    })
+
+def ego_lead_columns(df_veh, ego_id="ego", lead_id="lead", ego_len_m=5.0):
+    """Join ego and lead rows on their timestep and compute gap / relative speed / TTC."""
+    ego = df_veh[df_veh["id"] == ego_id].drop_duplicates("step", keep="last")
+    lead = df_veh[df_veh["id"] == lead_id].drop_duplicates("step", keep="last")
+    pair = ego.merge(lead, on="step", suffixes=("_ego", "_lead"), sort=True)
+
+    dist = pair["x_m_lead"].to_numpy() - pair["x_m_ego"].to_numpy()
+    return _gap_columns(pair["time_s_ego"].to_numpy(), pair["speed_kmh_ego"].to_numpy(),
+                        pair["speed_kmh_lead"].to_numpy(), dist, ego_len_m)
+
+def _gap_columns(t, v_self, v_lead, dist, ego_len_m):
+    # line distance，minus ego length
+    lead_dist = np.maximum(dist - ego_len_m, 0.0)
+
+    # speed diff
+    rel_speed_kmh = v_self - v_lead
+    rel_speed_mps = rel_speed_kmh / 3.6
+
+    # TTC：rel_speed_mps>0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ttc_s = np.where(rel_speed_mps > 1e-6,
+                         np.where(lead_dist > 0, lead_dist / rel_speed_mps, 0.0),
+                         math.inf)
+
+    return pd.DataFrame({
+        "t_s": t,
+        "v_self_kmh": v_self,
+        "v_lead_kmh": v_lead,
+        "lead_dist_m": lead_dist,
+        "rel_speed_kmh": rel_speed_kmh,
+        "rel_speed_mps": rel_speed_mps,
+        "ttc_s": ttc_s,
+    }, columns=SCENE_COLUMNS)
+
+def all_pairs_columns(df_veh, veh_len_m=5.0):
+    """
+    Leader detection for every vehicle: within each timestep and lane the
+    leader is the next vehicle ahead by lane position. One lexsort over
+    (step, lane, pos) makes this O(n log n) instead of comparing all pairs.
+    Falls back to x when the FCD has no pos attribute.
+    """
+    if df_veh.empty:
+        return pd.DataFrame(columns=PAIR_COLUMNS)
+
+    pos = df_veh["pos_m"].to_numpy()
+    pos = np.where(np.isnan(pos), df_veh["x_m"].to_numpy(), pos)
+    lane, _ = pd.factorize(df_veh["lane"])
+    step = df_veh["step"].to_numpy()
+
+    order = np.lexsort((pos, lane, step))
+    same = (step[order][1:] == step[order][:-1]) & (lane[order][1:] == lane[order][:-1])
+    follower = order[:-1][same]
+    leader = order[1:][same]
+
+    ids = df_veh["id"].to_numpy()
+    speed = df_veh["speed_kmh"].to_numpy()
+    df = _gap_columns(df_veh["time_s"].to_numpy()[follower], speed[follower], speed[leader],
+                      pos[leader] - pos[follower], veh_len_m)
+    df.insert(0, "lead_id", ids[leader])
+    df.insert(0, "veh_id", ids[follower])
+    return df
+
+def _scene_frame(df, t_mid=None):
+    # t_mid: split time between the two zones, by default the median t_s of df
+    df = df.reset_index(drop=True)
+
+    if not df.empty:
+        if t_mid is None:
+            t_mid = df["t_s"].median()
+        df["speed_limit_kmh"] = (df["t_s"] < t_mid).map({True: 80, False: 50})
+        df["zone"] = (df["t_s"] < t_mid).map({True: "NORMAL", False: "SCHOOL"})
+
+    return df
+
 def build_ego_lead_table(root, ego_id="ego", lead_id="lead", ego_len_m=5.0):
     """
     构建“方法一”场景表：同一步存在 ego 和 lead 时，计算速度/车距/相对速度/TTC等。
+    root 可以是 load_xml() 的结果，也可以是 iter_timesteps() 的输出。
     返回：DataFrame(columns:
         t_s, v_self_kmh, v_lead_kmh, lead_dist_m,
         rel_speed_kmh, rel_speed_mps, ttc_s,
         speed_limit_kmh, zone)
     """
-    rows = []
-    for ts in root.findall("timestep"):
-        t = float(ts.attrib["time"])
-        vmap = {}
-        for veh in ts.findall("vehicle"):
-            vid = veh.attrib.get("id", "")
-            x = float(veh.attrib.get("x", "0"))
-            y = float(veh.attrib.get("y", "0"))
-            v_kmh = float(veh.attrib.get("speed", "0")) * 3.6
-            vmap[vid] = {"x": x, "y": y, "v_kmh": v_kmh}
-
-        if ego_id in vmap and lead_id in vmap:
-            v_self = vmap[ego_id]["v_kmh"]
-            v_lead = vmap[lead_id]["v_kmh"]
-
-            # line distance，minus ego length
-            lead_dist = vmap[lead_id]["x"] - vmap[ego_id]["x"] - ego_len_m
-            lead_dist = max(lead_dist, 0.0)
-
-            # speed diff
-            rel_speed_kmh = v_self - v_lead
-            rel_speed_mps = rel_speed_kmh / 3.6
-
-            # TTC：rel_speed_mps>0
-            if rel_speed_mps > 1e-6:
-                ttc_s = lead_dist / rel_speed_mps if lead_dist > 0 else 0.0
-            else:
-                ttc_s = math.inf
-
-            rows.append([
-                t, v_self, v_lead, lead_dist,
-                rel_speed_kmh, rel_speed_mps, ttc_s
-            ])
-
-    df = pd.DataFrame(rows, columns=[
-        "t_s", "v_self_kmh", "v_lead_kmh", "lead_dist_m",
-        "rel_speed_kmh", "rel_speed_mps", "ttc_s"
-    ])
-
-    
-    if not df.empty:
-        t_mid = df["t_s"].median()
-        df["speed_limit_kmh"] = (df["t_s"] < t_mid).map({True: 80, False: 50})
-        df["zone"] = (df["t_s"] < t_mid).map({True: "NORMAL", False: "SCHOOL"})
-
-    return df
+    df_veh = vehicle_frame(list(_steps(root)))
+    return _scene_frame(ego_lead_columns(df_veh, ego_id, lead_id, ego_len_m))
 
 def build_all_vehicle_table(root):
-    
-    data = []
-    for ts in root.findall("timestep"):
-        t = float(ts.attrib.get("time", "0"))
-        for veh in ts.findall("vehicle"):
-            vid = veh.attrib.get("id", "")
-            x = float(veh.attrib.get("x", "0"))
-            y = float(veh.attrib.get("y", "0"))
-            speed_kmh = float(veh.attrib.get("speed", "0")) * 3.6
-            data.append([t, vid, x, y, speed_kmh])
-
-    return pd.DataFrame(data, columns=["time_s", "id", "x_m", "y_m", "speed_kmh"])
+    return vehicle_frame(list(_steps(root)))[ALL_COLUMNS]
+
+def build_all_pairs_table(root, veh_len_m=5.0):
+    """Same columns as the scenario table, one row per (vehicle, leader) and timestep."""
+    return _scene_frame(all_pairs_columns(vehicle_frame(list(_steps(root))), veh_len_m))
+
+class AllPairsWriter:
+    """
+    Writes the all-pairs leader table without holding it in memory. The
+    zone split is at the median time of the whole table, which is only
+    known after the last batch, so add() appends every batch's rows to
+    <out>.part and keeps just the (time, count) pairs; finish() then writes
+    the judged table chunk by chunk.
+    """
+
+    def __init__(self, out):
+        self.out = str(out)
+        self.spill = self.out + ".part"
+        pd.DataFrame(columns=PAIR_COLUMNS).to_csv(self.spill, index=False)
+        self.rows = 0
+        self._times, self._counts = [], []
+
+    def add(self, df_pairs):
+        if df_pairs.empty:
+            return
+        df_pairs.to_csv(self.spill, mode="a", header=False, index=False)
+        times, counts = np.unique(df_pairs["t_s"].to_numpy(), return_counts=True)
+        self._times.append(times)
+        self._counts.append(counts)
+        self.rows += len(df_pairs)
+
+    def median_time(self):
+        """Median t_s over all rows added so far (what _scene_frame() would use)."""
+        times = np.concatenate(self._times)
+        counts = np.concatenate(self._counts)
+        order = np.argsort(times, kind="stable")
+        times, cum = times[order], np.cumsum(counts[order])
+        lo = times[np.searchsorted(cum, (self.rows - 1) // 2, side="right")]
+        hi = times[np.searchsorted(cum, self.rows // 2, side="right")]
+        return (lo + hi) / 2
+
+    def finish(self, min_gap_m, time_headway_s, ttc_thresh_s, chunk_rows=1_000_000):
+        """Write `out` with brake/speeding marks and remove the spill; returns the row count."""
+        try:
+            if not self.rows:
+                df = mark_brake_and_speeding(pd.DataFrame(columns=PAIR_COLUMNS),
+                                             min_gap_m, time_headway_s, ttc_thresh_s)
+                df.to_csv(self.out, index=False)
+                return 0
+
+            t_mid = self.median_time()
+            reader = pd.read_csv(self.spill, chunksize=chunk_rows, float_precision="round_trip",
+                                 dtype={"veh_id": str, "lead_id": str})
+            for i, chunk in enumerate(reader):
+                df = mark_brake_and_speeding(_scene_frame(chunk, t_mid),
+                                             min_gap_m, time_headway_s, ttc_thresh_s)
+                df.to_csv(self.out, mode="a" if i else "w", header=not i, index=False)
+            return self.rows
+        finally:
+            os.remove(self.spill)
+
+def build_ego_lead_table_from_store(store, ego_id="ego", lead_id="lead", ego_len_m=5.0, t0=None, t1=None):
+    """
+    Scenario table from an indexed FCD store (speedMonitor/fcd_store.py, e.g.
+    over fcd_all.csv or fcd_traci.csv): only the ego and lead rows between
+    t0 and t1 are read.
+    """
+    to_kmh = 1.0 if store.speed_unit == "km/h" else 3.6
+    ego = {r.time_s: r for r in store.trajectory(ego_id, t0, t1)}
+    lead = {r.time_s: r for r in store.trajectory(lead_id, t0, t1)}
+    pairs = [(ego[t], lead[t]) for t in ego if t in lead]
+
+    t = np.array([e.time_s for e, _ in pairs], dtype=np.float64)
+    v_self = np.array([e.speed for e, _ in pairs], dtype=np.float64) * to_kmh
+    v_lead = np.array([l.speed for _, l in pairs], dtype=np.float64) * to_kmh
+    dist = np.array([l.x - e.x for e, l in pairs], dtype=np.float64)
+    return _scene_frame(_gap_columns(t, v_self, v_lead, dist, ego_len_m))
+
+# ======columnar cache=======
+# The first parse stores every vehicle row as one binary file per column
+# (float64 so re-runs write the same CSV text as the XML run, ids and lanes
+# interned to int32 codes); later runs memory-map them instead of parsing the XML.
+# The cache is tied to the XML by size, mtime and a hash of its first and
+# last MiB, and is rebuilt when any of them changes.
+CACHE_VERSION = 2
+CACHE_COLUMNS = {
+    "step": "int32",        # index into step_times
+    "id": "int32",          # index into ids
+    "x_m": "float64",
+    "y_m": "float64",
+    "speed_kmh": "float64",
+    "lane": "int32",        # index into lanes
+    "pos_m": "float64",
+}
+_HASH_SPAN = 1 << 20
+
+def default_cache_dir(infile):
+    return str(infile) + ".cache"
+
+def fcd_fingerprint(infile):
+    st = os.stat(infile)
+    h = hashlib.blake2b(digest_size=16)
+    with open(infile, "rb") as f:
+        h.update(f.read(_HASH_SPAN))
+        if st.st_size > _HASH_SPAN:
+            f.seek(max(_HASH_SPAN, st.st_size - _HASH_SPAN))
+            h.update(f.read(_HASH_SPAN))
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": h.hexdigest()}
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def _write_meta(cache_dir, meta):
+    tmp = os.path.join(cache_dir, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(cache_dir, "meta.json"))
+
+class FcdCacheWriter:
+    """Collects the vehicle_frame() batches of one parse into the columnar cache."""
+
+    def __init__(self, infile, cache_dir=None):
+        self.infile = str(infile)
+        self.cache_dir = cache_dir or default_cache_dir(infile)
+        self.tmp_dir = self.cache_dir + ".tmp"
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+        self.files = {c: open(os.path.join(self.tmp_dir, c + ".bin"), "wb") for c in CACHE_COLUMNS}
+        self.ids, self.lanes, self.step_times = {}, {}, []
+        self.rows = 0
+
+    @staticmethod
+    def _codes(values, table):
+        return np.fromiter((table.setdefault(v, len(table)) for v in values), dtype=np.int32, count=len(values))
+
+    def add(self, steps, df_veh):
+        self.step_times.extend(t for t, _ in steps)
+        if df_veh.empty:
+            return
+        cols = {
+            "step": df_veh["step"].to_numpy(),
+            "id": self._codes(df_veh["id"].tolist(), self.ids),
+            "x_m": df_veh["x_m"].to_numpy(),
+            "y_m": df_veh["y_m"].to_numpy(),
+            "speed_kmh": df_veh["speed_kmh"].to_numpy(),
+            "lane": self._codes(df_veh["lane"].tolist(), self.lanes),
+            "pos_m": df_veh["pos_m"].to_numpy(),
+        }
+        for name, dtype in CACHE_COLUMNS.items():
+            self.files[name].write(np.ascontiguousarray(cols[name], dtype=dtype).tobytes())
+        self.rows += len(df_veh)
+
+    def commit(self, all_out=None):
+        for f in self.files.values():
+            f.close()
+        np.save(os.path.join(self.tmp_dir, "step_times.npy"), np.asarray(self.step_times, dtype=np.float64))
+        meta = {
+            "version": CACHE_VERSION,
+            "source": os.path.abspath(self.infile),
+            "fingerprint": fcd_fingerprint(self.infile),
+            "rows": self.rows,
+            "columns": CACHE_COLUMNS,
+            "ids": list(self.ids),
+            "lanes": list(self.lanes),
+        }
+        if all_out is not None:
+            meta["all_out"] = _file_stamp(all_out)
+        _write_meta(self.tmp_dir, meta)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.replace(self.tmp_dir, self.cache_dir)
+
+    def abort(self):
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+def load_fcd_cache(infile, cache_dir=None):
+    """
+    Memory-mapped columns of a valid cache for `infile`, or None. Returns a
+    dict with the CACHE_COLUMNS arrays plus step_times, ids, lanes, rows, meta.
+    """
+    cache_dir = cache_dir or default_cache_dir(infile)
+    try:
+        with open(os.path.join(cache_dir, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != CACHE_VERSION or meta.get("fingerprint") != fcd_fingerprint(infile):
+        return None
+
+    cols = {"meta": meta, "rows": meta["rows"], "ids": meta["ids"], "lanes": meta["lanes"],
+            "step_times": np.load(os.path.join(cache_dir, "step_times.npy"))}
+    for name, dtype in meta["columns"].items():
+        path = os.path.join(cache_dir, name + ".bin")
+        cols[name] = (np.memmap(path, dtype=dtype, mode="r", shape=(meta["rows"],))
+                      if meta["rows"] else np.empty(0, dtype=dtype))
+    return cols
+
+def _last_per_step(cols, vid):
+    """Row indices of `vid`, one per step (the last one, like drop_duplicates(keep="last"))."""
+    try:
+        code = cols["ids"].index(vid)
+    except ValueError:
+        return np.empty(0, dtype=np.int64)
+    rows = np.flatnonzero(cols["id"] == code)
+    steps = np.asarray(cols["step"][rows])
+    _, first_rev = np.unique(steps[::-1], return_index=True)
+    return rows[len(rows) - 1 - first_rev]
+
+def ego_lead_from_cache(cols, ego_id="ego", lead_id="lead", ego_len_m=5.0):
+    """ego_lead_columns() on cached columns; only the ego and lead rows are read."""
+    ego = _last_per_step(cols, ego_id)
+    lead = _last_per_step(cols, lead_id)
+    _, ie, il = np.intersect1d(cols["step"][ego], cols["step"][lead], assume_unique=True, return_indices=True)
+    ego, lead = ego[ie], lead[il]
+
+    x = cols["x_m"]
+    speed = cols["speed_kmh"]
+    return _gap_columns(cols["step_times"][cols["step"][ego]], speed[ego], speed[lead],
+                        x[lead] - x[ego], ego_len_m)
+
+def vehicle_frame_from_cache(cols, rows=slice(None)):
+    """The vehicle_frame() table rebuilt from the cache (ids and lanes as categoricals)."""
+    step = np.asarray(cols["step"][rows])
+    return pd.DataFrame({
+        "step": step,
+        "time_s": cols["step_times"][step],
+        "id": pd.Categorical.from_codes(np.asarray(cols["id"][rows]), categories=cols["ids"]),
+        "x_m": np.asarray(cols["x_m"][rows]),
+        "y_m": np.asarray(cols["y_m"][rows]),
+        "speed_kmh": np.asarray(cols["speed_kmh"][rows]),
+        "lane": pd.Categorical.from_codes(np.asarray(cols["lane"][rows]), categories=cols["lanes"]),
+        "pos_m": np.asarray(cols["pos_m"][rows]),
+    })
+
+def _cache_batches(cols, batch_size=1000):
+    """Row slices of the cache covering batch_size timesteps each, like iter_timestep_batches()."""
+    bounds = np.searchsorted(cols["step"], np.arange(0, len(cols["step_times"]) + batch_size, batch_size))
+    for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        if hi > lo:
+            yield slice(lo, hi)
+
+def write_all_from_cache(cols, all_out, cache_dir, chunk_rows=1_000_000):
+    """
+    Write the all-vehicle CSV from the cache in chunks, unless all_out is
+    still the file written from this cache last time. Returns True if written.
+    """
+    meta = cols["meta"]
+    try:
+        if meta.get("all_out") == _file_stamp(all_out):
+            return False
+    except OSError:
+        pass
+
+    ids = np.asarray(cols["ids"], dtype=object)
+    pd.DataFrame(columns=ALL_COLUMNS).to_csv(all_out, index=False)
+    for start in range(0, cols["rows"], chunk_rows):
+        sl = slice(start, start + chunk_rows)
+        pd.DataFrame({
+            "time_s": cols["step_times"][cols["step"][sl]],
+            "id": ids[cols["id"][sl]],
+            "x_m": cols["x_m"][sl],
+            "y_m": cols["y_m"][sl],
+            "speed_kmh": cols["speed_kmh"][sl],
+        }).to_csv(all_out, mode="a", header=False, index=False)
+
+    meta["all_out"] = _file_stamp(all_out)
+    _write_meta(cache_dir, meta)
+    return True
+
+def analyse_cached(cols, all_out, cache_dir, ego_id="ego", lead_id="lead", ego_len_m=5.0,
+                   batch_size=1000, pairs=None):
+    """stream_fcd() on a loaded cache: same return values, no XML parsing."""
+    write_all_from_cache(cols, all_out, cache_dir)
+    seen = {ego_id, lead_id} & set(cols["ids"])
+    df_scene = _scene_frame(ego_lead_from_cache(cols, ego_id, lead_id, ego_len_m))
+    if pairs is not None:
+        # same batches as the streaming pass, so leaders come out in the same order
+        for rows in _cache_batches(cols, batch_size):
+            df_veh = vehicle_frame_from_cache(cols, rows)
+            df_veh["id"] = df_veh["id"].astype(object)
+            pairs.add(all_pairs_columns(df_veh, ego_len_m))
+    return df_scene, cols["rows"], seen
+
+def load_or_stream_fcd(infile, all_out, cache_dir=None, use_cache=True, **kwargs):
+    """
+    stream_fcd() with the columnar cache: a valid cache is analysed without
+    touching the XML, otherwise the XML is parsed once and the cache built
+    on the way. Returns stream_fcd()'s tuple and whether the cache was hit.
+    """
+    cache_dir = cache_dir or default_cache_dir(infile)
+    if not use_cache:
+        return stream_fcd(infile, all_out, **kwargs), False
+
+    cols = load_fcd_cache(infile, cache_dir)
+    if cols is not None:
+        return analyse_cached(cols, all_out, cache_dir, **kwargs), True
+
+    try:
+        writer = FcdCacheWriter(infile, cache_dir)
+    except OSError as e:
+        print(f"ℹ️  cannot create FCD cache in {cache_dir}: {e}")
+        return stream_fcd(infile, all_out, **kwargs), False
+    try:
+        result = stream_fcd(infile, all_out, cache=writer, **kwargs)
+    except BaseException:
+        writer.abort()
+        raise
+    return result, False
+
+def stream_fcd(infile, all_out, ego_id="ego", lead_id="lead", ego_len_m=5.0, batch_size=1000,
+               pairs=None, cache=None):
+    """
+    Single streaming pass over the FCD XML. The all-vehicle table is appended
+    to all_out batch by batch; only the ego/lead scenario rows (one per
+    timestep) are kept in memory.
+    Returns (scenario DataFrame, number of all-vehicle rows, set of ids seen
+    out of {ego_id, lead_id}). `pairs` (an AllPairsWriter) receives the
+    all-pairs leader rows of every batch. `cache` (an FcdCacheWriter)
+    receives every batch and is committed after the pass.
+    """
+    n_all = 0
+    n_steps = 0
+    seen = set()
+    scene_parts = []
+
+    pd.DataFrame(columns=ALL_COLUMNS).to_csv(all_out, index=False)
+    for batch in iter_timestep_batches(infile, batch_size):
+        df_veh = vehicle_frame(batch, n_steps)
+        n_steps += len(batch)
+        if cache is not None:
+            cache.add(batch, df_veh)
+        if not df_veh.empty:
+            df_veh[ALL_COLUMNS].to_csv(all_out, mode="a", header=False, index=False)
+            n_all += len(df_veh)
+
+        seen.update(set(df_veh["id"].unique()) & {ego_id, lead_id})
+        scene_parts.append(ego_lead_columns(df_veh, ego_id, lead_id, ego_len_m))
+        if pairs is not None:
+            pairs.add(all_pairs_columns(df_veh, ego_len_m))
+
+    if cache is not None:
+        cache.commit(all_out)
+
+    df_scene = pd.concat(scene_parts) if scene_parts else pd.DataFrame(columns=SCENE_COLUMNS)
+    return _scene_frame(df_scene), n_all, seen
 
 def mark_brake_and_speeding(df_scene: pd.DataFrame,
                             min_gap_m: float,
@@ -122,16 +566,11 @@ def mark_brake_and_speeding(df_scene: pd.DataFrame,
     cond_ttc = df_scene["ttc_s"] < ttc_thresh_s
 
     need_brake = cond_gap | cond_ttc
-    reason = []
-    for g, ttc in zip(cond_gap, cond_ttc):
-        if g and ttc:
-            reason.append("GAP/HEADWAY + TTC")
-        elif g:
-            reason.append("GAP/HEADWAY")
-        elif ttc:
-            reason.append("TTC")
-        else:
-            reason.append("")
+    reason = np.select(
+        [cond_gap & cond_ttc, cond_gap, cond_ttc],
+        ["GAP/HEADWAY + TTC", "GAP/HEADWAY", "TTC"],
+        default="",
+    )
 
     df_scene = df_scene.copy()
     df_scene["need_brake"] = need_brake
@@ -149,54 +588,68 @@ def mark_brake_and_speeding(df_scene: pd.DataFrame,
 def emit_alerts(df_scene: pd.DataFrame, alerts_out: str):
    
     if df_scene.empty:
-        pd.DataFrame(columns=["timestamp","kind","speed","distance","reason"]).to_csv(alerts_out, index=False)
+        pd.DataFrame(columns=ALERT_COLUMNS).to_csv(alerts_out, index=False)
         print(f"✅ Wrote {alerts_out} with 0 rows (empty scene)")
         return
 
     d = df_scene.sort_values("t_s").reset_index(drop=True)
 
-    alerts = []
-    prev_brake = False
-    prev_speeding = False
-
-    for i, row in d.iterrows():
-        t = row["t_s"]
-        v = row["v_self_kmh"]
-        dist = row["lead_dist_m"]
-        # brake 
-        nb = bool(row["need_brake"])
-        if nb and not prev_brake:
-            alerts.append({
-                "timestamp": t,
-                "kind": "BRAKE",
-                "speed": v,
-                "distance": dist,
-                "reason": f"{row['brake_reason']} (target≈{row['target_speed_kmh']:.1f} km/h)"
-            })
-        prev_brake = nb
-
-        # overspeed
-        spd = bool(row["overspeed"])
-        if spd and not prev_speeding:
-            lim = row["speed_limit_kmh"] if "speed_limit_kmh" in row else float("nan")
-            alerts.append({
-                "timestamp": t,
-                "kind": "SPEEDING",
-                "speed": v,
-                "distance": dist,
-                "reason": f"Speed {v:.2f} exceeds limit {lim:.2f}"
-            })
-        prev_speeding = spd
-
-    pd.DataFrame(alerts, columns=["timestamp","kind","speed","distance","reason"]).to_csv(alerts_out, index=False)
+    # rising edges: True now, False on the previous row
+    need_brake = d["need_brake"].to_numpy(dtype=bool)
+    overspeed = d["overspeed"].to_numpy(dtype=bool)
+    brake_idx = np.flatnonzero(need_brake & ~np.r_[False, need_brake[:-1]])
+    speed_idx = np.flatnonzero(overspeed & ~np.r_[False, overspeed[:-1]])
+
+    t = d["t_s"].to_numpy()
+    v = d["v_self_kmh"].to_numpy()
+    dist = d["lead_dist_m"].to_numpy()
+    lim = d["speed_limit_kmh"].to_numpy() if "speed_limit_kmh" in d.columns else np.full(len(d), np.nan)
+    brake_reason = d["brake_reason"].to_numpy()
+    target = d["target_speed_kmh"].to_numpy()
+
+    # BRAKE sorts before SPEEDING within the same row
+    order = np.argsort(np.r_[brake_idx * 2, speed_idx * 2 + 1], kind="stable")
+    rows = np.r_[brake_idx, speed_idx][order]
+    is_brake = np.r_[np.ones(len(brake_idx), bool), np.zeros(len(speed_idx), bool)][order]
+
+    reasons = [
+        f"{brake_reason[i]} (target≈{target[i]:.1f} km/h)" if b
+        else f"Speed {v[i]:.2f} exceeds limit {lim[i]:.2f}"
+        for i, b in zip(rows.tolist(), is_brake.tolist())
+    ]
+    alerts = pd.DataFrame({
+        "timestamp": t[rows],
+        "kind": np.where(is_brake, "BRAKE", "SPEEDING"),
+        "speed": v[rows],
+        "distance": dist[rows],
+        "reason": reasons,
+    }, columns=ALERT_COLUMNS)
+
+    alerts.to_csv(alerts_out, index=False)
     print(f"✅ Wrote {alerts_out} with {len(alerts)} rows")
 
 def main():
     args = parse_args()
-    root = load_xml(args.infile)
 
-    # method one: ego-lead scenario table
-    df_scene = build_ego_lead_table(root, ego_id="ego", lead_id="lead", ego_len_m=args.ego_len_m)
+    # single pass: method two (all vehicles FCD table) is streamed to disk,
+    # method one (ego-lead scenario table) is collected on the way.
+    # Re-runs with other thresholds read the columnar cache instead of the XML.
+    pairs = AllPairsWriter(args.all_pairs_out) if args.all_pairs_out is not None else None
+    (df_scene, n_all, seen), hit = load_or_stream_fcd(args.infile, args.all_out,
+                                                      cache_dir=args.cache_dir, use_cache=not args.no_cache,
+                                                      ego_id="ego", lead_id="lead", ego_len_m=args.ego_len_m,
+                                                      pairs=pairs)
+    if hit:
+        print(f"ℹ️  using FCD cache {args.cache_dir or default_cache_dir(args.infile)}")
+    print(f"✅ Wrote {args.all_out} with {n_all} rows")
+
+    if pairs is not None:
+        n_pairs = pairs.finish(
+            min_gap_m=args.min_gap_m,
+            time_headway_s=args.time_headway_s,
+            ttc_thresh_s=args.ttc_thresh_s
+        )
+        print(f"✅ Wrote {args.all_pairs_out} with {n_pairs} rows")
 
     # judge braking and speeding
     df_scene = mark_brake_and_speeding(
@@ -212,18 +665,13 @@ def main():
     # Alerts
     emit_alerts(df_scene, args.alerts_out)
 
-    # method two: all vehicles FCD table
-    df_all = build_all_vehicle_table(root)
-    df_all.to_csv(args.all_out, index=False)
-    print(f"✅ Wrote {args.all_out} with {len(df_all)} rows")
-
    
     if df_scene.empty:
-        has_ego = (df_all["id"] == "ego").any() if not df_all.empty else False
-        has_lead = (df_all["id"] == "lead").any() if not df_all.empty else False
-        if not df_all.empty and (not has_ego or not has_lead):
+        has_ego = "ego" in seen
+        has_lead = "lead" in seen
+        if n_all and (not has_ego or not has_lead):
             print("ℹ️  attention: did not find 'ego ' or 'lead' vehicle in FCD. Please confirm their IDs are indeed ego/lead.")
-        elif df_all.empty:
+        elif not n_all:
             print("ℹ️  there is no vehicle record in FCD. Please confirm <fcd-output> is configured in sumo.sumocfg, and there are vehicles running in the network during the simulation.")
 
 if __name__ == "__main__":
@@ -1,4 +1,6 @@
 import sys, os
+import importlib.util
+import threading
 from pathlib import Path
 import pytest
 from pathlib import Path
@@ -11,6 +13,7 @@ if ROOT not in sys.path:
 
 from speedMonitor.core import SpeedMonitor, Thresholds
 from speedMonitor.io import AlertSink
+from speedMonitor.fake_broker import FakeDatabroker, serve
 
 
 # =======================
@@ -47,6 +50,87 @@ def make_sink():
     return _mk
 
 
+@pytest.fixture
+def load_script():
+    """Import a standalone script (e.g. from sumo-acc-demo/) by its path relative to the repo root."""
+    def _load(relpath: str):
+        path = os.path.join(ROOT, relpath)
+        name = "_script_" + relpath.replace("/", "_").replace("-", "_").replace(".py", "")
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return _load
+
+
+@pytest.fixture
+def fcd_xml(tmp_path: Path):
+    """Small FCD file: ego follows lead closely, plus an unrelated vehicle."""
+    path = tmp_path / "fcd.xml"
+    steps = []
+    for i in range(6):
+        t = i * 0.5
+        steps.append(
+            f'  <timestep time="{t:.2f}">\n'
+            f'    <vehicle id="lead" x="{20 + 2 * i:.2f}" y="-1.60" speed="{5.0:.2f}" pos="{20 + 2 * i:.2f}" lane="e0_0"/>\n'
+            f'    <vehicle id="ego" x="{10 + 3 * i:.2f}" y="-1.60" speed="{8.0 + i:.2f}" pos="{10 + 3 * i:.2f}" lane="e0_0"/>\n'
+            f'    <vehicle id="other" x="{50 + i:.2f}" y="1.60" speed="{30.0:.2f}" pos="{50 + i:.2f}" lane="e0_1"/>\n'
+            f'  </timestep>\n'
+        )
+    path.write_text('<?xml version="1.0" encoding="UTF-8"?>\n<fcd-export>\n'
+                    '  <timestep time="0.00"/>\n' + "".join(steps) + '</fcd-export>\n')
+    return str(path)
+
+
+@pytest.fixture
+def fake_broker():
+    """In-memory Databroker loaded from adas/adas_vss.json; use fake_broker.client as a VSSClient."""
+    broker = FakeDatabroker()
+    yield broker
+    broker.close()
+
+
+@pytest.fixture
+def fake_broker_server(fake_broker):
+    """fake_broker served over gRPC on a free local port (server.host / server.port)."""
+    server = serve(fake_broker)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def databroker_addr(request):
+    """
+    (host, port) of the Databroker under test. KUKSA_DATABROKER_HOST/PORT
+    select a running one (e.g. the Docker Compose stack with its Mock
+    Provider); otherwise the fake broker is served and fed a speed trace.
+    """
+    host = os.environ.get("KUKSA_DATABROKER_HOST")
+    if host:
+        yield host, int(os.environ.get("KUKSA_DATABROKER_PORT", "55556"))
+        return
+
+    server = request.getfixturevalue("fake_broker_server")
+    broker = server.broker
+    stop = threading.Event()
+
+    def provider():
+        # stands in for the Mock Provider replaying a speed trace
+        speed = 40.0
+        while not stop.is_set():
+            broker.set([("Vehicle.Speed", speed)])
+            speed = 40.0 if speed >= 120.0 else speed + 2.5
+            stop.wait(0.1)
+
+    feeder = threading.Thread(target=provider, daemon=True)
+    feeder.start()
+    try:
+        yield server.host, server.port
+    finally:
+        stop.set()
+        feeder.join()
+
+
 # =======================
 # Simulated speed data streams
 # =======================
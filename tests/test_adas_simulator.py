@@ -0,0 +1,86 @@
+import types
+
+import pytest
+
+from speedMonitor import adas_simulator
+from speedMonitor.sumo_backend import (
+    VAR_DEPARTED_VEHICLES_IDS, VAR_LEADER, VAR_MIN_EXPECTED_VEHICLES, VAR_SPEED, VAR_TIME,
+)
+
+
+def _res(speed_kmh, leader=None, gap=-1.0):
+    return {VAR_SPEED: speed_kmh / 3.6, VAR_LEADER: (leader or "", gap)}
+
+
+@pytest.mark.unit
+def test_plan_step_maps_decisions_to_commands():
+    commands, actions = adas_simulator.plan_step({
+        "free": _res(50.0),
+        "near": _res(50.0, "free", 8.0),
+        "tail": _res(50.0, "near", 3.0),
+        "ok": _res(50.0, "tail", 40.0),
+    })
+    assert actions == {"NO_LEAD": 1, "SOFT_BRAKE": 1, "HARD_BRAKE": 1, "ACCELERATE": 1}
+    assert commands == [("slowDown", "near", pytest.approx(45 / 3.6)),
+                        ("setSpeed", "tail", pytest.approx(40 / 3.6))]
+
+
+class _Platoon:
+    """Scripted backend: `n` vehicles depart at once, the gap of one vehicle closes and reopens."""
+
+    def __init__(self, n, steps):
+        self.n, self.steps, self.step = n, steps, 0
+        self.calls = {"subscribe": 0, "setSpeed": [], "slowDown": 0, "simulationStep": 0}
+        self.simulation = types.SimpleNamespace(
+            subscribe=lambda var_ids: None,
+            getSubscriptionResults=self._sim,
+            getDeltaT=lambda: 0.5,
+        )
+        self.vehicle = types.SimpleNamespace(
+            getIDList=lambda: [],
+            subscribe=self._subscribe,
+            getAllSubscriptionResults=self._vehicles,
+            setSpeed=lambda vid, v: self.calls["setSpeed"].append((self.step, vid, v)),
+            slowDown=lambda vid, v, ms: self.calls.__setitem__("slowDown", self.calls["slowDown"] + 1),
+        )
+        self.__name__ = "traci"
+
+    def simulationStep(self):
+        self.calls["simulationStep"] += 1
+        self.step += 1
+
+    def close(self):
+        pass
+
+    def _subscribe(self, vid, var_ids, parameters=None):
+        assert parameters == {VAR_LEADER: ("d", adas_simulator.LEADER_LOOKAHEAD_M)}
+        self.calls["subscribe"] += 1
+
+    def _sim(self):
+        departed = [f"v{i}" for i in range(self.n)] if self.step == 1 else []
+        return {VAR_TIME: self.step * 0.5, VAR_MIN_EXPECTED_VEHICLES: self.n if self.step < self.steps else 0,
+                VAR_DEPARTED_VEHICLES_IDS: departed}
+
+    def _vehicles(self):
+        out = {"v0": _res(60.0)}
+        for i in range(1, self.n):
+            gap = 3.0 if (i == 7 and self.step in (2, 3)) else 30.0
+            out[f"v{i}"] = _res(60.0, f"v{i - 1}", gap)
+        return out
+
+
+@pytest.mark.unit
+def test_closed_loop_drives_every_vehicle(monkeypatch):
+    backend = _Platoon(n=300, steps=5)
+    monkeypatch.setattr(adas_simulator.sumo_backend, "start", lambda args, **kw: backend)
+
+    summary = adas_simulator.run_closed_loop(quiet=True)
+
+    assert summary["steps"] == 5
+    assert summary["vehicle_steps"] == 5 * 300
+    assert backend.calls["subscribe"] == 300
+    assert summary["actions"]["ACCELERATE"] == 5 * 299 - 2
+    # v7 is pinned while too close and released once the gap reopens
+    assert backend.calls["setSpeed"] == [(2, "v7", pytest.approx(50 / 3.6)),
+                                         (3, "v7", pytest.approx(50 / 3.6)),
+                                         (4, "v7", -1)]
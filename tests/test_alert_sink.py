@@ -0,0 +1,60 @@
+import csv
+import pytest
+
+from speedMonitor.io import AlertSink
+
+
+def _rows(path):
+    return list(csv.DictReader(open(path, newline="")))
+
+
+@pytest.mark.overspeed
+@pytest.mark.parametrize("durability", ["flush", "batch", "fsync"])
+def test_buffered_sink_drains_on_close(tmp_alerts_csv, durability):
+    sink = AlertSink(tmp_alerts_csv, buffered=True, durability=durability,
+                     batch_size=16, max_latency=0.05, verbose=False)
+    for i in range(1000):
+        sink.write("SPEEDING", 100.0 + i, f"speed {100.0 + i} exceeds max threshold 80.0")
+    sink.close()
+
+    rows = _rows(tmp_alerts_csv)
+    assert len(rows) == 1000
+    assert [float(r["speed"]) for r in rows[:3]] == [100.0, 101.0, 102.0]
+    assert sink.dropped == 0
+
+
+@pytest.mark.overspeed
+def test_buffered_sink_flushes_after_max_latency(tmp_alerts_csv):
+    import time
+
+    sink = AlertSink(tmp_alerts_csv, buffered=True, durability="batch",
+                     batch_size=1000, max_latency=0.05, verbose=False)
+    sink.write("SPEEDING", 120.0, "speed 120.0 exceeds max threshold 80.0")
+
+    for _ in range(100):
+        if _rows(tmp_alerts_csv):
+            break
+        time.sleep(0.01)
+    assert len(_rows(tmp_alerts_csv)) == 1
+    sink.close()
+
+
+@pytest.mark.overspeed
+def test_invalid_sink_options(tmp_alerts_csv):
+    with pytest.raises(ValueError):
+        AlertSink(tmp_alerts_csv, durability="sometimes")
+    with pytest.raises(ValueError):
+        AlertSink(tmp_alerts_csv, on_full="ignore")
+
+
+@pytest.mark.overspeed
+def test_writer_failure_is_raised_instead_of_hanging(tmp_alerts_csv, monkeypatch):
+    sink = AlertSink(tmp_alerts_csv, buffered=True, batch_size=1, queue_size=4, verbose=False)
+    monkeypatch.setattr(sink, "_commit", lambda batch: (_ for _ in ()).throw(OSError("disk full")))
+
+    with pytest.raises(OSError, match="disk full"):
+        for i in range(100):            # the queue fills once the writer is dead
+            sink.write("SPEEDING", 100.0, "too fast")
+    with pytest.raises(OSError, match="disk full"):
+        sink.close()
+    assert sink.file.closed
@@ -0,0 +1,80 @@
+import csv
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from speedMonitor.alertlog import (
+    AlertLogWriter, alert_log_to_csv, csv_to_alert_log, open_alert_log,
+)
+from speedMonitor.io import AlertSink
+
+
+@pytest.mark.overspeed
+def test_sink_mirrors_into_binary_log(tmp_path, make_monitor):
+    log_path = str(tmp_path / "alerts.kal")
+    sink = AlertSink(str(tmp_path / "alerts.csv"), binary_log=log_path, verbose=False)
+    mon = make_monitor(max_speed=10.0)
+    for v in [5.0, 11.0, 12.0, 7.0, 13.0]:
+        for a in mon.on_speed(v):
+            sink.write(a.kind, a.speed, a.reason)
+    sink.close()
+
+    log = open_alert_log(log_path)
+    assert len(log) == 3
+    assert log.records["speed"].tolist() == [11.0, 12.0, 13.0]
+    df = log.to_dataframe()
+    assert list(df["kind"]) == ["SPEEDING"] * 3
+    assert df["reason"].str.contains("exceeds max").all()
+
+
+@pytest.mark.overspeed
+def test_append_reuses_string_table(tmp_path):
+    path = str(tmp_path / "alerts.kal")
+    with AlertLogWriter(path) as log:
+        log.write(1.0, "BRAKE", 50.0, 4.0, "ego", "GAP/HEADWAY")
+    with AlertLogWriter(path) as log:
+        log.write(2.0, "BRAKE", 40.0, vehicle="ego", reason="multi\nline")
+
+    log = open_alert_log(path)
+    assert len(log) == 2
+    assert log.decode(log.records["kind"]) == ["BRAKE", "BRAKE"]
+    assert log.decode(log.records["reason"])[1] == "multi\nline"
+    assert math.isnan(log.records["distance"][1])
+    assert len(log.strings) == 4
+
+
+@pytest.mark.overspeed
+def test_strings_reach_disk_before_records_and_schema_is_checked(tmp_path):
+    from speedMonitor.alertlog import SCHEMA_TRACI
+
+    path = str(tmp_path / "alerts.kal")
+    log = AlertLogWriter(path, SCHEMA_TRACI)
+    log.write(1.0, "OVERSPEED", vehicle="v1", reason="fast")
+    log.file.flush()                       # a record may hit the disk before flush() is called
+    assert open_alert_log(path).decode(open_alert_log(path).records["reason"]) == ["fast"]
+    log.close()
+
+    with pytest.raises(ValueError, match="schema"):
+        AlertLogWriter(path)               # default SCHEMA_SINK does not match
+    AlertLogWriter(path, SCHEMA_TRACI).close()
+
+
+@pytest.mark.overspeed
+@pytest.mark.parametrize("header,rows", [
+    (["timestamp", "kind", "speed", "reason"],
+     [["2025-11-17 01:10:11", "SPEEDING", "11.0", "speed 11.0 exceeds max threshold 10.0"]]),
+    (["timestamp", "kind", "speed", "distance", "reason"],
+     [["12.5", "BRAKE", "54.0", "3.25", "TTC (target≈40.0 km/h)"]]),
+    (["time_s", "kind", "subject", "details"],
+     [["3.0", "OVERSPEED", "v1", "speed=70.0km/h > limit=60.0km/h"]]),
+])
+def test_csv_round_trip(tmp_path, header, rows):
+    src, log_path, out = tmp_path / "in.csv", str(tmp_path / "a.kal"), tmp_path / "out.csv"
+    with open(src, "w", newline="") as f:
+        csv.writer(f).writerows([header] + rows)
+
+    assert csv_to_alert_log(str(src), log_path) == len(rows)
+    alert_log_to_csv(log_path, str(out))
+    assert out.read_text() == src.read_text()
@@ -1,7 +1,7 @@
 import pytest
 import time
 from unittest.mock import patch, MagicMock
-from speedMonitor.core import monitor_speed
+from speedMonitor.core import SpeedMonitor, Thresholds, monitor_speed
 
 
 @pytest.mark.extension
@@ -51,4 +51,52 @@ def test_no_brake_when_speed_fluctuates(mock_brake, mock_client):
     with patch("time.sleep", return_value=None), patch("time.time", side_effect=[0, 1, 1.5, 2, 3]):
         monitor_speed(ip="127.0.0.1", port=55556, threshold=120, hold=2, interval=1)
 
-    brake_mock.engage_brake.assert_not_called()
\ No newline at end of file
+    brake_mock.engage_brake.assert_not_called()
+
+@pytest.mark.unit
+@patch("speedMonitor.core.VSSClient")
+@patch("speedMonitor.core.AutoBrakeSystem")
+def test_subscription_mode_reacts_to_pushed_updates(mock_brake, mock_client):
+    """
+    Subscription mode evaluates each pushed update without polling the broker.
+    """
+    mock_instance = mock_client.return_value.__enter__.return_value
+    mock_instance.subscribe_current_values.return_value = iter([
+        {"Vehicle.Speed": MagicMock(value=130)},
+        {"Vehicle.Speed": MagicMock(value=130)},
+    ])
+
+    brake_mock = mock_brake.return_value
+    brake_mock.active = False
+
+    with patch("time.sleep", return_value=None), patch("time.time", side_effect=[0, 3]):
+        monitor_speed(ip="127.0.0.1", port=55556, threshold=120, hold=2, interval=1, max_cycles=2)
+
+    mock_instance.get_current_values.assert_not_called()
+    brake_mock.engage_brake.assert_called_once_with(130, blocking=False)
+
+
+@pytest.mark.unit
+@patch("speedMonitor.core.VSSClient")
+@patch("speedMonitor.core.AutoBrakeSystem")
+def test_subscription_is_retried_after_a_failure(mock_brake, mock_client):
+    """
+    A failed subscription is bridged by polling and retried after the backoff.
+    """
+    mock_instance = mock_client.return_value.__enter__.return_value
+    mock_instance.subscribe_current_values.side_effect = [
+        RuntimeError("stream reset"),
+        iter([{"Vehicle.Speed": MagicMock(value=50)}, {"Vehicle.Speed": MagicMock(value=55)}]),
+    ]
+    mock_instance.get_current_values.return_value = {"Vehicle.Speed": MagicMock(value=40)}
+    mock_brake.return_value.active = False
+
+    clock = [0.0]
+    with patch("time.sleep", side_effect=lambda s: clock.__setitem__(0, clock[0] + s)), \
+         patch("time.monotonic", side_effect=lambda: clock[0]):
+        mon = SpeedMonitor(Thresholds(120), interval=0.5, resubscribe_backoff=1.0)
+        mon.start(mode="subscribe", max_cycles=4)
+
+    # two polls fill the 1 s backoff, then the second subscription delivers the rest
+    assert mock_instance.subscribe_current_values.call_count == 2
+    assert mock_instance.get_current_values.call_count == 2
@@ -2,9 +2,9 @@ import pytest
 from kuksa_client.grpc import VSSClient
 
 @pytest.mark.integration
-def test_vehicle_speed_available():
+def test_vehicle_speed_available(databroker_addr):
     """Verifies Vehicle.Speed is available and non-negative (Base F2 check)."""
-    client = VSSClient('127.0.0.1', 55556)
+    client = VSSClient(*databroker_addr)
     client.connect()
     
     try:
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def bench(load_script):
+    return load_script("benchmarks/run_benchmarks.py")
+
+
+@pytest.mark.unit
+def test_every_benchmark_runs_on_tiny_data(bench):
+    results = bench.run_all(list(bench.BENCHMARKS), ["tiny"], repeat=1, log=lambda msg: None)
+
+    assert set(results) == {f"{name}/tiny" for name in bench.BENCHMARKS}
+    assert all(r["rate"] > 0 for r in results.values())
+
+
+@pytest.mark.unit
+def test_compare_flags_only_real_slowdowns(bench):
+    baseline = {"a/small": {"rate": 100.0}, "b/small": {"rate": 100.0}}
+    results = {
+        "a/small": {"rate": 75.0, "rate_unit": "rows/s"},   # within 30%
+        "b/small": {"rate": 50.0, "rate_unit": "rows/s"},   # regression
+        "c/small": {"rate": 1.0, "rate_unit": "rows/s"},    # no baseline yet
+    }
+
+    regressions = bench.compare(results, baseline, tolerance=0.3)
+
+    assert len(regressions) == 1 and regressions[0].startswith("b/small")
+
+
+@pytest.mark.unit
+def test_update_baseline_then_compare(bench, tmp_path):
+    out, base = tmp_path / "report.json", tmp_path / "baseline.json"
+    args = ["--sizes", "tiny", "--only", "decide", "--repeat", "1", "--out", str(out), "--baseline", str(base)]
+
+    assert bench.main(args + ["--update-baseline"]) == 0
+    assert "decide_target/tiny" in json.loads(base.read_text())["results"]
+    assert bench.main(args + ["--tolerance", "0.99"]) == 0
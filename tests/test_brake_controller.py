@@ -44,4 +44,46 @@ def test_brake_handles_connection_error(mock_client):
     brake.engage_brake(current_speed=70)
 
     # It still reaches the end and resets active flag
-    assert not brake.active
\ No newline at end of file
+    assert not brake.active
+
+@pytest.mark.unit
+@patch("speedMonitor.brake_controller.VSSClient")
+def test_tick_applies_one_step_per_interval(mock_client):
+    """
+    Non-blocking mode: engage_brake() returns immediately and every due
+    tick() applies exactly one step over a single reused connection.
+    """
+    mock_instance = mock_client.return_value.__enter__.return_value
+    brake = AutoBrakeSystem(threshold=50, reduction_rate=10, step_interval=1.0)
+
+    brake.engage_brake(current_speed=80, blocking=False)
+    assert brake.active
+    assert mock_instance.set_current_values.call_count == 0
+
+    t0 = brake.next_step_at
+    assert brake.tick(now=t0)
+    assert brake.tick(now=t0 + 0.5)          # not due yet
+    assert mock_instance.set_current_values.call_count == 1
+    assert brake.tick(now=t0 + 1.0)
+    assert not brake.tick(now=t0 + 2.0)      # reaches threshold
+    assert brake.current_speed == 50
+    assert mock_instance.set_current_values.call_count == 3
+    assert mock_client.call_count == 1
+
+
+@pytest.mark.unit
+@patch("speedMonitor.brake_controller.VSSClient")
+def test_ramp_cancelled_or_retargeted(mock_client):
+    brake = AutoBrakeSystem(threshold=50, reduction_rate=10)
+
+    brake.engage_brake(current_speed=120, blocking=False)
+    brake.observe(45)                        # measured speed already safe
+    assert not brake.active
+
+    brake.engage_brake(current_speed=120, blocking=False)
+    brake.retarget(130)
+    assert not brake.active
+
+    brake.engage_brake(current_speed=120, blocking=False)
+    brake.cancel("lead vehicle lost")
+    assert not brake.tick()
@@ -0,0 +1,65 @@
+import csv
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+ROWS = [
+    ["time_s", "veh_id", "x", "y", "speed"],
+    ["1.0", "lead", "20.0", "-1.6", "5.0"],
+    ["1.0", "ego", "10.0", "-1.6", "8.0"],
+    ["1.5", "ego", "14.0", "-1.6", "8.5"],
+    ["1.5", "lead", "22.5", "-1.6", "5.0"],
+    ["2.0", "ego", "18.0", "-1.6", "9.0"],
+]
+
+
+def _write(path, rows):
+    with open(path, "w", newline="") as f:
+        csv.writer(f).writerows(rows)
+
+
+@pytest.mark.unit
+def test_streaming_gap_rows(load_script, tmp_path):
+    gap = load_script("adas/compute_gap.py")
+    src, out = tmp_path / "vehicles.csv", tmp_path / "gap.csv"
+    _write(src, ROWS)
+
+    gap.compute_gap(str(src), out_csv=str(out))
+
+    rows = list(csv.reader(open(out, newline="")))
+    assert rows == [
+        gap.GAP_HEADER,
+        ["1.0", "ego", "lead", "8.0", "5.0", "10.0"],
+        ["1.5", "ego", "lead", "8.5", "5.0", "8.5"],
+        ["2.0", "ego", "lead", "9.0", "", ""],
+    ]
+
+
+@pytest.mark.unit
+def test_out_of_order_input_falls_back_to_external_sort(load_script, tmp_path, capsys):
+    gap = load_script("adas/compute_gap.py")
+    ordered, shuffled = tmp_path / "ordered.csv", tmp_path / "shuffled.csv"
+    _write(ordered, ROWS)
+    _write(shuffled, [ROWS[0], ROWS[5], ROWS[3], ROWS[1], ROWS[4], ROWS[2]])
+
+    gap.compute_gap(str(ordered), out_csv=str(tmp_path / "a.csv"))
+    gap.compute_gap(str(shuffled), out_csv=str(tmp_path / "b.csv"), chunk_rows=2)
+
+    assert "external sort" in capsys.readouterr().out
+    assert (tmp_path / "a.csv").read_text() == (tmp_path / "b.csv").read_text()
+
+
+@pytest.mark.unit
+def test_script_runs_outside_the_repo(tmp_path):
+    # the CSV path needs nothing but the script itself
+    here = os.path.dirname(os.path.abspath(__file__))
+    shutil.copy(os.path.join(here, "..", "adas", "compute_gap.py"), tmp_path)
+    _write(tmp_path / "vehicles.csv", ROWS)
+
+    subprocess.run([sys.executable, "compute_gap.py", "vehicles.csv", "ego", "lead"],
+                   cwd=tmp_path, check=True, capture_output=True)
+
+    assert len((tmp_path / "gap.csv").read_text().splitlines()) == 4
@@ -0,0 +1,147 @@
+# tests/test_connection.py
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock
+
+from speedMonitor.connection import ConnectionManager
+
+
+@pytest.mark.unit
+def test_handles_share_one_channel_until_last_release():
+    factory = MagicMock()
+    mgr = ConnectionManager()
+
+    a = mgr.acquire("10.0.0.1", 55556, factory=factory)
+    b = mgr.acquire("10.0.0.1", 55556, factory=factory)
+    a.get_current_values(["Vehicle.Speed"])
+    b.get_current_values(["Vehicle.Speed"])
+
+    assert factory.call_count == 1
+    assert mgr.stats() == {"10.0.0.1:55556": 2}
+
+    a.close()
+    a.close()  # releasing twice is harmless
+    factory.return_value.__exit__.assert_not_called()
+    b.close()
+    factory.return_value.__exit__.assert_called_once()
+    assert mgr.stats() == {}
+
+
+@pytest.mark.unit
+def test_credentials_are_part_of_the_key():
+    factory = MagicMock()
+    mgr = ConnectionManager()
+
+    mgr.acquire("h", 1, factory=factory).get_server_info()
+    mgr.acquire("h", 1, token="secret", factory=factory).get_server_info()
+
+    assert factory.call_count == 2
+    factory.assert_called_with("h", 1, token="secret")
+
+
+@pytest.mark.unit
+def test_failed_call_reconnects_lazily():
+    factory = MagicMock()
+    client = factory.return_value.__enter__.return_value
+    client.set_current_values.side_effect = [ConnectionError("down"), None]
+    mgr = ConnectionManager()
+    handle = mgr.acquire("h", 1, factory=factory)
+
+    with pytest.raises(ConnectionError):
+        handle.set_current_values({})
+    assert factory.call_count == 1
+
+    handle.set_current_values({})
+    assert factory.call_count == 2
+
+
+@pytest.mark.unit
+def test_failed_subscription_reconnects_lazily():
+    factory = MagicMock()
+    client = factory.return_value.__enter__.return_value
+
+    def stream(paths):
+        yield {"Vehicle.Speed": 1}
+        raise ConnectionError("stream reset")
+
+    client.subscribe_current_values.side_effect = stream
+    mgr = ConnectionManager()
+    handle = mgr.acquire("h", 1, factory=factory)
+
+    with pytest.raises(ConnectionError):
+        for _ in handle.subscribe_current_values(["Vehicle.Speed"]):
+            pass
+    handle.get_server_info()
+    assert factory.call_count == 2
+
+
+@pytest.mark.unit
+def test_health_check_replaces_dead_channel():
+    factory = MagicMock()
+    client = factory.return_value.__enter__.return_value
+    mgr = ConnectionManager(health_interval=0.0)
+    handle = mgr.acquire("h", 1, factory=factory)
+
+    handle.get_current_values([])
+    client.get_server_info.side_effect = ConnectionError("gone")
+    handle.get_current_values([])
+
+    assert factory.call_count == 2
+
+
+@pytest.mark.unit
+def test_failed_call_leaves_running_stream_on_its_channel():
+    factory = MagicMock()
+    old = MagicMock()
+    new = MagicMock()
+    factory.return_value.__enter__.side_effect = [old, new]
+
+    def stream(paths):
+        yield 1
+        yield 2
+
+    old.subscribe_current_values.side_effect = stream
+    old.get_current_values.side_effect = ValueError("bad path")
+    mgr = ConnectionManager()
+    streamer = mgr.acquire("h", 1, factory=factory)
+    caller = mgr.acquire("h", 1, factory=factory)
+
+    updates = streamer.subscribe_current_values(["Vehicle.Speed"])
+    assert next(updates) == 1
+    with pytest.raises(ValueError):
+        caller.get_current_values(["No.Such.Path"])
+
+    # the stream keeps its channel, new calls get a fresh one
+    caller.get_server_info()
+    new.get_server_info.assert_called_once()
+    factory.return_value.__exit__.assert_not_called()
+    assert list(updates) == [2]
+    factory.return_value.__exit__.assert_called_once()
+
+
+@pytest.mark.unit
+def test_connecting_does_not_block_other_brokers():
+    connecting = threading.Event()
+    proceed = threading.Event()
+
+    def slow(host, port):
+        connecting.set()
+        proceed.wait(5)
+        return MagicMock()
+
+    mgr = ConnectionManager()
+    slow_handle = mgr.acquire("slow", 1, factory=slow)
+    fast_handle = mgr.acquire("fast", 1, factory=MagicMock())
+    t = threading.Thread(target=lambda: slow_handle.get_server_info())
+    t.start()
+    try:
+        assert connecting.wait(5)
+        start = time.monotonic()
+        fast_handle.get_server_info()
+        assert time.monotonic() - start < 1.0
+        assert mgr.stats() == {"slow:1": 1, "fast:1": 1}
+    finally:
+        proceed.set()
+        t.join()
@@ -0,0 +1,86 @@
+import csv
+import io
+
+import pytest
+
+from speedMonitor.cooldown import Cooldown, TtlCache
+from speedMonitor.core import SpeedMonitor, Thresholds
+from speedMonitor.io import AlertSink
+from speedMonitor.rules import Rule
+
+
+@pytest.mark.unit
+def test_ttl_cache_expires_and_caps():
+    cache = TtlCache(ttl=5.0, max_entries=3)
+    cache.set("a", 1, now=0.0)
+    cache.set("b", 2, now=1.0)
+    assert cache.get("a", now=4.9) == 1
+    assert cache.get("a", "gone", now=5.0) == "gone"
+
+    cache.set("c", 3, now=5.5)             # "a" expires on the way
+    assert list(cache.items()) == [("b", 2), ("c", 3)]
+    cache.set("b", 20, now=5.6)            # rewriting moves it to the back
+    cache.set("d", 4, now=5.7)
+    cache.set("e", 5, now=5.8)             # over the cap: least recently written goes
+    assert [k for k, _ in cache.items()] == ["b", "d", "e"]
+    assert (cache.expired, cache.evicted) == (1, 1)
+
+    with pytest.raises(ValueError):
+        TtlCache(ttl=0)
+
+
+@pytest.mark.unit
+def test_cooldown_memory_stays_flat():
+    cooldown = Cooldown(period=2.0, max_entries=1000)
+    assert cooldown.allow("v1", "OVERSPEED", 0.0)
+    assert not cooldown.allow("v1", "OVERSPEED", 1.9)
+    assert cooldown.allow("v1", "DISTANCE_CLOSE", 1.9)
+    assert cooldown.allow("v1", "OVERSPEED", 2.0)
+    assert cooldown.suppressed == 1
+
+    # 100k vehicles passing through, a handful per step
+    for i in range(100_000):
+        cooldown.allow(f"veh{i}", "OVERSPEED", 10.0 + i * 0.01)
+    assert len(cooldown) <= 201
+
+
+@pytest.mark.unit
+def test_dump_state_is_bounded(load_script):
+    dump = load_script("sumo-acc-demo/dump_via_traci.py")
+    dump.alert_cooldown.clear()
+    dump.brake_active.clear()
+    fcd, alerts = csv.writer(io.StringIO()), csv.writer(io.StringIO())
+    res = {dump.VAR_POSITION: (0.0, 0.0), dump.VAR_SPEED: 100 / 3.6, dump.VAR_LEADER: ("x", 1.0)}
+
+    # every step brings 50 new vehicles that overspeed and tailgate, then leave
+    for step in range(400):
+        dump.process_step(float(step), {f"v{step}_{i}": res for i in range(50)}, fcd, alerts)
+    assert len(dump.brake_active) <= 50 * dump.STATE_TTL_S
+    assert len(dump.alert_cooldown) <= 2 * 50 * dump.ALERT_COOLDOWN_S
+
+    # a vehicle that stays keeps its cooldown
+    dump.process_step(500.0, {"ego": res}, fcd, alerts)
+    assert not dump.now_ok_to_alert("ego", "OVERSPEED", 501.0)
+
+
+@pytest.mark.unit
+def test_monitor_and_sink_cooldown(tmp_alerts_csv):
+    stream = [{"speed": 90.0, "timestamp": t * 0.5} for t in range(10)]
+    assert len(SpeedMonitor(Thresholds(80.0)).on_speed(stream)) == 10           # off by default
+    mon = SpeedMonitor(Thresholds(80.0), cooldown=Cooldown(2.0))
+    assert [a.kind for a in mon.on_speed(stream)] == ["SPEEDING"] * 3             # t = 0, 2, 4
+
+    emitted = []
+    rule = Rule.from_dict({"name": "hot", "kind": "HOT", "type": "range", "signal": "X", "max": 1.0,
+                           "trigger": "edge"})
+    mon = SpeedMonitor(Thresholds(200.0), rules=[rule], on_alert=emitted.append, cooldown=Cooldown(5.0))
+    for t, x in enumerate([2.0, 0.0, 2.0, 0.0, 2.0, 0.0, 2.0]):
+        mon.evaluate({"X": x}, float(t))
+    assert len(emitted) == 2                                                      # t = 0 and t = 6
+
+    sink = AlertSink(tmp_alerts_csv, verbose=False, cooldown=Cooldown(60.0))
+    for subject in ("a", "a", "b", "a"):
+        sink.write("SPEEDING", 90.0, "too fast", subject)
+    sink.close()
+    assert sink.suppressed == 2
+    assert len(list(csv.reader(open(tmp_alerts_csv, newline="")))) == 1 + 2
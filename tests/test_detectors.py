@@ -0,0 +1,129 @@
+import math
+import random
+
+import pytest
+
+from speedMonitor.core import SIG_SPEED, SpeedMonitor, Thresholds
+from speedMonitor.detectors import (
+    Detector,
+    DetectorBank,
+    EwmaZScore,
+    RateLimit,
+    RingBuffer,
+    RollingRange,
+    default_detectors,
+)
+
+
+@pytest.mark.unit
+def test_ring_buffer_keeps_the_newest_samples():
+    rb = RingBuffer(3)
+    for x in range(5):
+        rb.push(float(x))
+    assert len(rb) == 3
+    assert rb.values() == [2.0, 3.0, 4.0]
+    assert rb[-1] == 4.0
+    with pytest.raises(IndexError):
+        rb[3]
+
+
+@pytest.mark.unit
+def test_rolling_range_matches_brute_force():
+    rng = random.Random(7)
+    xs = [rng.uniform(0, 100) for _ in range(500)]
+    det = RollingRange(window=17, max_spread=1e9)
+    for i, x in enumerate(xs):
+        det.update(x, i)
+        window = xs[max(0, i - 16):i + 1]
+        assert (det.min, det.max) == (min(window), max(window))
+
+
+@pytest.mark.unit
+def test_ewma_flags_a_spike_after_warmup():
+    det = EwmaZScore(alpha=0.1, z_max=4.0, warmup=10)
+    rng = random.Random(3)
+    assert not any(det.update(60.0 + rng.uniform(-1, 1), i) for i in range(50))
+    assert det.update(95.0, 50)
+    assert "sigma" in det.reason()
+    assert det.mean == pytest.approx(63.5, abs=1.0)
+
+
+@pytest.mark.unit
+def test_rate_and_jerk_limits():
+    det = RateLimit(max_rate=10.0)
+    assert not det.update(50.0, 0.0)
+    assert not det.update(55.0, 1.0)            # 5/s
+    assert det.update(30.0, 2.0)                # -25/s
+    assert det.rate == -25.0
+
+    jerk = RateLimit(max_jerk=2.0)
+    for t, x in enumerate([0.0, 1.0, 2.0, 3.0]):
+        assert not jerk.update(x, float(t))     # constant rate, no jerk
+    assert jerk.update(8.0, 4.0)                # rate 1 -> 5 in one second
+    assert "jerk" in jerk.reason()
+
+    with pytest.raises(ValueError):
+        RateLimit()
+
+
+@pytest.mark.unit
+def test_detector_without_update_cannot_be_built():
+    class NoUpdate(Detector):
+        kind = "BROKEN"
+
+    with pytest.raises(TypeError):
+        NoUpdate()
+
+
+@pytest.mark.unit
+def test_bank_reports_edges_only():
+    bank = DetectorBank({SIG_SPEED: [RateLimit(max_rate=10.0)]})
+    stamps = [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    alerts = bank.update_many(SIG_SPEED, [50.0, 30.0, 10.0, 10.0, 40.0, 60.0], stamps)
+    # two separate excursions: 50->30->10 and 10->40->60
+    assert [a.kind for a in alerts] == ["RATE_LIMIT", "RATE_LIMIT"]
+    assert alerts[0].rule == "RateLimit"
+    assert (alerts[0].signal, alerts[0].value, alerts[0].speed) == (SIG_SPEED, 30.0, 30.0)
+    assert bank.update("Vehicle.Other", 1.0, 0.0) == []
+
+    accel = "Vehicle.Acceleration.Longitudinal"
+    bank = DetectorBank({accel: [RateLimit(max_rate=10.0)]})
+    alerts = bank.update_many(accel, [0.0, 20.0], [0.0, 1.0])
+    assert (alerts[0].signal, alerts[0].value) == (accel, 20.0)
+    assert math.isnan(alerts[0].speed)              # not a speed, so not reported as one
+
+
+@pytest.mark.unit
+def test_on_speed_adds_detector_alerts(speed_stream_spiky):
+    mon = SpeedMonitor(Thresholds(80.0), detectors=[RollingRange(window=3, max_spread=15.0)])
+    alerts = mon.on_speed(speed_stream_spiky)
+    # one fluctuation alert for the whole spiky run, no SPEEDING
+    assert [a.kind for a in alerts] == ["SPEED_FLUCTUATION"]
+
+    plain = SpeedMonitor(Thresholds(80.0))
+    assert plain.on_speed(speed_stream_spiky) == []
+    assert plain.paths == [SIG_SPEED]
+
+
+@pytest.mark.unit
+def test_live_evaluation_emits_detector_alerts():
+    seen = []
+    mon = SpeedMonitor(Thresholds(200.0), detectors={"Vehicle.Acceleration.Longitudinal": [RateLimit(max_rate=5.0)]},
+                       on_alert=seen.append)
+    assert mon.paths == [SIG_SPEED, "Vehicle.Acceleration.Longitudinal"]
+
+    mon.evaluate({SIG_SPEED: 50.0, "Vehicle.Acceleration.Longitudinal": 0.0}, 0.0)
+    mon.evaluate({SIG_SPEED: 50.0, "Vehicle.Acceleration.Longitudinal": -9.0}, 1.0)
+    assert [a.kind for a in seen] == ["RATE_LIMIT"]
+
+
+@pytest.mark.unit
+def test_default_detectors_handle_a_long_stream():
+    bank = DetectorBank(default_detectors())
+    n = 100_000
+    rng = random.Random(1)
+    speeds = [60.0 + rng.gauss(0, 0.5) for _ in range(n)]
+    speeds[50_000] = 120.0
+    alerts = bank.update_many(SIG_SPEED, speeds, [i * 1e-2 for i in range(n)])
+    kinds = {a.kind for a in alerts}
+    assert "SPEED_ANOMALY" in kinds
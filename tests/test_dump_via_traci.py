@@ -0,0 +1,106 @@
+import csv
+import io
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture
+def dump(load_script):
+    mod = load_script("sumo-acc-demo/dump_via_traci.py")
+    mod.alert_cooldown.clear()
+    mod.brake_active.clear()
+    return mod
+
+
+def _veh(dump, x, speed_kmh, leader=None):
+    return {dump.VAR_POSITION: (x, 0.0), dump.VAR_SPEED: speed_kmh / 3.6, dump.VAR_LEADER: leader or ("", -1.0)}
+
+
+@pytest.mark.unit
+def test_process_step_combines_fcd_gap_and_overspeed(dump):
+    fcd, alerts = io.StringIO(), io.StringIO()
+    results = {
+        "lead": _veh(dump, 100.0, 36.0),
+        "ego": _veh(dump, 95.0, 72.0, ("lead", 4.0)),      # too close and too fast
+        "far": _veh(dump, 0.0, 50.0, ("ego", 80.0)),
+    }
+    commands = dump.process_step(1.0, results, csv.writer(fcd), csv.writer(alerts))
+
+    assert [row[1] for row in csv.reader(io.StringIO(fcd.getvalue()))] == ["lead", "ego", "far"]
+    kinds = [row[1] for row in csv.reader(io.StringIO(alerts.getvalue()))]
+    assert kinds == ["DISTANCE_CLOSE", "OVERSPEED"]
+    # leader speed comes from the same batch: 10 m/s - 1
+    assert commands == [("ego", pytest.approx(9.0)), ("ego", pytest.approx(60 / 3.6))]
+    assert dict(dump.brake_active.items()) == {"lead": False, "ego": True}
+
+
+class _FakeTraci(types.ModuleType):
+    """Scripted TraCI: two vehicles over three steps, counts calls that hit the socket."""
+
+    class TraCIException(Exception):
+        pass
+
+    def __init__(self, dump):
+        super().__init__("traci")
+        self.dump, self.step, self.calls, self.subscribed = dump, 0, [], {}
+        fake = self
+        self.simulation = types.SimpleNamespace(
+            subscribe=lambda var_ids: fake.calls.append("simulation.subscribe"),
+            getSubscriptionResults=fake._sim,
+        )
+        self.vehicle = types.SimpleNamespace(
+            getIDList=lambda: fake.calls.append("vehicle.getIDList") or [],
+            subscribe=fake._subscribe,
+            getAllSubscriptionResults=fake._vehicles,
+            slowDown=lambda vid, v, ms: fake.calls.append(("slowDown", vid)),
+        )
+
+    def start(self, cmd):
+        assert cmd[0] == "/opt/sumo/bin/sumo"
+        self.calls.append("start")
+
+    def close(self):
+        self.calls.append("close")
+
+    def simulationStep(self):
+        self.calls.append("simulationStep")
+        self.step += 1
+
+    def _subscribe(self, vid, var_ids, parameters=None):
+        self.calls.append(("vehicle.subscribe", vid))
+        self.subscribed[vid] = (tuple(var_ids), parameters)
+
+    def _sim(self):
+        d = self.dump
+        departed = {1: ["a", "b"]}.get(self.step, [])
+        return {d.VAR_TIME: float(self.step), d.VAR_MIN_EXPECTED_VEHICLES: 2 if self.step < 3 else 0,
+                d.VAR_DEPARTED_VEHICLES_IDS: departed}
+
+    def _vehicles(self):
+        d = self.dump
+        return {vid: _veh(d, 10.0 * self.step, 90.0 if vid == "a" else 40.0) for vid in self.subscribed}
+
+
+@pytest.mark.unit
+def test_main_uses_one_round_trip_per_step(dump, tmp_path, monkeypatch):
+    fake = _FakeTraci(dump)
+    monkeypatch.setitem(sys.modules, "traci", fake)
+    monkeypatch.setitem(sys.modules, "libsumo", None)           # force the socket backend
+    monkeypatch.setattr(dump.sumo_backend, "find_sumo_binary", lambda name: "/opt/sumo/bin/sumo")
+    monkeypatch.setattr(dump, "OUT_CSV", tmp_path / "fcd.csv")
+    monkeypatch.setattr(dump, "ALERTS_CSV", tmp_path / "alerts.csv")
+
+    dump.main()
+
+    assert fake.subscribed["a"] == ((dump.VAR_POSITION, dump.VAR_SPEED, dump.VAR_LEADER),
+                                    {dump.VAR_LEADER: ("d", dump.LEADER_LOOKAHEAD)})
+    per_step = [c for c in fake.calls if c not in ("start", "close", "simulation.subscribe", "vehicle.getIDList")]
+    assert per_step.count("simulationStep") == 3
+    # besides the step itself only one-time subscriptions and the overspeed slowDown of "a"
+    assert {c for c in per_step if c != "simulationStep"} == {
+        ("vehicle.subscribe", "a"), ("vehicle.subscribe", "b"), ("slowDown", "a")}
+
+    rows = list(csv.reader((tmp_path / "fcd.csv").open()))
+    assert len(rows) == 1 + 3 * 2
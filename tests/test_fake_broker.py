@@ -0,0 +1,90 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from kuksa_client.grpc import DataEntry, Datapoint, DataType, EntryType, EntryUpdate, Field, VSSClient, VSSClientError
+
+from speedMonitor.core import SpeedMonitor, Thresholds
+from speedMonitor.fake_broker import FakeDatabroker, FakeVSSClient
+
+
+@pytest.mark.unit
+def test_in_memory_roundtrip_and_metadata(fake_broker):
+    with fake_broker.client() as client:
+        assert client.get_current_values(["Vehicle.Speed"]) == {"Vehicle.Speed": None}
+        client.set_current_values({"Vehicle.Speed": Datapoint(88.0), "Vehicle.ADAS.DistanceToLead": Datapoint(7.5)})
+
+        values = client.get_current_values(["Vehicle.Speed", "Vehicle.ADAS.DistanceToLead"])
+        assert values["Vehicle.Speed"].value == 88.0
+        assert values["Vehicle.ADAS.DistanceToLead"].value == 7.5
+
+        meta = client.get_metadata(["Vehicle.Speed", "Vehicle.ADAS.TargetSpeed"])
+        assert meta["Vehicle.Speed"].unit == "km/h"
+        assert meta["Vehicle.ADAS.TargetSpeed"].data_type == DataType.FLOAT
+        assert meta["Vehicle.ADAS.TargetSpeed"].entry_type == EntryType.ATTRIBUTE
+
+
+@pytest.mark.unit
+def test_strict_broker_rejects_unknown_paths():
+    client = FakeVSSClient(FakeDatabroker(strict=True))
+    with pytest.raises(VSSClientError):
+        client.get_current_values(["Vehicle.Nope"])
+    with pytest.raises(VSSClientError):
+        client.set_current_values({"Vehicle.Nope": Datapoint(1.0)})
+
+
+@pytest.mark.unit
+def test_subscription_gets_initial_value_then_changes(fake_broker):
+    fake_broker.set([("Vehicle.Speed", 10.0)])
+    stream = fake_broker.client().subscribe_current_values(["Vehicle.Speed"])
+
+    assert next(stream)["Vehicle.Speed"].value == 10.0
+    fake_broker.set([("Vehicle.ADAS.DistanceToLead", 3.0)])  # not subscribed
+    fake_broker.set([("Vehicle.Speed", 20.0)])
+    assert next(stream) == {"Vehicle.Speed": fake_broker.get(["Vehicle.Speed"])["Vehicle.Speed"]}
+
+    stream.close()
+    assert fake_broker.subscriber_count == 0
+
+
+@pytest.mark.unit
+def test_monitor_runs_against_fake_broker(fake_broker):
+    mon = SpeedMonitor(Thresholds(80.0), hold=0.0)
+    fake_broker.set([("Vehicle.Speed", 50.0)])
+
+    def drive():
+        while fake_broker.subscriber_count == 0:
+            time.sleep(0.01)
+        for v in (120.0, 130.0):
+            fake_broker.set([("Vehicle.Speed", v)])
+
+    writer = threading.Thread(target=drive)
+    writer.start()
+    with patch("speedMonitor.core.VSSClient", fake_broker.client), \
+         patch.object(mon.brake_system, "engage_brake") as engage:
+        mon.start(mode="subscribe", max_cycles=3)
+    writer.join()
+
+    engage.assert_called_once_with(130.0, blocking=False)
+
+
+@pytest.mark.unit
+def test_grpc_server_serves_real_client(fake_broker_server):
+    with VSSClient(fake_broker_server.host, fake_broker_server.port) as client:
+        assert client.get_server_info().name == "fake-databroker"
+        assert client.get_metadata(["Vehicle.Speed"])["Vehicle.Speed"].data_type == DataType.FLOAT
+
+        client.set(updates=[
+            EntryUpdate(DataEntry("Vehicle.Speed", value=Datapoint(42.5)), (Field.VALUE,)),
+        ])
+        assert client.get_current_values(["Vehicle.Speed"])["Vehicle.Speed"].value == 42.5
+
+        stream = client.subscribe_current_values(["Vehicle.Speed"])
+        assert next(stream)["Vehicle.Speed"].value == 42.5
+        fake_broker_server.broker.set([("Vehicle.Speed", 99.0)])
+        assert next(stream)["Vehicle.Speed"].value == 99.0
+        stream.close()
+
+        with pytest.raises(VSSClientError):
+            client.get_current_values(["Vehicle.Nope"])
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+
+@pytest.fixture
+def fcd(load_script):
+    return load_script("sumo-acc-demo/fcd_to_csv.py")
+
+
+@pytest.mark.unit
+def test_cache_is_built_once_and_matches_the_xml(fcd, fcd_xml, tmp_path, monkeypatch):
+    all_out = str(tmp_path / "fcd_all.csv")
+    ref_pairs = fcd.AllPairsWriter(tmp_path / "ref_pairs.csv")
+    ref_scene, ref_n, ref_seen = fcd.stream_fcd(fcd_xml, all_out, pairs=ref_pairs)
+    ref_pairs.finish(2.0, 1.5, 2.0)
+    ref_all = pd.read_csv(all_out)
+
+    (scene, n_all, seen), hit = fcd.load_or_stream_fcd(fcd_xml, all_out)
+    assert not hit
+    meta = fcd.load_fcd_cache(fcd_xml)["meta"]
+    assert (meta["rows"], meta["ids"], meta["lanes"]) == (18, ["lead", "ego", "other"], ["e0_0", "e0_1"])
+    assert os.path.getsize(os.path.join(fcd.default_cache_dir(fcd_xml), "x_m.bin")) == 18 * 8
+
+    # re-analysis must not parse the XML again
+    monkeypatch.setattr(fcd, "iter_timesteps", lambda path: pytest.fail("XML parsed on a cache hit"))
+    mtime = os.stat(all_out).st_mtime_ns
+    pairs = fcd.AllPairsWriter(tmp_path / "pairs.csv")
+    (scene, n_all, seen), hit = fcd.load_or_stream_fcd(fcd_xml, all_out, pairs=pairs)
+    pairs.finish(2.0, 1.5, 2.0)
+    assert hit
+    assert os.stat(all_out).st_mtime_ns == mtime          # fcd_all.csv is still current
+    assert (n_all, seen) == (ref_n, ref_seen)
+    pd.testing.assert_frame_equal(scene, ref_scene, check_exact=True)
+    pd.testing.assert_frame_equal(pd.read_csv(pairs.out), pd.read_csv(ref_pairs.out), check_exact=True)
+
+    os.remove(all_out)
+    fcd.load_or_stream_fcd(fcd_xml, all_out)
+    pd.testing.assert_frame_equal(pd.read_csv(all_out), ref_all, check_exact=True)
+
+
+@pytest.mark.unit
+def test_cache_is_rebuilt_when_the_xml_changes(fcd, fcd_xml, tmp_path):
+    all_out = str(tmp_path / "fcd_all.csv")
+    fcd.load_or_stream_fcd(fcd_xml, all_out)
+    assert fcd.load_fcd_cache(fcd_xml) is not None
+
+    with open(fcd_xml) as f:
+        text = f.read()
+    with open(fcd_xml, "w") as f:
+        f.write(text.replace('id="ego"', 'id="ego2"'))
+    assert fcd.load_fcd_cache(fcd_xml) is None
+
+    (scene, n_all, seen), hit = fcd.load_or_stream_fcd(fcd_xml, all_out)
+    assert not hit and scene.empty and seen == {"lead"}
+    assert fcd.load_fcd_cache(fcd_xml)["ids"] == ["lead", "ego2", "other"]
+
+    (scene, n_all, seen), hit = fcd.load_or_stream_fcd(fcd_xml, all_out, use_cache=False)
+    assert not hit
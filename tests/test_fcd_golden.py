@@ -0,0 +1,62 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+GOLDEN = os.path.join(os.path.dirname(__file__), "data", "fcd_golden")
+
+# fcd.xml: ego closes in on lead at 90 km/h (over the 80 km/h limit), backs
+# off, then speeds up in the 50 km/h zone while the lead slows down: two
+# SPEEDING and two BRAKE alerts (GAP/HEADWAY, then GAP/HEADWAY + TTC).
+# The expected CSVs were written by the row-by-row fcd_to_csv.py that
+# predates the vectorized pipeline; outputs must stay byte-identical.
+OUTPUTS = ("scenario.csv", "alerts.csv", "fcd_all.csv")
+
+
+def _run(fcd, monkeypatch, workdir, *extra):
+    argv = ["fcd_to_csv.py", "--in", str(workdir / "fcd.xml"),
+            "--scenario-out", str(workdir / "scenario.csv"),
+            "--all-out", str(workdir / "fcd_all.csv"),
+            "--alerts-out", str(workdir / "alerts.csv"), *extra]
+    monkeypatch.setattr(sys, "argv", argv)
+    fcd.main()
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.unit
+def test_outputs_match_golden_files(load_script, monkeypatch, tmp_path):
+    fcd = load_script("sumo-acc-demo/fcd_to_csv.py")
+    shutil.copy(os.path.join(GOLDEN, "fcd.xml"), tmp_path / "fcd.xml")
+
+    _run(fcd, monkeypatch, tmp_path, "--no-cache")
+
+    for name in OUTPUTS:
+        assert _read(tmp_path / name) == _read(os.path.join(GOLDEN, name)), name
+
+
+@pytest.mark.unit
+def test_cached_rerun_writes_the_same_bytes(load_script, monkeypatch, tmp_path):
+    fcd = load_script("sumo-acc-demo/fcd_to_csv.py")
+    shutil.copy(os.path.join(GOLDEN, "fcd.xml"), tmp_path / "fcd.xml")
+    outputs = OUTPUTS + ("fcd_pairs.csv",)
+    pairs = ("--all-pairs-out", str(tmp_path / "fcd_pairs.csv"))
+
+    _run(fcd, monkeypatch, tmp_path, "--no-cache", *pairs)
+    uncached = {name: _read(tmp_path / name) for name in outputs}
+
+    _run(fcd, monkeypatch, tmp_path, *pairs)             # parses the XML and builds the cache
+    assert os.path.isdir(fcd.default_cache_dir(tmp_path / "fcd.xml"))
+    for name in outputs:
+        os.remove(tmp_path / name)
+    monkeypatch.setattr(fcd, "iter_timesteps", lambda path: pytest.fail("XML parsed on a cache hit"))
+    _run(fcd, monkeypatch, tmp_path, *pairs)             # everything rebuilt from the cache
+
+    for name in outputs:
+        assert _read(tmp_path / name) == uncached[name], name
@@ -0,0 +1,122 @@
+import csv
+import os
+
+import pytest
+
+from speedMonitor.fcd_store import FcdRow, build_store, default_store_dir, open_store
+
+ROWS = [
+    ["time_s", "veh_id", "x_m", "y_m", "speed_kmh"],
+    ["0.0", "a", "0.0", "0.0", "36.0"],
+    ["0.0", "b", "50.0", "3.2", "54.0"],
+    ["1.0", "b", "65.0", "3.2", "54.0"],
+    ["1.0", "a", "10.0", "0.0", "36.0"],
+    ["1.0", "c", "", "", ""],
+    ["2.0", "a", "20.0", "0.0", "36.0"],
+    ["2.0", "a", "21.0", "0.0", "37.0"],          # repeated row, the last one wins downstream
+    ["3.0", "b", "95.0", "-3.2", "54.0"],
+]
+
+
+def _write(path, rows):
+    with open(path, "w", newline="") as f:
+        csv.writer(f).writerows(rows)
+    return str(path)
+
+
+@pytest.mark.unit
+def test_store_queries(tmp_path):
+    src = _write(tmp_path / "fcd_all.csv", [ROWS[0], *reversed(ROWS[1:])])    # out of order on purpose
+
+    with open_store(src) as store:
+        assert (len(store), store.n_steps, store.speed_unit) == (8, 4, "km/h")
+        assert store.times() == [0.0, 1.0, 2.0, 3.0]
+        assert list(store.step_range(0.5, 2.0)) == [1, 2]
+        assert [(r.time_s, r.veh_id) for r in store.time_range(1.0, 1.5)] == [(1.0, "c"), (1.0, "a"), (1.0, "b")]
+        assert [t for t, rows in store.steps(2.0)] == [2.0, 3.0]
+
+        assert store.trajectory("a", 1.0) == [FcdRow(1.0, "a", 10.0, 0.0, 36.0), FcdRow(2.0, "a", 21.0, 0.0, 37.0),
+                                               FcdRow(2.0, "a", 20.0, 0.0, 36.0)]
+        assert [r.time_s for r in store.trajectory("b", t1=1.0)] == [0.0, 1.0]
+        assert [store.speed_text(i) for i in store.trajectory_rows("a", 1.0)] == ["36.0", "37.0", "36.0"]
+        assert [store.speed_text(i) for i in store.trajectory_rows("c")] == [""]
+        assert store.trajectory("nobody") == []
+
+        # c has no position and never matches
+        assert [(r.time_s, r.veh_id) for r in store.bbox(-1.0, -1.0, 60.0, 5.0)] == [
+            (0.0, "a"), (0.0, "b"), (1.0, "a"), (2.0, "a"), (2.0, "a")]
+        assert store.bbox(60.0, 0.0, 100.0, 5.0, t0=1.0, t1=3.0) == [FcdRow(1.0, "b", 65.0, 3.2, 54.0)]
+
+
+@pytest.mark.unit
+def test_store_is_reused_until_the_csv_changes(tmp_path, monkeypatch):
+    from speedMonitor import fcd_store
+
+    src = _write(tmp_path / "fcd_traci.csv", [["time_s", "veh_id", "x", "y", "speed"], ["0.0", "a", "1", "2", "3"]])
+    open_store(src).close()
+    assert os.path.isfile(os.path.join(default_store_dir(src), "meta.json"))
+
+    monkeypatch.setattr(fcd_store, "build_store", lambda *a: pytest.fail("store rebuilt"))
+    with open_store(src) as store:
+        assert store.speed_unit == "m/s"
+    monkeypatch.setattr(fcd_store, "build_store", build_store)
+
+    _write(src, [["time_s", "veh_id", "x", "y", "speed"], ["0.0", "a", "1", "2", "3"], ["0.5", "b", "1", "2", "3"]])
+    with open_store(src) as store:
+        assert store.ids == ["a", "b"]
+
+    _write(src, [["time", "vehicle"]])
+    with pytest.raises(ValueError):
+        build_store(src)
+
+
+@pytest.mark.unit
+def test_compute_gap_and_scenario_from_store(load_script, fcd_xml, tmp_path):
+    gap = load_script("adas/compute_gap.py")
+    src = tmp_path / "vehicles.csv"
+    # speeds as SUMO or a spreadsheet may write them: the gap table keeps the text
+    rows = [["time_s", "veh_id", "x", "y", "speed"], ["1.0", "lead", "20.0", "-1.6", "5"],
+            ["1.0", "ego", "10.0", "-1.6", "8.00"], ["1.5", "ego", "14.0", "-1.6", "8.5"],
+            ["1.5", "lead", "22.5", "-1.6", ""], ["2.0", "ego", "18.0", "-1.6", "9.0"]]
+    _write(src, rows)
+    gap.compute_gap(str(src), out_csv=str(tmp_path / "scan.csv"))
+    gap.compute_gap(str(src), out_csv=str(tmp_path / "store.csv"), store=True)
+    assert (tmp_path / "scan.csv").read_text() == (tmp_path / "store.csv").read_text()
+    assert "8.00,5," in (tmp_path / "store.csv").read_text()
+
+    with open_store(str(src)) as store:
+        gap.compute_gap(str(src), start=1.5, out_csv=str(tmp_path / "late.csv"), store=store)
+    assert len((tmp_path / "late.csv").read_text().splitlines()) == 3
+
+    # the scenario table from fcd_all.csv matches the XML based one
+    pd = pytest.importorskip("pandas")
+    fcd = load_script("sumo-acc-demo/fcd_to_csv.py")
+    all_out = tmp_path / "fcd_all.csv"
+    df_scene = fcd.stream_fcd(fcd_xml, str(all_out))[0]
+    with open_store(str(all_out)) as store:
+        pd.testing.assert_frame_equal(fcd.build_ego_lead_table_from_store(store), df_scene)
+
+
+@pytest.mark.unit
+def test_numpy_and_pure_python_builds_write_the_same_store(tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    from speedMonitor import fcd_store
+
+    # out of order, ties in x, missing positions and speeds, non-ASCII ids and speed text
+    rows = [ROWS[0], *reversed(ROWS[1:]), ["0.0", "d", "50.0", "1.0", "5,4"], ["3.0", "é", "", "", "±1"]]
+    src = _write(tmp_path / "fcd_all.csv", rows)
+    empty = _write(tmp_path / "empty.csv", [ROWS[0]])
+
+    def files(store_dir):
+        return {name: open(os.path.join(store_dir, name + ".bin"), "rb").read() for name in fcd_store._FILES}
+
+    for path in (src, empty):
+        fast = files(build_store(path, str(tmp_path / "fast")))
+        monkeypatch.setattr(fcd_store, "np", None)
+        slow = files(build_store(path, str(tmp_path / "slow")))
+        monkeypatch.undo()
+        assert fast == slow
+
+    with open_store(src) as store:
+        assert [store.speed_text(i) for i in store.trajectory_rows("d")] == ["5,4"]
+        assert [store.speed_text(i) for i in store.trajectory_rows("é")] == ["±1"]
@@ -0,0 +1,77 @@
+import csv
+import os
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+
+@pytest.mark.unit
+def test_iter_timesteps_streams_every_step(load_script, fcd_xml):
+    fcd = load_script("sumo-acc-demo/fcd_to_csv.py")
+    steps = list(fcd.iter_timesteps(fcd_xml))
+
+    assert len(steps) == 7
+    assert steps[0] == (0.0, [])
+    assert [v["id"] for v in steps[1][1]] == ["lead", "ego", "other"]
+    assert sum(len(b) for b in fcd.iter_timestep_batches(fcd_xml, batch_size=3)) == 7
+
+
+@pytest.mark.unit
+def test_stream_matches_tree_based_tables(load_script, fcd_xml, tmp_path):
+    fcd = load_script("sumo-acc-demo/fcd_to_csv.py")
+    root = fcd.load_xml(fcd_xml)
+    all_out = tmp_path / "fcd_all.csv"
+
+    df_scene, n_all, seen = fcd.stream_fcd(fcd_xml, str(all_out), batch_size=2)
+
+    pd.testing.assert_frame_equal(df_scene, fcd.build_ego_lead_table(root))
+    expected_all = fcd.build_all_vehicle_table(root)
+    assert n_all == len(expected_all) == 18
+    pd.testing.assert_frame_equal(pd.read_csv(all_out), expected_all)
+    assert seen == {"ego", "lead"}
+
+
+@pytest.mark.unit
+def test_adas_fcd_xml_to_csv(load_script, fcd_xml, tmp_path):
+    fcd = load_script("adas/fcd_to_csv.py")
+    out = tmp_path / "vehicles.csv"
+    fcd.fcd_xml_to_csv(fcd_xml, out)
+
+    rows = list(csv.DictReader(open(out, newline="")))
+    assert len(rows) == 18
+    assert rows[0] == {"time_s": "0.0", "veh_id": "lead", "x": "20.0", "y": "-1.6", "speed": "5.0"}
+
+
+@pytest.mark.unit
+def test_all_pairs_leader_per_lane(load_script, fcd_xml, tmp_path):
+    fcd = load_script("sumo-acc-demo/fcd_to_csv.py")
+    df_pairs = fcd.build_all_pairs_table(fcd.load_xml(fcd_xml))
+
+    # only ego has a leader: "other" drives alone on e0_1, lead is in front
+    assert len(df_pairs) == 6
+    assert set(df_pairs["veh_id"]) == {"ego"} and set(df_pairs["lead_id"]) == {"lead"}
+
+    # same numbers as the dedicated ego/lead table (pos == x in the fixture)
+    scene = fcd.build_ego_lead_table(fcd.load_xml(fcd_xml))
+    pd.testing.assert_frame_equal(df_pairs.drop(columns=["veh_id", "lead_id"]), scene)
+
+
+
+@pytest.mark.unit
+def test_all_pairs_are_written_batch_by_batch(load_script, fcd_xml, tmp_path):
+    fcd = load_script("sumo-acc-demo/fcd_to_csv.py")
+    expected = fcd.mark_brake_and_speeding(fcd.build_all_pairs_table(fcd.load_xml(fcd_xml)), 2.0, 1.5, 2.0)
+
+    out = tmp_path / "pairs.csv"
+    pairs = fcd.AllPairsWriter(out)
+    fcd.stream_fcd(fcd_xml, str(tmp_path / "all.csv"), batch_size=2, pairs=pairs)
+    # zones split at the median time of all rows, not of a batch
+    assert pairs.median_time() == expected["t_s"].median()
+    assert pairs.finish(2.0, 1.5, 2.0, chunk_rows=4) == 6
+    assert out.read_text() == expected.to_csv(index=False)
+    assert not os.path.exists(pairs.spill)
+
+    empty = fcd.AllPairsWriter(tmp_path / "none.csv")
+    assert empty.finish(2.0, 1.5, 2.0) == 0
+    assert pd.read_csv(tmp_path / "none.csv").empty
@@ -0,0 +1,146 @@
+import asyncio
+import csv
+import pytest
+from unittest.mock import MagicMock, patch
+
+from speedMonitor.core import Thresholds
+from speedMonitor.fleet import FleetMonitor, parse_vehicles
+
+
+class FakeAsyncClient:
+    """Minimal async VSSClient stand-in that replays speeds per host."""
+    streams = {}
+
+    def __init__(self, host, port):
+        self.host = host
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    async def subscribe_current_values(self, paths):
+        for v in self.streams[self.host]:
+            yield {"Vehicle.Speed": MagicMock(value=v)}
+            await asyncio.sleep(0)
+        # keep the stream open like a real broker would
+        await asyncio.sleep(3600)
+
+
+@pytest.mark.unit
+def test_fleet_keeps_per_vehicle_state_and_shared_sink(make_sink, tmp_alerts_csv):
+    FakeAsyncClient.streams = {
+        "10.0.0.1": [50.0, 130.0, 60.0],
+        "10.0.0.2": [140.0, 150.0],
+        "10.0.0.3": [10.0, 20.0],
+    }
+    sink = make_sink(tmp_alerts_csv)
+    fleet = FleetMonitor(Thresholds(120.0), sink)
+    for spec in parse_vehicles([f"car{i}=10.0.0.{i}:55556" for i in (1, 2, 3)]):
+        fleet.add_vehicle(spec.vehicle_id, spec.host, spec.port)
+
+    with patch("speedMonitor.fleet.AsyncVSSClient", FakeAsyncClient):
+        asyncio.run(fleet.run(duration=0.2))
+    sink.close()
+
+    rows = list(csv.DictReader(open(tmp_alerts_csv, newline="")))
+    assert fleet.samples == 7
+    assert sorted(float(r["speed"]) for r in rows) == [130.0, 140.0, 150.0]
+    assert sum(r["reason"].startswith("car2:") for r in rows) == 2
+    assert fleet.monitors["car1"].overspeed_start is None
+    assert fleet.monitors["car2"].overspeed_start is not None
+
+
+@pytest.mark.unit
+def test_parse_vehicles_rejects_bad_spec():
+    with pytest.raises(ValueError):
+        parse_vehicles(["car1-localhost"])
+
+
+@pytest.mark.unit
+def test_fleet_shares_the_plan_and_ramps_on_its_own_pool():
+    import threading
+
+    fleet = FleetMonitor(Thresholds(120.0), auto_brake=True)
+    ramp_threads = []
+    with patch("speedMonitor.core.AutoBrakeSystem") as brake_cls:
+        brake_cls.return_value.active = False
+        brake_cls.return_value.run.side_effect = lambda: ramp_threads.append(threading.current_thread().name)
+        a, b = fleet.add_vehicle("car1", "10.0.0.1"), fleet.add_vehicle("car2", "10.0.0.2")
+
+        async def drive():
+            for now in (0.0, 3.0):
+                fleet.handle_speed("car1", 130.0, now=now)
+                fleet.handle_speed("car2", 100.0, now=now)
+            await asyncio.sleep(0.1)
+
+        asyncio.run(drive())
+
+    assert a.rules._plan[0].check is b.rules._plan[0].check          # compiled once
+    assert a.rules.is_firing("overspeed") and not b.rules.is_firing("overspeed")
+    assert a.detectors is b.detectors
+    assert ramp_threads and ramp_threads[0].startswith("FleetBrake")
+
+    plain = FleetMonitor(Thresholds(120.0))
+    assert plain.add_vehicle("car3")._brake_system is None
+
+
+class FlakyAsyncClient:
+    """Fails the first subscription, then streams; counts what the fleet did with it."""
+    subscriptions = polls = disconnects = 0
+
+    def __init__(self, host, port):
+        pass
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        FlakyAsyncClient.disconnects += 1
+
+    async def get_current_values(self, paths):
+        FlakyAsyncClient.polls += 1
+        return {"Vehicle.Speed": MagicMock(value=50.0)}
+
+    async def subscribe_current_values(self, paths):
+        FlakyAsyncClient.subscriptions += 1
+        if FlakyAsyncClient.subscriptions == 1:
+            raise RuntimeError("broker hiccup")
+        yield {"Vehicle.Speed": MagicMock(value=130.0)}
+        await asyncio.sleep(3600)
+
+
+@pytest.mark.unit
+def test_failed_subscription_is_retried():
+    fleet = FleetMonitor(Thresholds(120.0), interval=0.01, resubscribe_backoff=0.02)
+    fleet.add_vehicle("car1")
+
+    with patch("speedMonitor.fleet.AsyncVSSClient", FlakyAsyncClient):
+        asyncio.run(fleet.run(duration=0.3))
+
+    assert FlakyAsyncClient.subscriptions == 2
+    assert 1 <= FlakyAsyncClient.polls <= 5          # polled only until the retry
+    assert fleet.monitors["car1"].overspeed_start is not None
+
+
+@pytest.mark.unit
+def test_failed_connect_still_disconnects():
+    disconnects = []
+
+    class Unreachable:
+        def __init__(self, host, port):
+            pass
+
+        async def connect(self):
+            raise ConnectionError("refused")
+
+        async def disconnect(self):
+            disconnects.append(1)
+
+    fleet = FleetMonitor(Thresholds(120.0), reconnect_delay=0.01)
+    fleet.add_vehicle("car1")
+    with patch("speedMonitor.fleet.AsyncVSSClient", Unreachable):
+        asyncio.run(fleet.run(duration=0.1))
+
+    assert len(disconnects) >= 2                       # once per failed attempt
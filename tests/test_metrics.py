@@ -0,0 +1,93 @@
+import json
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+
+from speedMonitor.brake_controller import AutoBrakeSystem
+from speedMonitor.io import AlertSink
+from speedMonitor.metrics import LatencyHistogram, Metrics, MetricsServer
+
+
+@pytest.mark.unit
+def test_histogram_percentiles_within_bucket_error():
+    h = LatencyHistogram()
+    for ms in range(1, 1001):          # 1 ms .. 1 s, uniform
+        h.record(ms / 1000.0)
+
+    snap = h.snapshot()
+    assert snap["count"] == 1000
+    assert snap["p50_ms"] == pytest.approx(500, rel=0.02)
+    assert snap["p99_ms"] == pytest.approx(990, rel=0.02)
+    assert snap["max_ms"] == pytest.approx(1000)
+    assert snap["mean_ms"] == pytest.approx(500.5, rel=0.001)
+
+
+@pytest.mark.unit
+def test_histogram_merge_and_clamping():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    a.record(-1.0)                     # clock skew, counted as 0
+    b.record(10_000.0)                 # clamped to one hour
+    a.merge(b)
+
+    assert a.count == 2
+    assert a.snapshot()["min_ms"] == 0
+    assert a.percentile(100) == 3600.0
+
+
+@pytest.mark.unit
+def test_disabled_metrics_record_nothing():
+    m = Metrics(enabled=False)
+    m.observe("x", 0.1)
+    m.incr("n")
+    assert m.snapshot() == {"stages": {}, "counters": {}}
+
+
+@pytest.mark.unit
+def test_sink_and_brake_record_their_stages(tmp_path):
+    m = Metrics()
+    sink = AlertSink(str(tmp_path / "alerts.csv"), verbose=False, metrics=m)
+    sink.write("SPEEDING", 120.0, "too fast")
+    sink.close()
+
+    with patch("speedMonitor.brake_controller.VSSClient"):
+        brake = AutoBrakeSystem(threshold=50, reduction_rate=10, step_interval=0, metrics=m)
+        brake.engage_brake(70)
+
+    stages = m.snapshot()["stages"]
+    assert stages["sink_write"]["count"] == 1
+    assert stages["actuator_write"]["count"] == 2
+    assert stages["engage_to_command"]["count"] == 1
+    assert m.counters["alerts_written"] == 1
+
+
+@pytest.mark.unit
+def test_http_endpoint_serves_prometheus_and_json():
+    m = Metrics()
+    m.observe("receipt_to_decision", 0.002)
+    server = MetricsServer(m, port=0)
+    try:
+        base = f"http://{server.host}:{server.port}"
+        text = urllib.request.urlopen(base + "/metrics").read().decode()
+        data = json.loads(urllib.request.urlopen(base + "/metrics.json").read())
+    finally:
+        server.close()
+
+    assert 'speedmonitor_receipt_to_decision_seconds{quantile="0.99"}' in text
+    assert "speedmonitor_receipt_to_decision_seconds_count 1" in text
+    assert data["stages"]["receipt_to_decision"]["count"] == 1
+
+
+@pytest.mark.unit
+def test_monitor_records_broker_and_decision_latency(fake_broker):
+    from speedMonitor.core import SpeedMonitor, Thresholds
+
+    m = Metrics()
+    mon = SpeedMonitor(Thresholds(80.0), metrics=m)
+    fake_broker.set([("Vehicle.Speed", 50.0)])
+    with patch("speedMonitor.core.VSSClient", fake_broker.client):
+        mon.start(mode="subscribe", max_cycles=1)
+
+    stages = m.snapshot()["stages"]
+    assert stages["broker_to_receipt"]["count"] == 1
+    assert stages["receipt_to_decision"]["count"] == 1
@@ -0,0 +1,91 @@
+from array import array
+
+import pytest
+
+from speedMonitor.core import SpeedMonitor, Thresholds
+from speedMonitor.detectors import default_detectors
+from speedMonitor.parallel import DetectionPipeline, SharedRing, run_pipeline
+
+
+@pytest.mark.unit
+def test_shared_ring_wraps_and_applies_backpressure():
+    ring = SharedRing(capacity=4)
+    reader = SharedRing(capacity=4, name=ring.name)
+    try:
+        assert ring.write(array("d", [0, 1, 0, 1, 2, 0, 2, 3, 0])) == 3
+        assert list(reader.read(limit=2)) == [0, 1, 0, 1, 2, 0]
+        # 1 pending + 3 new fills the ring exactly, across the wrap point
+        assert ring.write(array("d", [3, 4, 0, 4, 5, 0, 5, 6, 0])) == 3
+        assert ring.write(array("d", [6, 7, 0]), timeout=0.01) == 0
+        assert len(ring) == 4
+
+        out = []
+        while True:
+            block = reader.read()
+            if not block:
+                break
+            out.extend(block[1::3])
+        assert out == [3, 4, 5, 6]
+    finally:
+        reader.close()
+        ring.close()
+
+
+@pytest.mark.unit
+def test_pipeline_matches_a_single_monitor_per_key():
+    n = 2000
+    streams = {
+        f"car{k}": [60.0 + (k * 7 + i * 13) % 11 + (70.0 if i == 500 + k else 0.0) for i in range(n)]
+        for k in range(5)
+    }
+    stamps = [i * 0.01 for i in range(n)]
+
+    expected = []
+    for key, speeds in streams.items():
+        mon = SpeedMonitor(Thresholds(100.0), detectors=default_detectors())
+        for t, v in zip(stamps, speeds):
+            expected += [(key, t, a.kind) for a in mon.on_speed({"speed": v, "timestamp": t})]
+
+    with DetectionPipeline(workers=2, max_speed=100.0) as pipe:
+        for key, speeds in streams.items():
+            pipe.submit_many(key, speeds, stamps)
+        pipe.finish()
+        got = [(a.key, a.t, a.kind) for a in pipe.alerts()]
+
+    assert sorted(got) == sorted(expected)
+    assert any(kind == "SPEEDING" for _, _, kind in got)
+    assert sum(pipe.processed.values()) == 5 * n
+    assert set(pipe.processed) == {0, 1}
+
+
+@pytest.mark.unit
+def test_run_pipeline_from_an_ingestion_thread():
+    source = ((f"v{i % 3}", 120.0 if i % 50 == 0 else 50.0, i * 0.1) for i in range(600))
+    alerts = []
+    stats = run_pipeline(source, alerts.append, workers=2, detectors=None)
+
+    assert stats == {"samples": 600, "processed": 600, "workers": 2}
+    assert len(alerts) == 12
+    assert {a.kind for a in alerts} == {"SPEEDING"}
+
+
+def _broken_detectors():
+    raise ValueError("bad detector config")
+
+
+@pytest.mark.unit
+def test_failed_worker_stops_the_producer():
+    pipe = DetectionPipeline(workers=1, detectors=_broken_detectors, capacity=8).start()
+    try:
+        with pytest.raises(RuntimeError, match="reader is gone"):
+            pipe.submit_many("car", [50.0] * 1000, [i * 0.1 for i in range(1000)])
+    finally:
+        with pytest.raises(RuntimeError, match="detector-0 failed: ValueError: bad detector config"):
+            pipe.close(timeout=5.0)
+
+
+@pytest.mark.unit
+def test_failed_worker_ends_the_ingestion_thread():
+    source = (("car", 50.0, i * 0.1) for i in range(100000))
+    with pytest.raises(RuntimeError, match="detector-0 failed|reader is gone"):
+        run_pipeline(source, lambda a: None, workers=1, detectors=_broken_detectors, capacity=8)
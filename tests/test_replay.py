@@ -0,0 +1,107 @@
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+GAP_CSV = os.path.join(ROOT, "adas", "gap.csv")
+
+
+@pytest.fixture
+def replay_mod(load_script, monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(ROOT, "adas"))
+    return load_script("adas/replay_gap_to_kuksa.py")
+
+
+def _write_gap(path, times):
+    lines = ["time_s,ego_id,lead_id,ego_speed,lead_speed,distance_m"]
+    lines += [f"{t},ego,lead,10.0,9.0,{'' if i == 1 else 8.0}" for i, t in enumerate(times)]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def _typed_client(replay_mod):
+    from kuksa_client.grpc import DataType, Metadata
+
+    client = MagicMock()
+    client.get_metadata.return_value = {
+        path: Metadata(data_type=DataType.FLOAT)
+        for path in (replay_mod.SIG_SPEED, replay_mod.SIG_DISTANCE, replay_mod.SIG_TARGET)
+    }
+    return client
+
+
+@pytest.mark.unit
+def test_fast_mode_coalesces_one_write_per_row(replay_mod):
+    client = _typed_client(replay_mod)
+    stats = replay_mod.replay(GAP_CSV, publish_to_kuksa=True, mode="fast", quiet=True, client=client)
+
+    assert stats["rows"] == 144
+    client.set_current_values.assert_not_called()
+    client.get_metadata.assert_called_once()
+    assert client.set.call_count == 144
+    # one type lookup, then exactly one Set per row
+    assert stats["rpcs"] == stats["rows"] + 1
+    updates = client.set.call_args_list[0].kwargs["updates"]
+    assert {u.entry.path for u in updates} == {replay_mod.SIG_SPEED, replay_mod.SIG_DISTANCE, replay_mod.SIG_TARGET}
+    assert all(u.entry.metadata is not None for u in updates)
+
+
+@pytest.mark.unit
+def test_single_row_replay_uses_one_rpc_per_row(replay_mod, fake_broker_server):
+    from kuksa_client.grpc import VSSClient
+
+    # a real client against the local gRPC stand-in, counting the RPCs it sends
+    calls = []
+    with VSSClient(fake_broker_server.host, fake_broker_server.port) as client:
+        for stub in (client.client_stub_v1, client.client_stub_v2):
+            for name in [n for n in dir(stub) if n[0].isupper()]:
+                rpc = getattr(stub, name)
+                setattr(stub, name, lambda *a, _rpc=rpc, _name=name, **kw: calls.append(_name) or _rpc(*a, **kw))
+        stats = replay_mod.replay(GAP_CSV, publish_to_kuksa=True, mode="fast", quiet=True, client=client)
+
+    assert len(calls) == stats["rpcs"]
+    assert calls.count("Set") == stats["rows"] == 144
+    assert calls.count("Get") == 1            # the up-front type lookup
+    assert stats["rpcs"] == stats["rows"] + 1
+
+
+@pytest.mark.unit
+def test_batched_rows_use_one_rpc(replay_mod, tmp_path):
+    from kuksa_client.grpc import DataType
+
+    gap = _write_gap(tmp_path / "gap.csv", [0.0, 0.1, 0.2])
+    client = _typed_client(replay_mod)
+    stats = replay_mod.replay(gap, publish_to_kuksa=True, mode="fast", batch_rows=8, quiet=True, client=client)
+
+    client.set_current_values.assert_not_called()
+    client.set.assert_called_once()
+    updates = client.set.call_args.kwargs["updates"]
+    # the second row has no distance
+    assert len(updates) == stats["updates"] == 8
+    # types are looked up once up front, so the client does not repeat it per Set
+    assert all(u.entry.metadata.data_type == DataType.FLOAT for u in updates)
+    assert stats["rpcs"] == 2
+
+
+@pytest.mark.unit
+def test_batching_refused_when_paced(replay_mod):
+    for mode in ("step", "realtime"):
+        with pytest.raises(ValueError):
+            replay_mod.replay(GAP_CSV, mode=mode, batch_rows=4, quiet=True)
+
+
+@pytest.mark.unit
+def test_realtime_mode_follows_recorded_time(replay_mod, tmp_path):
+    gap = _write_gap(tmp_path / "gap.csv", [5.0, 5.1, 5.2, 5.3])
+    stats = replay_mod.replay(gap, mode="realtime", speedup=2.0, quiet=True)
+
+    # 0.3 s of recording at 2x
+    assert 0.15 <= stats["elapsed_s"] < 0.5
+    assert stats["max_lag_s"] < 0.1
+
+
+@pytest.mark.unit
+def test_unknown_mode_rejected(replay_mod):
+    with pytest.raises(ValueError):
+        replay_mod.replay(GAP_CSV, mode="warp")
@@ -0,0 +1,146 @@
+import math
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from speedMonitor.core import OVERSPEED, SIG_SPEED, SpeedMonitor, Thresholds
+from speedMonitor.rules import (
+    SIG_ACCEL,
+    SIG_BRAKE,
+    Rule,
+    RuleEngine,
+    brake_accel_conflict_rule,
+    load_rules,
+    overspeed_rule,
+)
+
+RULES_JSON = Path(__file__).resolve().parent.parent / "config" / "rules.json"
+
+
+@pytest.mark.unit
+def test_range_rule_with_hold_fires_after_the_hold():
+    engine = RuleEngine([overspeed_rule(80.0, hold=2.0)])
+
+    assert engine.update({SIG_SPEED: 80.0}, now=0.0) == []      # boundary is fine
+    assert engine.update({SIG_SPEED: 90.0}, now=1.0) == []
+    assert engine.since(OVERSPEED) == 1.0
+    assert engine.tick(now=3.0) == []                            # exactly hold seconds
+    alerts = engine.tick(now=3.5)
+    assert [a.kind for a in alerts] == ["SPEEDING"]
+    assert alerts[0].rule == OVERSPEED
+    assert alerts[0].reason == "speed 90.0 exceeds max threshold 80.0"
+
+    engine.update({SIG_SPEED: 70.0}, now=4.0)
+    assert engine.since(OVERSPEED) is None
+    assert not engine.is_firing(OVERSPEED)
+
+
+@pytest.mark.unit
+def test_conjunction_edge_trigger_alerts_once():
+    engine = RuleEngine([brake_accel_conflict_rule(5.0)])
+    assert engine.paths == [SIG_BRAKE, SIG_ACCEL]
+
+    assert engine.update({SIG_BRAKE: 40}, now=0.0) == []
+    alerts = engine.update({SIG_ACCEL: 30}, now=0.1)
+    assert [a.kind for a in alerts] == ["CRITICAL_CONFLICT"]
+    assert alerts[0].reason == "brake and accelerator both above 5.0% (brake 40)"
+    # the pedal value is the trigger, not a speed; no speed has been seen yet
+    assert (alerts[0].signal, alerts[0].value) == (SIG_BRAKE, 40)
+    assert math.isnan(alerts[0].speed)
+
+    assert engine.update({SIG_BRAKE: 45}, now=0.2) == []         # still firing, edge rule stays quiet
+    engine.update({SIG_ACCEL: 0}, now=0.3)
+    assert engine.firing == []
+    engine.update({SIG_SPEED: 42.0}, now=0.35)
+    alerts = engine.update({SIG_ACCEL: 20}, now=0.4)             # fires again on the next edge
+    assert len(alerts) == 1
+    assert (alerts[0].value, alerts[0].speed) == (45, 42.0)
+
+
+@pytest.mark.unit
+def test_rules_and_detectors_import_before_core():
+    # Alert lives in speedMonitor.alerts, so neither module needs core first
+    code = "import speedMonitor.rules, speedMonitor.detectors, speedMonitor.core"
+    root = str(Path(__file__).resolve().parent.parent)
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
+
+
+@pytest.mark.unit
+def test_rate_rule_and_dirty_evaluation():
+    calls = []
+    engine = RuleEngine([
+        Rule("harsh_braking", "HARSH_BRAKING",
+             {"type": "rate", "signal": SIG_SPEED, "max_rate": 25.0, "direction": "fall"}),
+        brake_accel_conflict_rule(),
+    ])
+    conflict = engine._plan[1]
+    check = conflict.check
+    conflict.check = lambda e: calls.append(1) or check(e)
+
+    assert engine.update({SIG_SPEED: 100.0}, now=0.0) == []       # no rate from one sample
+    assert engine.update({SIG_SPEED: 90.0}, now=1.0) == []        # -10 km/h/s
+    alerts = engine.update({SIG_SPEED: 50.0}, now=2.0)            # -40 km/h/s
+    assert [a.kind for a in alerts] == ["HARSH_BRAKING"]
+    assert engine.rate(SIG_SPEED) == -40.0
+    assert calls == []                                            # pedal rule never touched
+
+
+@pytest.mark.unit
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        RuleEngine([overspeed_rule(80.0), overspeed_rule(90.0)])
+    with pytest.raises(ValueError):
+        RuleEngine([Rule("x", "X", {"type": "range", "signal": SIG_SPEED})])
+    with pytest.raises(ValueError):
+        RuleEngine([Rule("x", "X", {"type": "median", "signal": SIG_SPEED})])
+    with pytest.raises(ValueError):
+        Rule.from_dict({"type": "range", "signal": SIG_SPEED, "max": 1})
+
+
+@pytest.mark.unit
+def test_load_rules_from_config():
+    rules = load_rules(RULES_JSON)
+    assert [r.name for r in rules] == [OVERSPEED, "brake_accel_conflict", "harsh_braking"]
+
+    engine = RuleEngine(rules)
+    assert engine.paths == [SIG_SPEED, SIG_BRAKE, SIG_ACCEL]
+    assert engine.rule(OVERSPEED).hold == 2.0
+
+
+@pytest.mark.unit
+def test_speed_monitor_runs_extra_rules_alongside_overspeed():
+    seen = []
+    mon = SpeedMonitor(Thresholds(80.0), hold=1.0, rules=[brake_accel_conflict_rule()], on_alert=seen.append)
+    assert mon.rules.paths == [SIG_SPEED, SIG_BRAKE, SIG_ACCEL]
+
+    assert mon.evaluate({SIG_SPEED: 90.0, SIG_BRAKE: 50, SIG_ACCEL: 50}, 0.0) is False
+    assert [a.kind for a in seen] == ["CRITICAL_CONFLICT"]
+    assert mon.overspeed_start == 0.0
+    assert mon.check_hold(95.0, 1.5) is True
+
+    # a configured overspeed rule replaces the built-in one
+    mon = SpeedMonitor(Thresholds(80.0), rules=load_rules(RULES_JSON))
+    assert mon.rules.rule(OVERSPEED).hold == 2.0
+
+
+@pytest.mark.unit
+def test_engine_runs_from_one_subscription(fake_broker):
+    engine = RuleEngine([overspeed_rule(80.0), brake_accel_conflict_rule()])
+    alerts = []
+
+    with fake_broker.client() as client:
+        t = threading.Thread(target=engine.run, args=(client, alerts.append), kwargs={"max_updates": 2})
+        t.start()
+        deadline = time.monotonic() + 5
+        while fake_broker.subscriber_count == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        fake_broker.set([(SIG_BRAKE, 60), (SIG_ACCEL, 60), (SIG_SPEED, 95.0)])
+        t.join(timeout=5)
+
+    assert not t.is_alive()
+    assert fake_broker.subscriber_count == 0
+    assert sorted(a.kind for a in alerts) == ["CRITICAL_CONFLICT", "SPEEDING"]
@@ -0,0 +1,40 @@
+from array import array
+
+import pytest
+
+import speedMonitor.core as core
+
+
+@pytest.mark.overspeed
+def test_batch_matches_per_item(make_monitor, speed_stream_overspeed):
+    mon = make_monitor(max_speed=10.0)
+    batch = mon.on_speed_batch(speed_stream_overspeed)
+
+    assert list(batch.indices) == [1, 2, 4]
+    assert batch.to_alerts() == mon.on_speed(speed_stream_overspeed)
+
+
+@pytest.mark.overspeed
+def test_batch_accepts_array_and_timestamps(make_monitor):
+    mon = make_monitor(max_speed=10.0)
+    speeds = array("f", [5.0, 11.0, 9.0, 15.0])
+    batch = mon.on_speed_batch(speeds, timestamps=[0.0, 0.1, 0.2, 0.3])
+
+    assert len(batch) == 2
+    assert list(batch.speeds) == [11.0, 15.0]
+    assert list(batch.timestamps) == [0.1, 0.3]
+    assert "exceeds max" in batch.reason(0)
+
+    with pytest.raises(ValueError):
+        mon.on_speed_batch(speeds, timestamps=[0.0])
+
+
+@pytest.mark.overspeed
+def test_batch_without_numpy(make_monitor, monkeypatch):
+    monkeypatch.setattr(core, "np", None)
+    mon = make_monitor(max_speed=10.0)
+    batch = mon.on_speed_batch(array("d", [5.0, 11.0, 12.0]), timestamps=[1.0, 2.0, 3.0])
+
+    assert list(batch.indices) == [1, 2]
+    assert list(batch.timestamps) == [2.0, 3.0]
+    assert [a.speed for a in batch] == [11.0, 12.0]
@@ -0,0 +1,67 @@
+import os
+import stat
+import sys
+import types
+
+import pytest
+
+from speedMonitor import sumo_backend
+
+
+def _fake_module(name, started):
+    mod = types.ModuleType(name)
+    mod.start = lambda cmd, **kw: started.append((name, cmd))
+    return mod
+
+
+def _executable(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("#!/bin/sh\n")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+@pytest.mark.unit
+def test_find_binary_prefers_sumo_home_then_path(tmp_path, monkeypatch):
+    home_bin = _executable(tmp_path / "home" / "bin" / "sumo")
+    path_bin = _executable(tmp_path / "path" / "sumo")
+    monkeypatch.setenv("PATH", str(tmp_path / "path"))
+
+    monkeypatch.setenv("SUMO_HOME", str(tmp_path / "home"))
+    assert sumo_backend.find_sumo_binary() == home_bin
+
+    monkeypatch.delenv("SUMO_HOME")
+    assert sumo_backend.find_sumo_binary() == path_bin
+    assert sumo_backend.find_sumo_binary(path_bin) == path_bin
+    with pytest.raises(FileNotFoundError):
+        sumo_backend.find_sumo_binary("sumo-gui")
+    with pytest.raises(FileNotFoundError):
+        sumo_backend.find_sumo_binary(str(tmp_path / "nope" / "sumo"))
+
+
+@pytest.mark.unit
+def test_auto_prefers_libsumo_and_falls_back_to_traci(tmp_path, monkeypatch):
+    started = []
+    monkeypatch.delenv("SUMO_BACKEND", raising=False)
+    monkeypatch.setitem(sys.modules, "libsumo", _fake_module("libsumo", started))
+    monkeypatch.setitem(sys.modules, "traci", _fake_module("traci", started))
+    monkeypatch.setattr(sumo_backend, "find_sumo_binary", lambda name: os.path.join("/opt/sumo/bin", name))
+
+    sim = sumo_backend.start(["-c", "x.sumocfg"])
+    assert sumo_backend.backend_name(sim) == "libsumo"
+    # sumo-gui needs the socket backend
+    sim = sumo_backend.start(["-c", "x.sumocfg"], binary="sumo-gui")
+    assert sumo_backend.backend_name(sim) == "traci"
+    assert started == [("libsumo", ["sumo", "-c", "x.sumocfg"]),
+                       ("traci", ["/opt/sumo/bin/sumo-gui", "-c", "x.sumocfg"])]
+
+    monkeypatch.setenv("SUMO_BACKEND", "traci")
+    assert sumo_backend.load_backend().__name__ == "traci"
+
+    monkeypatch.delenv("SUMO_BACKEND")
+    monkeypatch.setitem(sys.modules, "libsumo", None)          # not installed
+    assert sumo_backend.load_backend().__name__ == "traci"
+    with pytest.raises(ImportError):
+        sumo_backend.load_backend("libsumo")
+    with pytest.raises(ValueError):
+        sumo_backend.load_backend("sumo")
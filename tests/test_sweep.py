@@ -0,0 +1,93 @@
+import csv
+import json
+import os
+import shutil
+import types
+
+import pytest
+
+from speedMonitor import sumo_backend, sweep
+from speedMonitor.sumo_backend import VAR_DEPARTED_VEHICLES_IDS, VAR_MIN_EXPECTED_VEHICLES, VAR_TIME
+
+
+@pytest.mark.unit
+def test_grid_expansion_and_cell_names():
+    grid = sweep.parse_grid(["min_gap_m=5,10", "ttc_thresh_s=1.5"])
+    cells = sweep.expand_grid(grid)
+    assert [(c["min_gap_m"], c["ttc_thresh_s"]) for c in cells] == [(5.0, 1.5), (10.0, 1.5)]
+    assert cells[0]["time_headway_s"] == sweep.DEFAULT_PARAMS["time_headway_s"]
+    assert sweep.cell_name(cells[0], grid) == "min_gap_m=5.0_ttc_thresh_s=1.5"
+    # values equal to 6 significant digits still get their own directory
+    assert sweep.cell_name({"min_gap_m": 1.0000001}, ["min_gap_m"]) != sweep.cell_name({"min_gap_m": 1.0}, ["min_gap_m"])
+    assert sweep.cell_name(cells[0], {}) == "default"
+
+    with pytest.raises(ValueError):
+        sweep.expand_grid({"max_speed": [1]})
+    with pytest.raises(ValueError):
+        sweep.parse_grid(["min_gap_m"])
+
+
+class _ReplaySumo:
+    """Stands in for SUMO: no vehicles over TraCI, the FCD output is a prepared file."""
+
+    def __init__(self, fcd_src, args):
+        self.__name__ = "traci"
+        self.fcd_src, self.fcd_out = fcd_src, args[args.index("--fcd-output") + 1]
+        self.simulation = types.SimpleNamespace(
+            subscribe=lambda var_ids: None,
+            getSubscriptionResults=lambda: {VAR_TIME: 0.0, VAR_MIN_EXPECTED_VEHICLES: 0,
+                                            VAR_DEPARTED_VEHICLES_IDS: ()},
+        )
+        self.vehicle = types.SimpleNamespace(getIDList=lambda: [])
+
+    def close(self):
+        shutil.copy(self.fcd_src, self.fcd_out)
+
+
+@pytest.mark.unit
+def test_run_cell_analyses_the_run(fcd_xml, tmp_path, monkeypatch):
+    monkeypatch.setattr(sumo_backend, "start", lambda args, **kw: _ReplaySumo(fcd_xml, args))
+    out = tmp_path / "cell"
+    params = dict(sweep.DEFAULT_PARAMS, time_headway_s=1.0)
+
+    result = sweep.run_cell("sumo-acc-demo", params, str(out))
+
+    assert result["status"] == "ok"
+    assert result["fcd_brake"] == result["fcd_alerts_by_kind"]["BRAKE"] == 1
+    assert result["fcd_alerts"] == sum(result["fcd_alerts_by_kind"].values())
+    # the stand-in SUMO reports no vehicles over TraCI
+    assert (result["traci_alerts"], result["distance_close"], result["traci_alerts_by_kind"]) == (0, 0, {})
+    assert result["min_ttc_s"] == pytest.approx(0.0)     # ego reaches the lead in the last step
+    assert sweep.load_result(str(out)) == json.loads(json.dumps(result))
+    assert {"scenario.csv", "scenario_alerts.csv", "alerts.csv", "fcd.xml"} <= set(os.listdir(out))
+
+
+@pytest.mark.unit
+def test_sweep_resumes_and_retries_failed_cells(tmp_path, monkeypatch):
+    monkeypatch.setenv("SUMO_BACKEND", "traci")
+    monkeypatch.setenv("PATH", str(tmp_path))          # no SUMO anywhere: the cell fails
+    monkeypatch.delenv("SUMO_HOME", raising=False)
+    grid = {"min_gap_m": [5.0, 10.0]}
+    out = tmp_path / "sweep"
+
+    # the 5 m cell finished in an earlier, interrupted run
+    done_dir = out / "adas_simple" / "min_gap_m=5.0"
+    done_dir.mkdir(parents=True)
+    sweep._write_result(str(done_dir), {"scenario": "adas_simple", "status": "ok",
+                                        "traci_alerts": 2, "traci_alerts_by_kind": {"DISTANCE_CLOSE": 2},
+                                        "distance_close": 2, "fcd_alerts": 3, "fcd_alerts_by_kind": {"BRAKE": 3},
+                                        "fcd_brake": 3, "min_ttc_s": 1.2,
+                                        "params": dict(sweep.DEFAULT_PARAMS, min_gap_m=5.0), "elapsed_s": 1.0})
+    log = []
+    results = sweep.run_sweep(grid, ["adas_simple"], str(out), workers=2, log=log.append)
+
+    assert log[0] == "[SWEEP] 2 cells, 1 already finished, 1 to run"
+    assert [r["status"] for r in results] == ["ok", "failed"]
+    assert sweep.load_result(str(out / "adas_simple" / "min_gap_m=10.0")) is None
+
+    with open(out / "summary.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["cell"], r["status"], r["distance_close"], r["fcd_brake"]) for r in rows] == [
+        ("min_gap_m=5.0", "ok", "2", "3"), ("min_gap_m=10.0", "failed", "", "")]
+    assert json.loads(rows[0]["fcd_alerts_by_kind"]) == {"BRAKE": 3}
+    assert rows[0]["min_gap_m"] == "5.0"